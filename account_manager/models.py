@@ -23,6 +23,7 @@ class CustomUser(Observable, AbstractUser, metaclass=WatchedModel):
     ACHIEVEMENTS = {
         "utilisateur": ("utilisateur", "Vous avez créé puis activé votre compte utilisateur.", "is_user")
     }
+    ACHIEVEMENTS_USER_ID = "pk"
 
     email = models.EmailField(_('email address'), unique=True)
     last_update = models.DateTimeField(verbose_name="Dernière mise à jour", auto_now=True)
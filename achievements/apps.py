@@ -10,3 +10,8 @@ class AchievementsConfig(AppConfig):
     """
     name = 'achievements'
     verbose_name = 'Gestionnaire de Succès'
+
+    def ready(self):
+        # badges module must be imported once watched models are registered
+        from achievements.helpers.badges import freeze_achievements_catalog  # pylint: disable=import-outside-toplevel
+        freeze_achievements_catalog()
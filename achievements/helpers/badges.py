@@ -3,6 +3,7 @@ Achievements app: badge description and methods module
 """
 
 from importlib import import_module
+from types import MappingProxyType
 
 from riclibre.helpers.model_watcher import Register
 
@@ -21,4 +22,27 @@ def get_achievements():
     return achievements
 
 
+ACHIEVEMENTS_CATALOG = None
+
+
+def freeze_achievements_catalog():
+    """
+    Compute achievements catalog once, when every watched model is loaded.
+    :return: a read only dict of achievements
+    """
+    global ACHIEVEMENTS_CATALOG  # pylint: disable=global-statement
+    ACHIEVEMENTS_CATALOG = MappingProxyType(get_achievements())
+    return ACHIEVEMENTS_CATALOG
+
+
+def get_achievements_catalog():
+    """
+    Get frozen achievements catalog.
+    :return: a read only dict of achievements
+    """
+    if ACHIEVEMENTS_CATALOG is None:
+        return freeze_achievements_catalog()
+    return ACHIEVEMENTS_CATALOG
+
+
 BADGES = sorted([(key, key) for key in get_achievements()])
@@ -2,10 +2,14 @@
 Achievement's app: Models
 """
 from django.contrib.auth import get_user_model
-from django.db import models
+from django.core.cache import cache
+from django.db import models, transaction
+from django.db.models.signals import post_delete
 
 from achievements.helpers.badges import BADGES
 
+EARNED_BADGES_CACHE_KEY = "achievements:earned_badges:%s"
+
 
 class Achievement(models.Model):
     """
@@ -27,3 +31,52 @@ class Achievement(models.Model):
         Achievement representation
         """
         return "%s:%s" % (self.user, self.badge)
+
+    @classmethod
+    def get_earned_badges(cls, user_id):
+        """
+        Get badges earned by a user. Loaded once then cached.
+        :param user_id: a user primary key
+        :return: a set of badges
+        """
+        earned_badges = cache.get(EARNED_BADGES_CACHE_KEY % user_id)
+        if earned_badges is None:
+            earned_badges = set(cls.objects.filter(user_id=user_id).values_list('badge', flat=True))
+            cache.set(EARNED_BADGES_CACHE_KEY % user_id, earned_badges)
+        return earned_badges
+
+    @classmethod
+    def award(cls, awards):
+        """
+        Insert achievements, ignoring the ones already earned. Earned badges cache is updated once inserts are
+        committed.
+        :param awards: a list of (user_id, badge)
+        :return: number of achievements inserted
+        """
+        earned = set(cls.objects.filter(user_id__in={user_id for user_id, _ in awards},
+                                        badge__in={badge for _, badge in awards}).values_list('user_id', 'badge'))
+        to_insert = [(user_id, badge) for user_id, badge in set(awards) if (user_id, badge) not in earned]
+        if to_insert:
+            # concurrent awards are still ignored
+            cls.objects.bulk_create([cls(user_id=user_id, badge=badge) for user_id, badge in to_insert],
+                                    ignore_conflicts=True)
+
+        def update_cache():
+            for user_id in {user_id for user_id, _ in awards}:
+                earned_badges = cache.get(EARNED_BADGES_CACHE_KEY % user_id)
+                if earned_badges is not None:
+                    earned_badges.update(badge for awarded_user_id, badge in awards if awarded_user_id == user_id)
+                    cache.set(EARNED_BADGES_CACHE_KEY % user_id, earned_badges)
+
+        transaction.on_commit(update_cache)
+        return len(to_insert)
+
+
+def achievement_post_delete(sender, instance, **kwargs):
+    """
+    Launch after Achievement deletion. Invalidate user's earned badges cache.
+    """
+    cache.delete(EARNED_BADGES_CACHE_KEY % instance.user_id)
+
+
+post_delete.connect(achievement_post_delete, sender=Achievement)
@@ -3,9 +3,8 @@ Achievements app : Observer module
 """
 import logging
 
-from django.db import IntegrityError, transaction
-
 from achievements.models import Achievement
+from riclibre.helpers.metrics_helpers import increment_metric
 from riclibre.helpers.observation_helpers import Observer, Observable
 
 LOGGER = logging.getLogger(__name__)
@@ -18,18 +17,27 @@ class AchievementsObserver(Observer):
 
     def update(self, observable: Observable, *args, **kwargs) -> None:
         """
-        Get update information from observable.
+        Get update information from observable. Badges already earned by observable's user, read from its
+        ACHIEVEMENTS_USER_ID attribute (user_id by default), are skipped without being checked.
         """
         if hasattr(observable, 'ACHIEVEMENTS'):
+            user_id = getattr(observable, getattr(observable, 'ACHIEVEMENTS_USER_ID', 'user_id'))
+            earned_badges = Achievement.get_earned_badges(user_id)
+            awards = []
+            skipped = 0
             for key, check in observable.ACHIEVEMENTS.items():
                 badge = key
-                achieved, user = getattr(observable, check[2])()
+                if badge in earned_badges:
+                    skipped += 1
+                    LOGGER.debug("User %s still got '%s' badge.", user_id, badge)
+                    continue
+                achieved, _ = getattr(observable, check[2])()
                 if achieved:
-                    try:
-                        with transaction.atomic():
-                            Achievement.objects.create(user=user, badge=badge)
-                    except IntegrityError:
-                        LOGGER.info("User %s still got '%s' badge.", user, badge)
+                    awards.append((user_id, badge))
+            awarded = Achievement.award(awards) if awards else 0
+            increment_metric("achievements.checks", len(observable.ACHIEVEMENTS))
+            increment_metric("achievements.skipped", skipped)
+            increment_metric("achievements.awarded", awarded)
 
 
 achievements_observer = AchievementsObserver()
@@ -2,11 +2,16 @@
 Achievements app: tests module
 """
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.cache import cache
+from django.test import TestCase, RequestFactory, override_settings
 from django.urls import reverse
 
-from achievements.helpers.badges import BADGES
+from achievements.helpers.badges import BADGES, get_achievements_catalog
 from achievements.models import Achievement
+from achievements.observers import achievements_observer
+from achievements.views import AchievementsView
+from riclibre.helpers.metrics_helpers import get_metric
+from riclibre.helpers.observation_helpers import Observable
 
 
 class AchievementViewsTestCase(TestCase):
@@ -28,3 +33,94 @@ class AchievementViewsTestCase(TestCase):
         view_achievements = response.context_data['object_list']
         user_achievements = [badge['title'] for badge in filter(lambda x: x['success'] == True, view_achievements)]
         self.assertIn(achievement.badge, user_achievements)
+
+    def test_achievements_queries(self):
+        """
+        Test that user achievements are fetched in a single query whatever the number of badges.
+        """
+        for badge, _ in BADGES[:2]:
+            Achievement.objects.create(user=self.user, badge=badge)
+        request = RequestFactory().get(reverse('achievements'))
+        request.user = self.user
+        view = AchievementsView()
+        view.setup(request)
+        with self.assertNumQueries(1):
+            badges = view.get_queryset()
+        self.assertEqual(len(badges), len(get_achievements_catalog()))
+        self.assertEqual(len([badge for badge in badges if badge['success']]), 2)
+        self.assertTrue(all(badge['creation_date'] for badge in badges[:2]))
+
+
+class FakeObservable(Observable):
+    """
+    An observable granting a badge to a user.
+    """
+    _observers = []
+
+    def __init__(self, user, badge):
+        self.user = user
+        self.user_id = user.pk
+        self.ACHIEVEMENTS = {badge: (None, None, 'check')}
+        self.checked = False
+
+    def check(self):
+        """
+        Badge is always achieved.
+        """
+        self.checked = True
+        return True, self.user
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class AchievementsObserverTestCase(TestCase):
+    """
+    Test achievements award short-circuit.
+    """
+    fixtures = ['test_data.json', ]
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.user = get_user_model().objects.filter(is_superuser=False).first()
+        self.badge = BADGES[0][0]
+
+    def test_earned_badge_skipped(self):
+        """
+        Test that already earned badges are skipped without any query once earned badges are cached.
+        """
+        Achievement.objects.create(user=self.user, badge=self.badge)
+        self.assertEqual(Achievement.get_earned_badges(self.user.pk), {self.badge})
+        observable = FakeObservable(self.user, self.badge)
+        with self.assertNumQueries(0):
+            achievements_observer.update(observable)
+        self.assertFalse(observable.checked)
+        self.assertEqual(get_metric("achievements.skipped"), 1)
+        self.assertEqual(get_metric("achievements.awarded"), 0)
+
+    def test_award_ignores_conflicts(self):
+        """
+        Test that awarding a badge already in database with a stale cache does not fail.
+        """
+        Achievement.get_earned_badges(self.user.pk)
+        Achievement.objects.create(user=self.user, badge=self.badge)
+        achievements_observer.update(FakeObservable(self.user, self.badge))
+        self.assertEqual(Achievement.objects.filter(user=self.user, badge=self.badge).count(), 1)
+        self.assertEqual(get_metric("achievements.awarded"), 0)
+
+    def test_award_counts_inserted(self):
+        """
+        Test that only inserted achievements are counted as awarded.
+        """
+        self.assertEqual(Achievement.award([(self.user.pk, self.badge), (self.user.pk, BADGES[1][0])]), 2)
+        with self.assertNumQueries(1):
+            self.assertEqual(Achievement.award([(self.user.pk, self.badge)]), 0)
+        achievements_observer.update(FakeObservable(self.user, BADGES[2][0]))
+        self.assertEqual(get_metric("achievements.awarded"), 1)
+
+    def test_cache_invalidated_on_delete(self):
+        """
+        Test that deleting an achievement invalidates user's earned badges.
+        """
+        achievement = Achievement.objects.create(user=self.user, badge=self.badge)
+        self.assertEqual(Achievement.get_earned_badges(self.user.pk), {self.badge})
+        achievement.delete()
+        self.assertEqual(Achievement.get_earned_badges(self.user.pk), set())
@@ -3,8 +3,7 @@ Achievements app: achivements view
 """
 from django.views.generic import ListView
 
-from achievements.helpers.badges import get_achievements
-from achievements.models import Achievement
+from achievements.helpers.badges import get_achievements_catalog
 
 
 class AchievementsView(ListView):
@@ -15,19 +14,13 @@ class AchievementsView(ListView):
 
     def get_queryset(self):
         user = self.request.user
+        user_badges = dict(user.achievement_set.values_list('badge', 'creation_date'))
         badges = list()
-        for key, detail in get_achievements().items():
-            badge = {
+        for key, detail in get_achievements_catalog().items():
+            badges.append({
                 'title': key,
                 'description': detail[1],
-                'success': False,
-                'creation_date': None
-            }
-            try:
-                user_badge = user.achievement_set.get(badge=key)
-                badge['success'] = True
-                badge['creation_date'] = user_badge.creation_date
-            except Achievement.DoesNotExist:
-                pass
-            badges.append(badge)
+                'success': key in user_badges,
+                'creation_date': user_badges.get(key)
+            })
         return sorted(badges, key=lambda x: x['success'], reverse=True)
@@ -4,6 +4,18 @@ Id_card_checker's app:  IdCard's forms
 from django import forms
 
 from id_card_checker.models import IdCard
+from id_card_checker.validators import validate_file_size
+
+
+class IdCardDocumentField(forms.ImageField):
+    """
+    Image field checking file size before decoding image.
+    """
+
+    def to_python(self, data):
+        if data:
+            validate_file_size(data)
+        return super().to_python(data)
 
 
 class IdCardForm(forms.ModelForm):
@@ -14,3 +26,4 @@ class IdCardForm(forms.ModelForm):
     class Meta:
         model = IdCard
         fields = ['document']
+        field_classes = {'document': IdCardDocumentField}
@@ -0,0 +1,125 @@
+"""
+Id Card checker apps : image preprocessing helper module
+
+Uploaded documents are reduced before OCR: downscaled, grayscaled, deskewed and cropped to the MRZ band, so that
+tesseract works on a small region instead of a full resolution photo.
+"""
+import io
+import logging
+from statistics import pvariance
+
+from django.conf import settings
+from PIL import Image, ImageOps
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_OCR_MAX_WIDTH = 1200
+DEFAULT_MRZ_BAND_RATIO = 0.4
+DEFAULT_MAX_SKEW_ANGLE = 5
+SKEW_ESTIMATION_WIDTH = 400
+SKEW_ANGLE_STEP = 0.5
+
+
+def get_ocr_max_width():
+    """
+    Get width images are downscaled to before OCR.
+    :return: a width in pixels
+    """
+    if hasattr(settings, 'ID_CARD_OCR_MAX_WIDTH'):
+        return settings.ID_CARD_OCR_MAX_WIDTH
+    return DEFAULT_OCR_MAX_WIDTH
+
+
+def get_mrz_band_ratio():
+    """
+    Get height ratio of the bottom band of the document that contains the MRZ.
+    :return: a ratio between 0 and 1
+    """
+    if hasattr(settings, 'ID_CARD_MRZ_BAND_RATIO'):
+        return settings.ID_CARD_MRZ_BAND_RATIO
+    return DEFAULT_MRZ_BAND_RATIO
+
+
+def downscale(image: Image.Image, max_width: int):
+    """
+    Downscale an image to a maximum width, keeping its aspect ratio.
+    :param image: a PIL image
+    :param max_width: maximum width in pixels
+    :return: a PIL image
+    """
+    if image.width <= max_width:
+        return image
+    height = max(1, round(image.height * max_width / image.width))
+    return image.resize((max_width, height), Image.Resampling.LANCZOS)
+
+
+def estimate_skew(image: Image.Image, max_angle=DEFAULT_MAX_SKEW_ANGLE):
+    """
+    Estimate text skew angle of a grayscale image. Text lines are horizontal when rows projection profile has the
+    highest variance.
+    :param image: a grayscale PIL image
+    :param max_angle: maximum absolute angle tested, in degrees
+    :return: rotation angle in degrees that straightens the image
+    """
+    sample = downscale(image, SKEW_ESTIMATION_WIDTH)
+    # dark pixels are text
+    sample = sample.point(lambda value: 255 if value < 128 else 0)
+    best_angle, best_score = 0.0, -1.0
+    angle = -max_angle
+    while angle <= max_angle:
+        rotated = sample.rotate(angle, resample=Image.Resampling.NEAREST, expand=True).convert('F')
+        # each row is averaged into a single pixel, scaled back to rows sums
+        rows = rotated.resize((1, rotated.height), Image.Resampling.BOX)
+        score = pvariance([value * rotated.width for value in rows.getdata()])
+        if score > best_score:
+            best_angle, best_score = angle, score
+        angle += SKEW_ANGLE_STEP
+    return best_angle
+
+
+def deskew(image: Image.Image, max_angle=DEFAULT_MAX_SKEW_ANGLE):
+    """
+    Rotate a grayscale image so that its text lines are horizontal.
+    :param image: a grayscale PIL image
+    :param max_angle: maximum absolute angle corrected, in degrees
+    :return: a PIL image
+    """
+    angle = estimate_skew(image, max_angle)
+    if not angle:
+        return image
+    return image.rotate(angle, resample=Image.Resampling.BICUBIC, expand=True, fillcolor=255)
+
+
+def crop_mrz_band(image: Image.Image, ratio: float):
+    """
+    Crop the bottom band of a document where the MRZ is printed.
+    :param image: a PIL image
+    :param ratio: band height ratio
+    :return: a PIL image
+    """
+    return image.crop((0, int(image.height * (1 - ratio)), image.width, image.height))
+
+
+def to_png_stream(image: Image.Image):
+    """
+    Encode an image as a PNG stream readable by OCR.
+    :param image: a PIL image
+    :return: a bytes stream
+    """
+    stream = io.BytesIO()
+    image.save(stream, format='PNG')
+    stream.seek(0)
+    return stream
+
+
+def preprocess_document(document):
+    """
+    Prepare a document for MRZ OCR: downscale, grayscale and deskew it.
+    :param document: a file or a file name
+    :return: a grayscale PIL image
+    """
+    with Image.open(document) as image:
+        image = ImageOps.exif_transpose(image).convert('L')
+    image = deskew(downscale(image, get_ocr_max_width()))
+    LOGGER.debug("Document preprocessed to %sx%s", image.width, image.height)
+    return image
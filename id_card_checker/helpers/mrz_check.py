@@ -1,28 +1,39 @@
 """
 Id Card checker apps : mrz check helper module
 """
+from operator import mul
 
 from django.utils import timezone
 
 
-def transform_year(two_digit_year: str):
+def get_current_year():
+    """
+    Get current 2 digit year used as pivot to get 4 digit years.
+    :return: a two digits year string
+    """
+    return timezone.now().strftime('%y')
+
+
+def transform_year(two_digit_year: str, current_year: str = None):
     """
     get 4 digit year from 2 digit year
     :param two_digit_year: a two digits year string
+    :param current_year: two digits pivot year, computed when not provided
     :return: a 4 digit year string
     """
-    if timezone.now().strftime('%y') > str(two_digit_year):
+    if (current_year or get_current_year()) > str(two_digit_year):
         return f'20{two_digit_year}'
     return f'19{two_digit_year}'
 
 
-def transform_birth_date(birth_date: str):
+def transform_birth_date(birth_date: str, current_year: str = None):
     """
     Provide 8 digit formated birth date from 6 digit reversed birth date
     :param birth_date: 6 digits reverse birth date
+    :param current_year: two digits pivot year, computed when not provided
     :return: 8 digits formated birth date
     """
-    year = int(transform_year(birth_date[:2]))
+    year = int(transform_year(birth_date[:2], current_year))
     month = int(birth_date[2:4])
     day = int(birth_date[4:])
     return timezone.datetime(year, month, day).strftime('%d/%m/%Y')
@@ -55,33 +66,140 @@ FRENCH_STRUCTURE = {
 }
 
 
+# Methods that need the pivot year to transform a value.
+PIVOT_YEAR_METHODS = {transform_year, transform_birth_date}
+
+# Character values as a bytes translation table: '<' is 0, digits their value, letters 10 to 35. Other characters are
+# translated to INVALID_VALUE.
+INVALID_VALUE = 255
+CHARACTER_VALUES = bytes(
+    0 if char == '<' else int(char) if '0' <= char <= '9' else ord(char) - 55 if 'A' <= char <= 'Z' else INVALID_VALUE
+    for char in map(chr, range(256)))
+
+# Control key weights, repeated for the longest mrz.
+CONTROL_KEY_WEIGHTS = (7, 3, 1) * 30
+
+
+def get_values(mrz_text: str):
+    """
+    Translate mrz characters to their values.
+    :param mrz_text: a mrz string or part of it
+    :return: values as bytes
+    :raise ValueError: when a character is not allowed in mrz
+    """
+    values = mrz_text.encode('ascii').translate(CHARACTER_VALUES)
+    if INVALID_VALUE in values:
+        raise ValueError("Caractère hors bornes dans la mrz : %s" % mrz_text)
+    return values
+
+
+def compute_control_key(values: bytes):
+    """
+    Compute control key of translated mrz values.
+    :param values: values as bytes
+    :return: control key
+    """
+    return sum(map(mul, values, CONTROL_KEY_WEIGHTS)) % 10
+
+
 def french_mrz_control_key(string):
     """
     Check a part of mrz.
-    :param string:
-    :return:
+    :param string: a part of mrz
+    :return: control key
+    :raise ValueError: when a character is not allowed in mrz
     """
-    code = string
-    result = 0
-    i = -1
-    factor = [7, 3, 1]
-
-    for car in code:
-        if car == "<":
-            value = 0
-            i += 1
-        elif car in "0123456789":
-            value = int(car)
-            i += 1
-        elif car in "ABCDEFGHIJKLMNOPQRSTUVWXYZ":
-            value = ord(car) - 55
-            i += 1
-        else:
-            print("Caractère hors bornes")
-            break
-
-        result += value * factor[i % 3]
-    return result % 10
+    return compute_control_key(get_values(string))
+
+
+class MrzCodec:
+    """
+    A precompiled mrz structure: fields slices and control keys are computed once and checks work on translated
+    values.
+    """
+
+    def __init__(self, structure: dict, control_keys=()):
+        """
+        :param structure: a dict describing structure, like FRENCH_STRUCTURE
+        :param control_keys: a list of (checked slice, control key index)
+        """
+        self.fields = [
+            (key, slice(*field['interval']) if len(field['interval']) > 1 else field['interval'][0],
+             [(method, method in PIVOT_YEAR_METHODS) for method in field['methods']])
+            for key, field in structure.items()]
+        self.control_keys = [(slice(*interval), index) for interval, index in control_keys]
+
+    def check(self, mrz_text: str):
+        """
+        Check mrz control keys.
+        :param mrz_text: a mrz string
+        :return: a boolean
+        :raise ValueError: when a character is not allowed in mrz
+        :raise IndexError: when mrz is too short
+        """
+        values = get_values(mrz_text)
+        for checked, index in self.control_keys:
+            if compute_control_key(values[checked]) != int(mrz_text[index]):
+                return False
+        return True
+
+    def check_many(self, mrz_texts):
+        """
+        Check many mrz strings at once. Malformed mrz are considered as not valid.
+        :param mrz_texts: an iterable of mrz strings
+        :return: a list of booleans
+        """
+        results = []
+        for mrz_text in mrz_texts:
+            try:
+                results.append(self.check(mrz_text))
+            except (ValueError, IndexError):
+                results.append(False)
+        return results
+
+    def parse(self, mrz_text: str, current_year: str = None):
+        """
+        Parse mrz_text.
+        :param mrz_text: a string representing mrz
+        :param current_year: two digits pivot year, computed once when not provided
+        :return: a parsed mrz
+        """
+        current_year = current_year or get_current_year()
+        parsed = {}
+        for key, position, methods in self.fields:
+            value = mrz_text[position]
+            for method, needs_pivot_year in methods:
+                value = method(value, current_year) if needs_pivot_year else method(value)
+            parsed[key] = value
+        return parsed
+
+
+def get_structure_key(structure: dict):
+    """
+    Get a hashable key of a mrz structure, equal for equal structures.
+    :param structure: a dict describing structure
+    :return: a tuple
+    """
+    return tuple((key, tuple(field['interval']), tuple(field['methods'])) for key, field in structure.items())
+
+
+FRENCH_CODEC = MrzCodec(FRENCH_STRUCTURE, control_keys=[((36, 48), 48), ((63, 69), 69), ((0, -1), -1)])
+
+# Codecs by structure key, so that a structure is compiled once.
+MRZ_CODECS = {get_structure_key(FRENCH_STRUCTURE): FRENCH_CODEC}
+
+
+def get_codec(structure: dict):
+    """
+    Get codec of a mrz structure, compiled on first use.
+    :param structure: a dict describing structure
+    :return: a MrzCodec
+    """
+    structure_key = get_structure_key(structure)
+    codec = MRZ_CODECS.get(structure_key)
+    if codec is None:
+        codec = MRZ_CODECS[structure_key] = MrzCodec(structure)
+    return codec
 
 
 def check_french_mrz(mrz_text):
@@ -90,23 +208,16 @@ def check_french_mrz(mrz_text):
     :param mrz_text:
     :return:
     """
-    return french_mrz_control_key(mrz_text[36:48]) == int(mrz_text[48]) and french_mrz_control_key(
-        mrz_text[63:69]) == int(mrz_text[69]) and french_mrz_control_key(mrz_text[:-1]) == int(mrz_text[-1])
+    return FRENCH_CODEC.check(mrz_text)
 
 
-def apply_structure(struct: dict, mrz_text: str):
+def check_french_mrz_bulk(mrz_texts):
     """
-    Apply structure and methods to provided mrz_text
-    :param struct:
-    :param mrz_text:
-    :return:
+    Check many french ID mrz at once, for re-verification jobs.
+    :param mrz_texts: an iterable of mrz strings
+    :return: a list of booleans
     """
-    start = struct['interval'][0]
-    end = struct['interval'][1] if len(struct['interval']) > 1 else None
-    extracted_value = mrz_text[start:end] if end else mrz_text[start]
-    for funct in struct['methods']:
-        extracted_value = funct(extracted_value)
-    return extracted_value
+    return FRENCH_CODEC.check_many(mrz_texts)
 
 
 def split_mrz(structure_dict: dict, mrz_text: str) -> dict:
@@ -116,4 +227,4 @@ def split_mrz(structure_dict: dict, mrz_text: str) -> dict:
     :param mrz_text: a string representing mrz
     :return: a parsed mrz
     """
-    return {key: apply_structure(value, mrz_text) for key, value in structure_dict.items()}
+    return get_codec(structure_dict).parse(mrz_text)
@@ -0,0 +1,77 @@
+"""
+Id Card checker apps : upload handlers module
+"""
+import hashlib
+import io
+import logging
+
+from django.conf import settings
+from django.core.exceptions import RequestDataTooBig
+from django.core.files.uploadedfile import InMemoryUploadedFile
+from django.core.files.uploadhandler import FileUploadHandler, StopUpload
+
+LOGGER = logging.getLogger(__name__)
+
+# multipart boundaries, headers and other form fields sent with the document
+UPLOAD_OVERHEAD_MARGIN = 65536
+
+
+class IdCardUploadHandler(FileUploadHandler):
+    """
+    Keep uploaded documents in memory and compute their SHA-256 hash while streaming. Document data beyond
+    MAX_ID_CARD_FILE_SIZE is dropped, its size being still counted so that form validation rejects the file. Requests
+    that can't fit within the limit, even with multipart overhead, are rejected before being read, and uploads going
+    past it are stopped.
+    """
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.max_size = None
+        if hasattr(settings, 'MAX_ID_CARD_FILE_SIZE'):
+            self.max_size = settings.MAX_ID_CARD_FILE_SIZE
+        self.content = None
+        self.digest = None
+        self.size = 0
+
+    def get_max_request_size(self):
+        """
+        Get maximum size of an upload request, multipart overhead included.
+        :return: a number of bytes, None if size is not limited
+        """
+        if self.max_size is None:
+            return None
+        return self.max_size + UPLOAD_OVERHEAD_MARGIN
+
+    def handle_raw_input(self, input_data, meta, content_length, boundary, encoding=None):
+        max_request_size = self.get_max_request_size()
+        if max_request_size is not None and content_length > max_request_size:
+            LOGGER.warning("Upload of %s bytes exceeds %s bytes, rejected.", content_length, max_request_size)
+            raise RequestDataTooBig("Upload exceeds %s bytes." % max_request_size)
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.content = io.BytesIO()
+        self.digest = hashlib.sha256()
+        self.size = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        self.size += len(raw_data)
+        if self.max_size is None or self.size <= self.max_size:
+            self.content.write(raw_data)
+            self.digest.update(raw_data)
+        elif self.size > self.get_max_request_size():
+            LOGGER.warning("Uploaded document %s exceeds %s bytes, upload stopped.", self.file_name,
+                           self.get_max_request_size())
+            raise StopUpload(connection_reset=True)
+        elif self.content is not None:
+            LOGGER.warning("Uploaded document %s exceeds %s bytes, dropped.", self.file_name, self.max_size)
+            self.content = None
+
+    def file_complete(self, file_size):
+        content = self.content if self.content is not None else io.BytesIO()
+        content.seek(0)
+        uploaded_file = InMemoryUploadedFile(
+            file=content, field_name=self.field_name, name=self.file_name, content_type=self.content_type,
+            size=file_size, charset=self.charset, content_type_extra=self.content_type_extra)
+        uploaded_file.content_hash = self.digest.hexdigest() if self.content is not None else None
+        return uploaded_file
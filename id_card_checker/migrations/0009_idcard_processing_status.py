@@ -0,0 +1,18 @@
+# Generated by Django 2.2.28 on 2026-10-18 13:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('id_card_checker', '0008_auto_20190604_1736'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='idcard',
+            name='status',
+            field=models.CharField(choices=[('wait', 'En attente de traitement'), ('processing', 'Traitement en cours'), ('failed', 'Échec du traitement'), ('success', 'Réussite du traitement')], default='wait', max_length=300, verbose_name='statut du traitement'),
+        ),
+    ]
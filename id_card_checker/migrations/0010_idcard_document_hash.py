@@ -0,0 +1,18 @@
+# Generated by Django 2.2.28 on 2026-10-18 13:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('id_card_checker', '0009_idcard_processing_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='idcard',
+            name='document_hash',
+            field=models.CharField(blank=True, editable=False, max_length=64, verbose_name='Empreinte SHA-256 du document'),
+        ),
+    ]
@@ -1,12 +1,14 @@
 """
 Id_card_checker's app:  IdCard's models
 """
+import hashlib
+import io
 import logging
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.core.mail import send_mail
-from django.db import models
+from django.core.cache import cache
+from django.db import models, transaction
 from django.db.models import CASCADE
 from django.db.models.signals import post_save
 from django.template.defaultfilters import date
@@ -14,17 +16,26 @@ from django.utils import timezone
 from kombu.exceptions import OperationalError
 from passporteye import read_mrz
 
+from id_card_checker.helpers.image_preprocessing import preprocess_document, crop_mrz_band, get_mrz_band_ratio, \
+    to_png_stream
 from id_card_checker.helpers.mrz_check import check_french_mrz, split_mrz, FRENCH_STRUCTURE
 from id_card_checker.validators import validate_file_size
+from referendum.models import OutgoingEmail
+from riclibre.helpers.cache_helpers import is_shared_cache
+from riclibre.helpers.metrics_helpers import increment_metric
 from riclibre.helpers.model_watcher import WatchedModel
 from riclibre.helpers.observation_helpers import Observable
 
 LOGGER = logging.getLogger(__name__)
 
+OCR_CACHE_KEY = "id_card_ocr:%s"
+DOCUMENT_CONTENT_CACHE_KEY = "id_card_document:%s:%s"
+
 
 def notify_observers(sender, instance, created, **kwargs):
     """A notifying signal function"""
     if created and instance.document:
+        instance.cache_document()
         instance.process_id_card()
     if created and not instance.document:
         instance.comment = "Aucun fichier soumis"
@@ -44,10 +55,12 @@ class IdCard(Observable, models.Model, metaclass=WatchedModel):
     }
 
     WAIT = "wait"
+    PROCESSING = "processing"
     FAILED = "failed"
     SUCCESS = "success"
     STATUS = [
         (WAIT, "En attente de traitement"),
+        (PROCESSING, "Traitement en cours"),
         (FAILED, "Échec du traitement"),
         (SUCCESS, "Réussite du traitement")
     ]
@@ -81,6 +94,10 @@ class IdCard(Observable, models.Model, metaclass=WatchedModel):
     update = models.DateTimeField(verbose_name="Date de mise à jour", auto_now=True)
     comment = models.CharField(verbose_name="Résultat détaillé de l'analyse", blank=True, max_length=2000)
     valid_until = models.DateTimeField(verbose_name='Date limite de validité', blank=True, null=True)
+    document_hash = models.CharField(verbose_name="Empreinte SHA-256 du document", max_length=64, blank=True,
+                                     editable=False)
+
+    _document_content = None
 
     class Meta:
         ordering = ['-creation', '-update']
@@ -112,6 +129,48 @@ class IdCard(Observable, models.Model, metaclass=WatchedModel):
             LOGGER.warning("No ID_CARD_VALIDITY_LENGTH defined in project's settings %s ", no_id_card_validity_setting)
         return creation_date + timezone.timedelta(minutes=1)
 
+    @classmethod
+    def get_waiting_ids(cls, limit):
+        """
+        Get oldest waiting id cards with a document to check.
+        :param limit: maximum number of id cards
+        :return: a list of primary keys
+        """
+        return list(cls.objects.filter(status=cls.WAIT).exclude(document='').order_by('creation')
+                    .values_list('pk', flat=True)[:limit])
+
+    @classmethod
+    def claim(cls, primary_key):
+        """
+        Claim a waiting id card for processing. Row is locked while claimed and skipped by concurrent claims, so that
+        an id card is never processed twice.
+        :param primary_key: id card primary key
+        :return: the claimed id card or None if it is not waiting or already claimed
+        """
+        with transaction.atomic():
+            id_card = cls.objects.select_for_update(skip_locked=True).filter(pk=primary_key, status=cls.WAIT).first()
+            if id_card is not None:
+                id_card.status = cls.PROCESSING
+                id_card.update = timezone.now()
+                cls.objects.filter(pk=primary_key).update(status=id_card.status, update=id_card.update)
+        return id_card
+
+    @classmethod
+    def release_stale_claims(cls):
+        """
+        Put back in waiting state id cards claimed by a worker that did not finish their processing.
+        :return: number of released id cards
+        """
+        timeout = 600
+        if hasattr(settings, 'ID_CARD_CHECK_TIMEOUT'):
+            timeout = settings.ID_CARD_CHECK_TIMEOUT
+        released = cls.objects.filter(status=cls.PROCESSING,
+                                      update__lt=timezone.now() - timezone.timedelta(seconds=timeout)) \
+            .update(status=cls.WAIT)
+        if released:
+            LOGGER.warning("%s id cards claimed for more than %s seconds put back in queue.", released, timeout)
+        return released
+
     def process_id_card(self):
         """
         Add a job check identity card job to tasks.
@@ -124,13 +183,103 @@ class IdCard(Observable, models.Model, metaclass=WatchedModel):
             LOGGER.error("Can't delegate the task to Celery. Check if message broker started: %s", ope_err)
             raise ope_err
 
+    @staticmethod
+    def get_ocr_cache_timeout():
+        """
+        Get number of seconds document analysis results are cached.
+        :return: a number of seconds
+        """
+        if hasattr(settings, 'ID_CARD_OCR_CACHE_TIMEOUT'):
+            return settings.ID_CARD_OCR_CACHE_TIMEOUT
+        return 86400
+
+    @staticmethod
+    def get_document_staging_timeout():
+        """
+        Get number of seconds uploaded document content is kept in cache for checker.
+        :return: a number of seconds
+        """
+        if hasattr(settings, 'ID_CARD_DOCUMENT_STAGING_TIMEOUT'):
+            return settings.ID_CARD_DOCUMENT_STAGING_TIMEOUT
+        return 3600
+
+    def stage_document(self, uploaded_file):
+        """
+        Keep uploaded document content in memory and hash it. Document is still written to media storage on save.
+        :param uploaded_file: an uploaded file, with a "content_hash" attribute when hashed while uploaded
+        :return:
+        """
+        uploaded_file.seek(0)
+        self._document_content = uploaded_file.read()
+        uploaded_file.seek(0)
+        self.document_hash = getattr(uploaded_file, 'content_hash', None) or hashlib.sha256(
+            self._document_content).hexdigest()
+
+    def get_document_cache_key(self):
+        """
+        Get cache key of document content, specific to this id card.
+        :return: a cache key
+        """
+        return DOCUMENT_CONTENT_CACHE_KEY % (self.pk, self.document_hash)
+
+    def cache_document(self):
+        """
+        Copy staged document content in shared cache, so that checker does not read it back from media storage.
+        Media storage keeps the durable copy: cache is only an accelerator and failing to fill it is harmless.
+        :return: a boolean, True if document content is cached
+        """
+        if self._document_content is None or not self.document_hash or not is_shared_cache():
+            return False
+        try:
+            cache.set(self.get_document_cache_key(), self._document_content, self.get_document_staging_timeout())
+        except Exception as cache_error:  # pylint: disable=broad-except
+            LOGGER.warning("Can't cache document of id card %s: %s", self.pk, cache_error)
+            return False
+        return True
+
+    def get_document_content(self):
+        """
+        Get document content from memory, from cache if cached at upload, or from media storage.
+        :return: document bytes
+        """
+        if self._document_content is None:
+            if self.document_hash:
+                self._document_content = cache.get(self.get_document_cache_key())
+            if self._document_content is None:
+                with self.document.open('rb') as document:
+                    self._document_content = document.read()
+        return self._document_content
+
+    def discard_document(self):
+        """
+        Delete document from media storage, cache and memory.
+        :return:
+        """
+        if self.document_hash:
+            cache.delete(self.get_document_cache_key())
+        self._document_content = None
+        self.document.delete(save=False)
+
+    def get_document_hash(self):
+        """
+        Get SHA-256 hash of document content, computed while uploaded or from content.
+        :return: an hexadecimal digest
+        """
+        if not self.document_hash:
+            self.document_hash = hashlib.sha256(self.get_document_content()).hexdigest()
+        return self.document_hash
+
     def extract_mrz(self):
         """
-        Extract mrz data from document as a string
+        Extract mrz data from preprocessed document as a string. MRZ is searched in document's bottom band first.
         :return: a string representation of mrz.
         """
         try:
-            mrz = read_mrz(self.document.file.file, extra_cmdline_params='--oem 0', save_roi=True)
+            image = preprocess_document(io.BytesIO(self.get_document_content()))
+            mrz = read_mrz(to_png_stream(crop_mrz_band(image, get_mrz_band_ratio())), extra_cmdline_params='--oem 0')
+            if mrz is None:
+                LOGGER.info("No mrz found in %s bottom band, whole document analysed.", self)
+                mrz = read_mrz(to_png_stream(image), extra_cmdline_params='--oem 0')
             return mrz.aux['text'].replace('\n', '')
         except AttributeError as attr_error:
             LOGGER.error("Error during idcard analysis (%s) : %s", self, attr_error)
@@ -139,9 +288,18 @@ class IdCard(Observable, models.Model, metaclass=WatchedModel):
     def parse_mrz(self):
         """
         Parse mrz and returns a boolean for mrz validity, a document delivery date and a comment that explains process
-        results.
+        results. Results are cached by document content hash, so that re-uploaded documents are not analysed again. Only
+        results are cached, never the document.
         :return: a boolean for mrz validity, a delivery date and a comment that explains process results.
         """
+        cache_key = OCR_CACHE_KEY % self.get_document_hash()
+        cached_result = cache.get(cache_key)
+        if cached_result is not None:
+            LOGGER.info("Document %s already analysed, cached result used.", self.document)
+            increment_metric("id_card_ocr_cache.hits")
+            return cached_result
+        increment_metric("id_card_ocr_cache.misses")
+
         mrz_is_parsed = False
         delivery_date = None
         comment = ''
@@ -171,6 +329,9 @@ class IdCard(Observable, models.Model, metaclass=WatchedModel):
         if log_error:
             LOGGER.info("%s : %s", log_error, comment)
 
+        # unidentified errors may not come from the document itself
+        if comment != self.MRZ_ANALYSIS_MESSAGES['error_unknown']:
+            cache.set(cache_key, (mrz_is_parsed, delivery_date, comment), self.get_ocr_cache_timeout())
         return mrz_is_parsed, delivery_date, comment
 
     def check_document(self):
@@ -179,7 +340,7 @@ class IdCard(Observable, models.Model, metaclass=WatchedModel):
         :return: a boolean results
         """
         expiration_date = None
-        if self.document and self.status == self.WAIT:
+        if self.document and self.status in (self.WAIT, self.PROCESSING):
             mrz_validity, delivery_date, comment = self.parse_mrz()
             if mrz_validity:
                 self.change_status(self.SUCCESS)
@@ -196,13 +357,13 @@ class IdCard(Observable, models.Model, metaclass=WatchedModel):
             LOGGER.info("Document %s soumis par %s: %s", self.document, self.user, comment)
             self.comment = comment
             self.valid_until = expiration_date
-            self.document.delete(save=True)
+            self.discard_document()
             self.save()
-            send_mail(
-                subject='R.I.C Libre : %s : Analyse de votre pièce d\'identité' % self.status,
-                message=comment,
-                from_email='identity.validation@%s' % settings.MAIL_DOMAIN,
-                recipient_list=[self.user.email, ])
+            OutgoingEmail.enqueue(
+                'R.I.C Libre : %s : Analyse de votre pièce d\'identité' % self.status,
+                [self.user.email, ],
+                'identity.validation@%s' % settings.MAIL_DOMAIN,
+                body=comment)
         if self.status == self.SUCCESS:
             return True
         return False
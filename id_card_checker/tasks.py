@@ -3,11 +3,18 @@ Id Card checker apps : tasks module
 """
 from __future__ import absolute_import, unicode_literals
 
+import logging
+import time
+
 from celery import shared_task
+from django.conf import settings
 
 from id_card_checker.models import IdCard
+from riclibre.helpers.metrics_helpers import increment_metric
 from riclibre.helpers.tasks_helpers import TransactionAwareTask
 
+LOGGER = logging.getLogger(__name__)
+
 
 @shared_task(base=TransactionAwareTask, bind=True)
 def add_check_job(self, primary_key):
@@ -16,15 +23,32 @@ def add_check_job(self, primary_key):
     :param primary_key: Idcard primary key.
     :return:
     """
-    id_card = IdCard.objects.get(pk=primary_key)
-    return id_card.check_document()
+    id_card = IdCard.claim(primary_key)
+    if id_card is None:
+        LOGGER.info("Id card %s is not waiting or already claimed, check skipped.", primary_key)
+        increment_metric("id_card_checks.skipped")
+        return False
+    start = time.monotonic()
+    result = id_card.check_document()
+    increment_metric("id_card_checks.processed")
+    increment_metric("id_card_checks.success" if result else "id_card_checks.failed")
+    increment_metric("id_card_checks.duration_ms", int((time.monotonic() - start) * 1000))
+    return result
 
 
 @shared_task()
 def launch_waiting_id_cards_checks():
     """
-    Launch check job on all IdCard instances with wait status
+    Launch a check job for each waiting IdCard instance, by batches of ID_CARD_CHECK_BATCH_SIZE cards.
+    :return: number of launched jobs
     """
-    id_cards = IdCard.objects.filter(status=IdCard.WAIT)
-    for id_card in id_cards:
-        return id_card.check_document()
+    batch_size = 100
+    if hasattr(settings, 'ID_CARD_CHECK_BATCH_SIZE'):
+        batch_size = settings.ID_CARD_CHECK_BATCH_SIZE
+    IdCard.release_stale_claims()
+    id_card_ids = IdCard.get_waiting_ids(batch_size)
+    for primary_key in id_card_ids:
+        add_check_job.delay(primary_key)
+    increment_metric("id_card_checks.launched", len(id_card_ids))
+    LOGGER.info("%s id card check jobs launched.", len(id_card_ids))
+    return len(id_card_ids)
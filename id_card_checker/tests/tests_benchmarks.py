@@ -0,0 +1,182 @@
+"""
+Id Card check's app: benchmarks. Run with "make benchmark", excluded from default test run.
+"""
+import io
+import logging
+import os
+import shutil
+import timeit
+from unittest import skipUnless
+
+from django.core.files import File
+from django.test import SimpleTestCase, tag
+from django.utils import timezone
+from passporteye import read_mrz
+from PIL import Image
+
+from id_card_checker.helpers.mrz_check import check_french_mrz, check_french_mrz_bulk, split_mrz, FRENCH_STRUCTURE
+from id_card_checker.models import IdCard
+from id_card_checker.tests.tests_mrz_check import build_french_mrz
+
+LOGGER = logging.getLogger(__name__)
+
+SPECIMENS = ('./id_card_checker/tests/images/specimen.jpg', './id_card_checker/tests/images/specimen_2.jpg')
+
+
+def cpu_time():
+    """
+    CPU time of current process and of its children, tesseract being run as a subprocess.
+    """
+    times = os.times()
+    return times.user + times.system + times.children_user + times.children_system
+
+
+@tag('benchmark')
+@skipUnless(shutil.which('tesseract'), "tesseract is not installed")
+class MrzExtractionBenchmark(SimpleTestCase):
+    """
+    Compare OCR on raw uploads with OCR on preprocessed documents.
+    """
+    SCALES = (1, 2, 3)
+    ANGLES = (0, -2, 2)
+
+    @classmethod
+    def get_synthetic_documents(cls):
+        """
+        Build photo like documents from specimens: upscaled, slightly rotated and jpeg encoded.
+        """
+        documents = []
+        for specimen in SPECIMENS:
+            with Image.open(specimen) as image:
+                image = image.convert('RGB')
+                for scale in cls.SCALES:
+                    scaled = image.resize((image.width * scale, image.height * scale), Image.Resampling.BICUBIC)
+                    for angle in cls.ANGLES:
+                        stream = io.BytesIO()
+                        scaled.rotate(angle, resample=Image.Resampling.BICUBIC, expand=True, fillcolor='white') \
+                            .save(stream, format='JPEG', quality=90)
+                        documents.append(stream.getvalue())
+        return documents
+
+    @staticmethod
+    def raw_extraction(document):
+        """
+        Former extraction: raw upload given to OCR.
+        """
+        mrz = read_mrz(io.BytesIO(document), extra_cmdline_params='--oem 0', save_roi=True)
+        return mrz.aux['text'].replace('\n', '')
+
+    @staticmethod
+    def preprocessed_extraction(document):
+        """
+        Current extraction.
+        """
+        return IdCard(document=File(io.BytesIO(document), name='document.jpg')).extract_mrz()
+
+    def measure(self, extraction, documents):
+        """
+        Measure CPU time per card and parse success rate of an extraction method.
+        """
+        successes = 0
+        start = cpu_time()
+        for document in documents:
+            try:
+                successes += bool(check_french_mrz(extraction(document)))
+            except Exception:  # pylint: disable=broad-except
+                pass
+        return (cpu_time() - start) / len(documents), successes / len(documents)
+
+    def test_preprocessing(self):
+        """
+        Preprocessing lowers CPU time per card without lowering parse success rate.
+        """
+        documents = self.get_synthetic_documents()
+        raw_time, raw_rate = self.measure(self.raw_extraction, documents)
+        preprocessed_time, preprocessed_rate = self.measure(self.preprocessed_extraction, documents)
+        LOGGER.info("raw documents: %.0f ms CPU per card, %.0f%% parsed", raw_time * 1000, raw_rate * 100)
+        LOGGER.info("preprocessed documents: %.0f ms CPU per card, %.0f%% parsed",
+                    preprocessed_time * 1000, preprocessed_rate * 100)
+        self.assertLess(preprocessed_time, raw_time)
+        self.assertGreaterEqual(preprocessed_rate, raw_rate)
+
+
+def character_loop_control_key(string):
+    """
+    Former control key computation, one character at a time, kept as reference.
+    """
+    result = 0
+    i = -1
+    for car in string:
+        if car == "<":
+            value = 0
+        elif car in "0123456789":
+            value = int(car)
+        elif car in "ABCDEFGHIJKLMNOPQRSTUVWXYZ":
+            value = ord(car) - 55
+        else:
+            break
+        i += 1
+        result += value * [7, 3, 1][i % 3]
+    return result % 10
+
+
+def character_loop_check(mrz_text):
+    """
+    Former full french mrz check, kept as reference.
+    """
+    return character_loop_control_key(mrz_text[36:48]) == int(mrz_text[48]) and character_loop_control_key(
+        mrz_text[63:69]) == int(mrz_text[69]) and character_loop_control_key(mrz_text[:-1]) == int(mrz_text[-1])
+
+
+def per_field_pivot_split(mrz_text):
+    """
+    Former parsing, computing current year for each date field, kept as reference.
+    """
+    parsed = {}
+    for key, field in FRENCH_STRUCTURE.items():
+        interval = field['interval']
+        value = mrz_text[interval[0]:interval[1]] if len(interval) > 1 else mrz_text[interval[0]]
+        for method in field['methods']:
+            value = method(value, timezone.now().strftime('%y')) if 'transform' in method.__name__ else method(value)
+        parsed[key] = value
+    return parsed
+
+
+@tag('benchmark')
+class MrzCodecBenchmark(SimpleTestCase):
+    """
+    Compare mrz codec with former character loop implementation.
+    """
+    NB_MRZ = 10000
+
+    def setUp(self):
+        self.mrz_texts = [build_french_mrz(first_names="JEAN%s" % chr(65 + index % 26)) for index in range(100)]
+        self.mrz_texts *= self.NB_MRZ // len(self.mrz_texts)
+
+    def measure(self, function):
+        """
+        Measure time per mrz, in microseconds.
+        """
+        return min(timeit.repeat(function, number=1, repeat=3)) / len(self.mrz_texts) * 1000000
+
+    def test_check(self):
+        """
+        Checking mrz with translated values is faster than looping over characters.
+        """
+        loop_time = self.measure(lambda: [character_loop_check(mrz_text) for mrz_text in self.mrz_texts])
+        codec_time = self.measure(lambda: [check_french_mrz(mrz_text) for mrz_text in self.mrz_texts])
+        bulk_time = self.measure(lambda: check_french_mrz_bulk(self.mrz_texts))
+        LOGGER.info("mrz check: %.2f us per mrz with character loop, %.2f us with codec, %.2f us in bulk",
+                    loop_time, codec_time, bulk_time)
+        self.assertLess(codec_time, loop_time)
+        self.assertLess(bulk_time, loop_time)
+
+    def test_split(self):
+        """
+        Parsing mrz with a single pivot year computation is faster.
+        """
+        per_field_time = self.measure(lambda: [per_field_pivot_split(mrz_text) for mrz_text in self.mrz_texts])
+        codec_time = self.measure(lambda: [split_mrz(FRENCH_STRUCTURE, mrz_text) for mrz_text in self.mrz_texts])
+        LOGGER.info("mrz split: %.2f us per mrz with per field pivot year, %.2f us with codec",
+                    per_field_time, codec_time)
+        self.assertLess(codec_time, per_field_time)
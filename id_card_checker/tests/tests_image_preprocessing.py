@@ -0,0 +1,55 @@
+"""
+Id Card check's app: image preprocessing tests
+"""
+from django.test import SimpleTestCase, override_settings
+from PIL import Image
+
+from id_card_checker.helpers.image_preprocessing import downscale, estimate_skew, deskew, crop_mrz_band, \
+    preprocess_document
+
+SPECIMEN = './id_card_checker/tests/images/specimen_2.jpg'
+
+
+class ImagePreprocessingTestCase(SimpleTestCase):
+    """
+    Test document preprocessing before OCR.
+    """
+
+    def setUp(self):
+        with Image.open(SPECIMEN) as image:
+            self.image = image.convert('L')
+
+    def test_downscale(self):
+        """
+        Test that images are downscaled keeping their ratio, and never upscaled.
+        """
+        small = downscale(self.image, 400)
+        self.assertEqual(small.width, 400)
+        self.assertAlmostEqual(small.height / small.width, self.image.height / self.image.width, places=2)
+        self.assertIs(downscale(self.image, self.image.width * 2), self.image)
+
+    def test_deskew(self):
+        """
+        Test that a rotated document is straightened.
+        """
+        self.assertEqual(estimate_skew(self.image), 0)
+        rotated = self.image.rotate(3, expand=True, fillcolor=255)
+        self.assertEqual(estimate_skew(rotated), -3)
+        self.assertEqual(estimate_skew(deskew(rotated)), 0)
+
+    def test_crop_mrz_band(self):
+        """
+        Test that bottom band is kept.
+        """
+        band = crop_mrz_band(self.image, 0.25)
+        self.assertEqual(band.width, self.image.width)
+        self.assertEqual(band.height, self.image.height - int(self.image.height * 0.75))
+
+    @override_settings(ID_CARD_OCR_MAX_WIDTH=300)
+    def test_preprocess_document(self):
+        """
+        Test that documents are grayscaled and downscaled according to settings.
+        """
+        image = preprocess_document(SPECIMEN)
+        self.assertEqual(image.mode, 'L')
+        self.assertEqual(image.width, 300)
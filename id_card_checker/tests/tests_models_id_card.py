@@ -1,18 +1,28 @@
 """
 Id Card check's app: IdCard's model's tests
 """
+import hashlib
+import os
+import tempfile
+from unittest import mock
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core import mail
+from django.core.cache import cache
 from django.core.files import File
 from django.test import TestCase, override_settings
 from django.utils import timezone
 
 from id_card_checker.models import IdCard
+from id_card_checker.tests import TemporaryMediaMixin
+from referendum.tasks import send_outgoing_emails
 
+SHARED_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+                             'LOCATION': os.path.join(tempfile.gettempdir(), 'riclibre_tests_cache')}}
 
-class IdCardTestCase(TestCase):
+
+class IdCardTestCase(TemporaryMediaMixin, TestCase):
     """
     Test IdCard model and its methods.
     """
@@ -77,6 +87,8 @@ class IdCardTestCase(TestCase):
         id_card.document.save('specimen.jpg', id_card_document)
         result = id_card.check_document()
         self.assertTrue(result)
+        self.assertEqual(len(mail.outbox), 0)
+        send_outgoing_emails.apply()
         self.assertEqual(len(mail.outbox), 1)
 
     def test_check_document_failed(self):
@@ -90,4 +102,97 @@ class IdCardTestCase(TestCase):
         id_card.document.save('specimen.jpg', id_card_document)
         result = id_card.check_document()
         self.assertFalse(result)
+        self.assertEqual(len(mail.outbox), 0)
+        send_outgoing_emails.apply()
         self.assertEqual(len(mail.outbox), 1)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class IdCardOcrCacheTestCase(TemporaryMediaMixin, TestCase):
+    """
+    Test document analysis results cache.
+    """
+    fixtures = ['id_card_checker_test_data.json']
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.first()
+
+    def create_id_card(self, image='specimen.jpg'):
+        """
+        Create an id card with a document.
+        """
+        id_card = IdCard(user=self.user)
+        with open('./id_card_checker/tests/images/%s' % image, 'rb') as id_card_document:
+            id_card.document.save(image, File(id_card_document))
+        return id_card
+
+    def test_same_document_analysed_once(self):
+        """
+        Test that a re-uploaded document is not analysed again.
+        """
+        with mock.patch.object(IdCard, 'extract_mrz', side_effect=IndexError) as extract_mrz:
+            first_result = self.create_id_card().parse_mrz()
+            second_result = self.create_id_card().parse_mrz()
+            self.create_id_card('specimen_2.jpg').parse_mrz()
+        self.assertEqual(extract_mrz.call_count, 2)
+        self.assertEqual(first_result, second_result)
+        self.assertEqual(first_result[2], IdCard.MRZ_ANALYSIS_MESSAGES['error_mrz_structure'])
+
+    def test_unknown_error_not_cached(self):
+        """
+        Test that unidentified errors are not cached.
+        """
+        with mock.patch.object(IdCard, 'extract_mrz', side_effect=Exception) as extract_mrz:
+            self.create_id_card().parse_mrz()
+            self.create_id_card().parse_mrz()
+        self.assertEqual(extract_mrz.call_count, 2)
+
+    def test_document_hash(self):
+        """
+        Test that document hash does not depend on file name.
+        """
+        with open('./id_card_checker/tests/images/specimen.jpg', 'rb') as id_card_document:
+            expected_hash = hashlib.sha256(id_card_document.read()).hexdigest()
+        id_card = self.create_id_card()
+        self.assertEqual(id_card.get_document_hash(), expected_hash)
+        self.assertEqual(self.create_id_card().get_document_hash(), expected_hash)
+
+    @override_settings(CACHES=SHARED_CACHES)
+    def test_cached_document_content(self):
+        """
+        Test that cached document content is read from cache, per id card, and discarded with document.
+        """
+        cache.clear()
+        id_cards = [self.create_id_card(), self.create_id_card()]
+        for id_card in id_cards:
+            with open('./id_card_checker/tests/images/specimen.jpg', 'rb') as id_card_document:
+                id_card.stage_document(File(id_card_document))
+            self.assertTrue(id_card.cache_document())
+        cached_id_card = IdCard.objects.get(pk=id_cards[0].pk)
+        self.assertEqual(cached_id_card.document_hash, '')
+        cached_id_card.document_hash = id_cards[0].document_hash
+        with mock.patch.object(type(cached_id_card.document), 'open') as open_document:
+            content = cached_id_card.get_document_content()
+        open_document.assert_not_called()
+        self.assertEqual(hashlib.sha256(content).hexdigest(), id_cards[0].document_hash)
+        cached_id_card.discard_document()
+        self.assertIsNone(cache.get(cached_id_card.get_document_cache_key()))
+        self.assertFalse(cached_id_card.document)
+        # same document uploaded for another id card is still cached
+        self.assertEqual(cache.get(id_cards[1].get_document_cache_key()), content)
+        id_cards[1].discard_document()
+
+    @override_settings(CACHES=SHARED_CACHES)
+    def test_document_read_from_media_on_cache_miss(self):
+        """
+        Test that document is read from media storage when its cached content is missing.
+        """
+        cache.clear()
+        id_card = IdCard.objects.get(pk=self.create_id_card().pk)
+        with open('./id_card_checker/tests/images/specimen.jpg', 'rb') as id_card_document:
+            content = id_card_document.read()
+        id_card.document_hash = hashlib.sha256(content).hexdigest()
+        self.assertIsNone(cache.get(id_card.get_document_cache_key()))
+        self.assertEqual(id_card.get_document_content(), content)
+        id_card.discard_document()
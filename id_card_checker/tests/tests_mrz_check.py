@@ -0,0 +1,90 @@
+"""
+Id Card check's app: mrz check helper tests
+"""
+import copy
+
+from django.test import SimpleTestCase
+
+from id_card_checker.helpers.mrz_check import french_mrz_control_key, check_french_mrz, check_french_mrz_bulk, \
+    split_mrz, get_codec, FRENCH_CODEC, FRENCH_STRUCTURE, transform_year
+
+
+def build_french_mrz(last_name="DUPONT", first_names="JEAN", delivery="1906", birth_date="800101"):
+    """
+    Build a valid french ID mrz.
+    """
+    first_line = "IDFRA" + last_name.ljust(25, "<") + "75A001"
+    number = delivery + "75" + "123456"
+    second_line = number + str(french_mrz_control_key(number)) + first_names.ljust(14, "<") + birth_date
+    second_line += str(french_mrz_control_key(birth_date)) + "M"
+    mrz = first_line + second_line
+    return mrz + str(french_mrz_control_key(mrz))
+
+
+class MrzCheckTestCase(SimpleTestCase):
+    """
+    Test mrz codec.
+    """
+
+    def test_control_key(self):
+        """
+        Test control key computation with ICAO 9303 example.
+        """
+        self.assertEqual(french_mrz_control_key("520727"), 3)
+        self.assertEqual(french_mrz_control_key("L898902C<"), 3)
+
+    def test_invalid_character(self):
+        """
+        Test that characters not allowed in mrz raise a ValueError.
+        """
+        with self.assertRaises(ValueError):
+            french_mrz_control_key("52a727")
+        with self.assertRaises(ValueError):
+            french_mrz_control_key("5207é7")
+
+    def test_check_french_mrz(self):
+        """
+        Test full mrz check.
+        """
+        mrz = build_french_mrz()
+        self.assertEqual(len(mrz), 72)
+        self.assertTrue(check_french_mrz(mrz))
+        self.assertFalse(check_french_mrz(mrz.replace("DUPONT", "DUPOND")))
+        with self.assertRaises(IndexError):
+            check_french_mrz(mrz[:40])
+
+    def test_check_french_mrz_bulk(self):
+        """
+        Test that many mrz are checked at once, malformed ones being invalid.
+        """
+        mrz = build_french_mrz()
+        self.assertEqual(check_french_mrz_bulk([mrz, mrz.replace("JEAN", "JEAM"), mrz[:40], mrz.lower()]),
+                         [True, False, False, False])
+
+    def test_split_mrz(self):
+        """
+        Test mrz parsing.
+        """
+        mrz_data = split_mrz(FRENCH_STRUCTURE, build_french_mrz())
+        self.assertEqual(mrz_data['last_name'], "DUPONT")
+        self.assertEqual(mrz_data['first_names'], "JEAN")
+        self.assertEqual(mrz_data['delivery_year'], "2019")
+        self.assertEqual(mrz_data['delivery_month'], "06")
+        self.assertEqual(mrz_data['birth_date'], "01/01/1980")
+        self.assertEqual(mrz_data['third_control_key'], build_french_mrz()[-1])
+
+    def test_codec_cached_per_structure(self):
+        """
+        Test that equal structures share a codec compiled once.
+        """
+        self.assertIs(get_codec(copy.deepcopy(FRENCH_STRUCTURE)), FRENCH_CODEC)
+        structure = {'last_name': FRENCH_STRUCTURE['last_name']}
+        self.assertIs(get_codec(structure), get_codec(dict(structure)))
+        self.assertEqual(split_mrz(structure, build_french_mrz()), {'last_name': "DUPONT"})
+
+    def test_transform_year(self):
+        """
+        Test year pivot.
+        """
+        self.assertEqual(transform_year("19", "25"), "2019")
+        self.assertEqual(transform_year("80", "25"), "1980")
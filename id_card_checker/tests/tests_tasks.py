@@ -2,18 +2,21 @@
 Id Card check's app: Task's tests
 """
 import logging
+from unittest import mock
 
 from django.contrib.auth import get_user_model
 from django.core.files import File
-from django.test import TestCase
+from django.test import TestCase, override_settings
+from django.utils import timezone
 
 from id_card_checker.models import IdCard
 from id_card_checker.tasks import add_check_job, launch_waiting_id_cards_checks
+from id_card_checker.tests import TemporaryMediaMixin
 
 LOGGER = logging.getLogger(__name__)
 
 
-class TasksTestCase(TestCase):
+class TasksTestCase(TemporaryMediaMixin, TestCase):
     """
     Test tasks.
     """
@@ -39,9 +42,55 @@ class TasksTestCase(TestCase):
         id_card = IdCard(user=user)
         id_card_document = File(open('./id_card_checker/tests/images/specimen.jpg', 'rb'))
         id_card.document.save('specimen.jpg', id_card_document)
-        result = launch_waiting_id_cards_checks.apply()
-        self.assertTrue(result.get())
+        with mock.patch.object(add_check_job, 'delay') as delay:
+            result = launch_waiting_id_cards_checks.apply()
+        # fixture's waiting id card is also launched
+        self.assertEqual(result.get(), 2)
         self.assertTrue(result.successful())
+        delay.assert_any_call(id_card.pk)
+        self.assertTrue(add_check_job.apply(args=(id_card.pk,)).get())
         id_card.refresh_from_db()
         self.assertEqual(id_card.status, IdCard.SUCCESS)
         self.assertFalse(bool(id_card.document))
+
+    @override_settings(ID_CARD_CHECK_BATCH_SIZE=1)
+    def test_launch_batch(self):
+        """
+        test that launch_waiting_id_cards_checks launches a bounded batch of oldest waiting cards.
+        """
+        user = get_user_model().objects.first()
+        oldest_id_card = IdCard.objects.get(status=IdCard.WAIT)
+        IdCard.objects.create(user=user, document='temp_docs/new.jpg')
+        with mock.patch.object(add_check_job, 'delay') as delay:
+            self.assertEqual(launch_waiting_id_cards_checks.apply().get(), 1)
+        delay.assert_called_once_with(oldest_id_card.pk)
+
+    def test_claim(self):
+        """
+        test that an id card can only be claimed once.
+        """
+        user = get_user_model().objects.first()
+        id_card = IdCard.objects.create(user=user, document='temp_docs/claimed.jpg')
+        claimed_id_card = IdCard.claim(id_card.pk)
+        self.assertEqual(claimed_id_card.status, IdCard.PROCESSING)
+        self.assertIsNone(IdCard.claim(id_card.pk))
+        with mock.patch.object(IdCard, 'check_document') as check_document:
+            self.assertFalse(add_check_job.apply(args=(id_card.pk,)).get())
+        check_document.assert_not_called()
+
+    @override_settings(ID_CARD_CHECK_TIMEOUT=60)
+    def test_release_stale_claims(self):
+        """
+        test that id cards claimed for too long are put back in queue.
+        """
+        user = get_user_model().objects.first()
+        stale_id_card = IdCard.objects.create(user=user, document='temp_docs/stale.jpg')
+        id_card = IdCard.objects.create(user=user, document='temp_docs/processing.jpg')
+        IdCard.claim(stale_id_card.pk)
+        IdCard.claim(id_card.pk)
+        IdCard.objects.filter(pk=stale_id_card.pk).update(update=timezone.now() - timezone.timedelta(minutes=5))
+        self.assertEqual(IdCard.release_stale_claims(), 1)
+        stale_id_card.refresh_from_db()
+        id_card.refresh_from_db()
+        self.assertEqual(stale_id_card.status, IdCard.WAIT)
+        self.assertEqual(id_card.status, IdCard.PROCESSING)
@@ -1,15 +1,29 @@
 """
 Id_card_checker's app: Test views
 """
+import hashlib
+import os
+import tempfile
+
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.exceptions import RequestDataTooBig
+from django.core.files.storage import default_storage
+from django.core.files.uploadhandler import StopUpload
 from django.test import TestCase, Client, override_settings
 from django.urls import reverse
 
-from id_card_checker.models import IdCard
+from id_card_checker.helpers.upload_handlers import IdCardUploadHandler, UPLOAD_OVERHEAD_MARGIN
+from id_card_checker.models import IdCard, DOCUMENT_CONTENT_CACHE_KEY
+from id_card_checker.tests import TemporaryMediaMixin
+from id_card_checker.validators import SIZE_LIMITATION_TEXT, get_human_readable_file_size
+
+SHARED_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+                             'LOCATION': os.path.join(tempfile.gettempdir(), 'riclibre_tests_cache')}}
 
 
-class IdCardUploadViewTestCase(TestCase):
+class IdCardUploadViewTestCase(TemporaryMediaMixin, TestCase):
     """
     Test IdCardUploadView
     """
@@ -52,8 +66,80 @@ class IdCardUploadViewTestCase(TestCase):
             response = self.client.post(reverse('idcard'), {'document': id_doc})
             self.assertEqual(response.status_code, 200)
             self.assertEqual(len(response.context_data['form'].errors), 1)
+            self.assertEqual(response.context_data['form'].errors['document'],
+                             [SIZE_LIMITATION_TEXT % get_human_readable_file_size(104857)])
         self.assertEqual(IdCard.objects.count(), nb_id_cards)
 
+    @override_settings(CACHES=SHARED_CACHES)
+    def test_id_card_upload_hashed_and_cached(self):
+        """
+        Test that uploaded document is hashed while uploaded, saved to media storage and cached for checker.
+        """
+        cache.clear()
+        self.client.force_login(user=self.user)
+        with open('./id_card_checker/tests/images/specimen.jpg', 'rb') as id_doc:
+            content = id_doc.read()
+            id_doc.seek(0)
+            self.client.post(reverse('idcard'), {'document': id_doc})
+        id_card = IdCard.objects.filter(user=self.user).latest('creation')
+        self.assertEqual(id_card.document_hash, hashlib.sha256(content).hexdigest())
+        self.assertEqual(cache.get(DOCUMENT_CONTENT_CACHE_KEY % (id_card.pk, id_card.document_hash)), content)
+        self.assertTrue(default_storage.exists(id_card.document.name))
+        id_card.discard_document()
+        self.assertIsNone(cache.get(DOCUMENT_CONTENT_CACHE_KEY % (id_card.pk, id_card.document_hash)))
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_id_card_upload_not_cached(self):
+        """
+        Test that uploaded document is not cached when cache is not shared with checker.
+        """
+        cache.clear()
+        self.client.force_login(user=self.user)
+        with open('./id_card_checker/tests/images/specimen.jpg', 'rb') as id_doc:
+            self.client.post(reverse('idcard'), {'document': id_doc})
+        id_card = IdCard.objects.filter(user=self.user).latest('creation')
+        self.assertIsNone(cache.get(DOCUMENT_CONTENT_CACHE_KEY % (id_card.pk, id_card.document_hash)))
+        self.assertTrue(default_storage.exists(id_card.document.name))
+        id_card.discard_document()
+
+    def test_id_card_upload_csrf_protected(self):
+        """
+        Test that upload view is still csrf protected.
+        """
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(user=self.user)
+        with open('./id_card_checker/tests/images/specimen.jpg', 'rb') as id_doc:
+            response = client.post(reverse('idcard'), {'document': id_doc})
+        self.assertEqual(response.status_code, 403)
+
+    @override_settings(MAX_ID_CARD_FILE_SIZE=10)
+    def test_upload_handler_drops_oversized_data(self):
+        """
+        Test that upload handler stops buffering data beyond size limit but keeps counting it.
+        """
+        handler = IdCardUploadHandler()
+        handler.handle_raw_input(None, {}, 10 + UPLOAD_OVERHEAD_MARGIN, b'boundary')
+        handler.new_file('document', 'document.jpg', 'image/jpeg', 20)
+        handler.receive_data_chunk(b'0123456789', 0)
+        handler.receive_data_chunk(b'0123456789', 10)
+        uploaded_file = handler.file_complete(handler.size)
+        self.assertEqual(uploaded_file.size, 20)
+        self.assertEqual(uploaded_file.read(), b'')
+        self.assertIsNone(uploaded_file.content_hash)
+
+    @override_settings(MAX_ID_CARD_FILE_SIZE=10)
+    def test_upload_handler_stops_oversized_upload(self):
+        """
+        Test that upload handler rejects requests that can't fit within size limit and stops uploads going past it.
+        """
+        handler = IdCardUploadHandler()
+        with self.assertRaises(RequestDataTooBig):
+            handler.handle_raw_input(None, {}, 11 + UPLOAD_OVERHEAD_MARGIN, b'boundary')
+        handler.new_file('document', 'document.jpg', 'image/jpeg', 0)
+        with self.assertRaises(StopUpload) as stop_upload:
+            handler.receive_data_chunk(b'0' * (11 + UPLOAD_OVERHEAD_MARGIN), 0)
+        self.assertTrue(stop_upload.exception.connection_reset)
+
     def test_get_id_card_list(self):
         """
         Test id card list view.
@@ -8,17 +8,21 @@ from django.contrib import messages
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.http import HttpResponseRedirect
 from django.urls import reverse
+from django.utils.decorators import method_decorator
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
 from django.views.generic import CreateView
 from django.views.generic.list import MultipleObjectMixin, MultipleObjectTemplateResponseMixin
 from kombu.exceptions import OperationalError
 
 from id_card_checker.forms import IdCardForm
+from id_card_checker.helpers.upload_handlers import IdCardUploadHandler
 from id_card_checker.models import IdCard
 from id_card_checker.validators import get_human_readable_file_size, SIZE_LIMITATION_TEXT
 
 LOGGER = logging.getLogger(__name__)
 
 
+@method_decorator(csrf_exempt, name='dispatch')
 class IdCardUploadView(LoginRequiredMixin, MultipleObjectMixin, MultipleObjectTemplateResponseMixin, CreateView):
     """
     IdCard upload view
@@ -27,6 +31,14 @@ class IdCardUploadView(LoginRequiredMixin, MultipleObjectMixin, MultipleObjectTe
     form_class = IdCardForm
     template_name = "id_card_checker/id_card_upload.html"
 
+    def dispatch(self, request, *args, **kwargs):
+        """
+        Use id card upload handler. Handlers must be set before csrf check reads request's POST data, so csrf
+        protection is applied here.
+        """
+        request.upload_handlers = [IdCardUploadHandler(request)]
+        return csrf_protect(super().dispatch)(request, *args, **kwargs)
+
     def get(self, request, *args, **kwargs):
         self.object_list = self.get_queryset()
         return super().get(request, *args, **kwargs)
@@ -50,6 +62,7 @@ class IdCardUploadView(LoginRequiredMixin, MultipleObjectMixin, MultipleObjectTe
     def form_valid(self, form):
         self.object = form.save(commit=False)
         self.object.user = self.request.user
+        self.object.stage_document(form.cleaned_data['document'])
         try:
             self.object.save()
         except OperationalError:
@@ -7,3 +7,6 @@ from .like import *
 from .referendum import *
 from .vote import *
 from .identity import *
+from .outgoing_email import *
+from .result import *
+from .transition import *
@@ -5,6 +5,28 @@ Referendum app: Comment's models admin representation
 from django.contrib import admin
 
 from referendum.models import Comment, Report
+from referendum.models.comment import get_reports_threshold
+
+
+class ReportedListFilter(admin.SimpleListFilter):
+    """
+    Filter comments on their number of reports: the moderation queue.
+    """
+    title = "signalements"
+    parameter_name = "reported"
+
+    def lookups(self, request, model_admin):
+        return (
+            ("yes", "Signalés"),
+            ("threshold", "Signalés au-delà du seuil"),
+        )
+
+    def queryset(self, request, queryset):
+        if self.value() == "yes":
+            return queryset.filter(nb_reports__gte=1)
+        if self.value() == "threshold":
+            return queryset.filter(nb_reports__gte=get_reports_threshold())
+        return queryset
 
 
 @admin.register(Comment)
@@ -13,9 +35,43 @@ class CommentAdmin(admin.ModelAdmin):
     admin class for Comment model.
     """
     search_fields = ("referendum", "user", "text")
-    list_display = ("referendum", "user", "text", "publication_date", "last_update", "visible")
-    list_filter = ("referendum", "user", "publication_date", "last_update", "visible")
+    list_display = ("referendum", "user", "text", "publication_date", "last_update", "visible", "nb_reports")
+    list_filter = (ReportedListFilter, "visible", "referendum", "user", "publication_date", "last_update")
+    list_select_related = ("referendum", "user")
     autocomplete_fields = ["referendum", "user"]
+    actions = ["hide_comments", "show_comments"]
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).with_report_count()
+
+    def nb_reports(self, obj):
+        """
+        Display number of reports
+        :param obj:
+        :return:
+        """
+        return obj.nb_reports
+
+    nb_reports.short_description = "Signalements"
+    nb_reports.admin_order_field = "nb_reports"
+
+    def hide_comments(self, request, queryset):
+        """
+        Hide selected comments
+        """
+        self.message_user(request, "%s commentaire(s) masqué(s)." % Comment.set_visible(
+            Comment.objects.filter(pk__in=queryset.values('pk')), False))
+
+    hide_comments.short_description = "Masquer les commentaires sélectionnés"
+
+    def show_comments(self, request, queryset):
+        """
+        Show selected comments
+        """
+        self.message_user(request, "%s commentaire(s) rendu(s) visible(s)." % Comment.set_visible(
+            Comment.objects.filter(pk__in=queryset.values('pk')), True))
+
+    show_comments.short_description = "Rendre visibles les commentaires sélectionnés"
 
 
 @admin.register(Report)
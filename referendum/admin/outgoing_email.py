@@ -0,0 +1,21 @@
+"""
+Referendum app: OutgoingEmail's models admin representation
+"""
+
+from django.contrib import admin
+
+from referendum.admin.utils import ReadOnlyModelAdmin
+from referendum.models import OutgoingEmail
+
+
+@admin.register(OutgoingEmail)
+class OutgoingEmailAdmin(ReadOnlyModelAdmin):
+    """
+    admin class for OutgoingEmail model.
+    """
+    # body and template context may hold account activation or password reset links
+    fields = ('subject', 'template_name', 'from_email', 'recipients', 'status', 'attempts', 'next_attempt',
+              'last_error', 'creation', 'sent')
+    list_display = ('subject', 'status', 'attempts', 'creation', 'sent')
+    list_filter = ('status', 'creation')
+    search_fields = ('subject', 'recipients')
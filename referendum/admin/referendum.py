@@ -24,6 +24,7 @@ class ReferendumAdmin(admin.ModelAdmin):
         "duration", "event_end", "is_published", "is_in_progress", "is_over", "nb_votes", "results")
     list_filter = ("categories", "creation_date", "last_update", "publication_date", "event_start", "duration")
     search_fields = ("title", "description", "question")
+    list_select_related = ("result",)
     inlines = [ChoiceInline, ]
 
     def results(self, obj):
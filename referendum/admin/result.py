@@ -0,0 +1,18 @@
+"""
+Referendum app: ReferendumResult's models admin representation
+"""
+
+from django.contrib import admin
+
+from referendum.admin.utils import ReadOnlyModelAdmin
+from referendum.models import ReferendumResult
+
+
+@admin.register(ReferendumResult)
+class ReferendumResultAdmin(ReadOnlyModelAdmin):
+    """
+    admin class for ReferendumResult model.
+    """
+    list_display = ('referendum', 'nb_votes', 'nb_citizens', 'turnout', 'creation')
+    list_select_related = ('referendum',)
+    search_fields = ('referendum__title',)
@@ -0,0 +1,19 @@
+"""
+Referendum app: ReferendumTransition's models admin representation
+"""
+
+from django.contrib import admin
+
+from referendum.admin.utils import ReadOnlyModelAdmin
+from referendum.models import ReferendumTransition
+
+
+@admin.register(ReferendumTransition)
+class ReferendumTransitionAdmin(ReadOnlyModelAdmin):
+    """
+    admin class for ReferendumTransition model.
+    """
+    list_display = ('referendum', 'kind', 'instant', 'emitted')
+    list_filter = ('kind', 'instant', 'emitted')
+    list_select_related = ('referendum',)
+    search_fields = ('referendum__title',)
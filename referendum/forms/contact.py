@@ -5,7 +5,8 @@ from captcha.fields import ReCaptchaField
 from captcha.widgets import ReCaptchaV3
 from django import forms
 from django.conf import settings
-from django.core.mail import send_mail
+
+from referendum.models import OutgoingEmail
 
 
 class ContactForm(forms.Form):
@@ -18,14 +19,13 @@ class ContactForm(forms.Form):
 
     def send_mail(self):
         """
-        Send mail to admin.
+        Queue mail to admin.
         """
         clean_text = self.cleaned_data['text']
         clean_email = self.cleaned_data['email']
-        send_mail(
+        OutgoingEmail.enqueue(
             'Formulaire de contact:%s' % clean_email,
-            'Demande de %s : %s ' % (clean_email, clean_text),
-            'contact@%s' % settings.MAIL_DOMAIN,
             [admin[1] for admin in settings.ADMINS],
-            fail_silently=False,
+            'contact@%s' % settings.MAIL_DOMAIN,
+            body='Demande de %s : %s ' % (clean_email, clean_text),
         )
@@ -6,9 +6,11 @@ from django.contrib.auth import password_validation, get_user_model
 from django.contrib.auth.forms import AuthenticationForm, UsernameField, UserCreationForm, PasswordResetForm, \
     SetPasswordForm, PasswordChangeForm
 from django.forms import EmailField
+from django.template import loader
 from django.utils.translation import gettext_lazy as _
 
 from referendum.forms.utils import help_text_list_to_span
+from referendum.models import OutgoingEmail
 
 
 class CustomLoginForm(AuthenticationForm):
@@ -84,6 +86,15 @@ class CustomPasswordResetForm(PasswordResetForm):
         widget=forms.EmailInput(attrs={'autofocus': True, 'class': 'form-control', 'placeholder': 'email'})
     )
 
+    def send_mail(self, subject_template_name, email_template_name, context, from_email, to_email,
+                  html_email_template_name=None):
+        """
+        Queue password reset email. User is replaced by its username in the json template context.
+        """
+        subject = ''.join(loader.render_to_string(subject_template_name, context).splitlines())
+        context = dict(context, user={'get_username': context['user'].get_username()})
+        OutgoingEmail.enqueue(subject, [to_email], from_email, template_name=email_template_name, context=context)
+
 
 class CustomSetPasswordForm(SetPasswordForm):
     """
@@ -0,0 +1,28 @@
+"""
+Referendum's app: rebuild_vote_tallies command
+"""
+import logging
+
+from django.core.management import BaseCommand
+
+from referendum.models import Choice
+
+LOGGER = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    """
+    Rebuild choices votes counters from registered votes.
+    """
+    help = "Recompte les votes enregistrés et met à jour le décompte de chaque choix."
+
+    def add_arguments(self, parser):
+        parser.add_argument('slugs', nargs='*', help="Slugs des référendums à recompter (tous par défaut).")
+
+    def handle(self, *args, **options):
+        choices = Choice.objects.all()
+        if options['slugs']:
+            choices = choices.filter(referendum__slug__in=options['slugs'])
+        nb_choices = Choice.rebuild_tallies(choices)
+        LOGGER.info("%s choices votes counters rebuilt.", nb_choices)
+        self.stdout.write(self.style.SUCCESS("%s choix recomptés." % nb_choices))
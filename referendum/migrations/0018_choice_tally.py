@@ -0,0 +1,36 @@
+# Generated by Django 2.2.28 on 2026-10-18 12:33
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def count_existing_votes(apps, schema_editor):
+    """
+    Initialize choices votes counters from existing votes.
+    """
+    choice_model = apps.get_model('referendum', 'Choice')
+    vote_model = apps.get_model('referendum', 'Vote')
+    nb_votes = vote_model.objects.filter(choice=OuterRef('pk')).order_by().values('choice').annotate(
+        nb_votes=Count('pk')).values('nb_votes')
+    choice_model.objects.update(tally=Coalesce(Subquery(nb_votes, output_field=models.IntegerField()), Value(0)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('referendum', '0017_auto_20190501_1602'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='referendum',
+            options={'ordering': ('-event_start',), 'verbose_name': 'Référendum', 'verbose_name_plural': 'Référendums'},
+        ),
+        migrations.AddField(
+            model_name='choice',
+            name='tally',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Nombre de votes'),
+        ),
+        migrations.RunPython(count_existing_votes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 2.2.28 on 2026-10-18 12:39
+
+from django.db import migrations, models
+
+from referendum.models.utils import AddSeconds
+
+
+def compute_event_end(apps, schema_editor):
+    """
+    Store vote end of existing referendums.
+    """
+    referendum_model = apps.get_model('referendum', 'Referendum')
+    referendum_model.objects.filter(event_start__isnull=False).update(event_end=AddSeconds('event_start', 'duration'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('referendum', '0018_choice_tally'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='referendum',
+            name='event_end',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Fin des votes'),
+        ),
+        migrations.RunPython(compute_event_end, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='referendum',
+            index=models.Index(fields=['publication_date', 'event_start'], name='referendum_publication_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='referendum',
+            index=models.Index(fields=['event_start', 'event_end'], name='referendum_event_idx'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 2.2.28 on 2026-10-18 13:16
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('referendum', '0019_referendum_event_end'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutgoingEmail',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('subject', models.CharField(max_length=255, verbose_name='Sujet')),
+                ('body', models.TextField(blank=True, verbose_name='Corps du message')),
+                ('template_name', models.CharField(blank=True, max_length=255, verbose_name='Gabarit du corps du message')),
+                ('context', models.TextField(blank=True, verbose_name='Contexte du gabarit (json)')),
+                ('from_email', models.CharField(max_length=255, verbose_name='Expéditeur')),
+                ('recipients', models.TextField(verbose_name='Destinataires (json)')),
+                ('status', models.CharField(choices=[('wait', "En attente d'envoi"), ('sending', 'Envoi en cours'), ('sent', 'Envoyé'), ('failed', "Échec de l'envoi")], default='wait', max_length=20, verbose_name='Statut')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name="Nombre de tentatives d'envoi")),
+                ('next_attempt', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Date de la prochaine tentative')),
+                ('last_error', models.TextField(blank=True, verbose_name='Dernière erreur')),
+                ('creation', models.DateTimeField(auto_now_add=True, verbose_name='Date de création')),
+                ('sent', models.DateTimeField(blank=True, null=True, verbose_name="Date d'envoi")),
+            ],
+            options={
+                'verbose_name': 'Email sortant',
+                'verbose_name_plural': 'Emails sortants',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='outgoingemail',
+            index=models.Index(fields=['status', 'next_attempt'], name='outgoing_email_queue_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 2.2.28 on 2026-10-18 13:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('referendum', '0020_outgoingemail'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['referendum', 'visible', 'publication_date', 'id'], name='comment_thread_idx'),
+        ),
+    ]
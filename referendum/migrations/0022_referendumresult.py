@@ -0,0 +1,30 @@
+# Generated by Django 2.2.28 on 2026-10-18 13:31
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('referendum', '0021_comment_thread_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReferendumResult',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('choices', models.TextField(verbose_name='Résultats par choix (json)')),
+                ('nb_votes', models.PositiveIntegerField(verbose_name='Nombre de votes')),
+                ('nb_citizens', models.PositiveIntegerField(verbose_name='Nombre de citoyens')),
+                ('turnout', models.FloatField(verbose_name='Participation')),
+                ('creation', models.DateTimeField(auto_now_add=True, verbose_name='Date de création')),
+                ('referendum', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='result', to='referendum.Referendum', verbose_name='Référendum')),
+            ],
+            options={
+                'verbose_name': 'Résultat de référendum',
+                'verbose_name_plural': 'Résultats de référendums',
+            },
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 2.2.28 on 2026-10-18 13:33
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('referendum', '0022_referendumresult'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReferendumTransition',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('published', 'Publication'), ('vote_started', 'Début des votes'), ('vote_ended', 'Fin des votes')], max_length=20, verbose_name='Type de transition')),
+                ('instant', models.DateTimeField(verbose_name='Date de la transition')),
+                ('emitted', models.DateTimeField(blank=True, null=True, verbose_name="Date d'émission")),
+            ],
+            options={
+                'verbose_name': 'Transition de référendum',
+                'verbose_name_plural': 'Transitions de référendums',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='referendum',
+            index=models.Index(fields=['event_end'], name='referendum_event_end_idx'),
+        ),
+        migrations.AddField(
+            model_name='referendumtransition',
+            name='referendum',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='referendum.Referendum', verbose_name='Référendum'),
+        ),
+        migrations.AddIndex(
+            model_name='referendumtransition',
+            index=models.Index(fields=['emitted', 'instant'], name='referendum_transition_due_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='referendumtransition',
+            constraint=models.UniqueConstraint(fields=('referendum', 'kind', 'instant'), name='unique_referendum_transition'),
+        ),
+    ]
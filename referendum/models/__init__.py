@@ -6,3 +6,6 @@ from .like import *
 from .referendum import *
 from .vote import *
 from .identity import *
+from .outgoing_email import *
+from .transition import *
+from .result import *
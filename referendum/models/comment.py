@@ -2,17 +2,69 @@
 Referendum's app:  Comment's models
 """
 import logging
+from datetime import datetime, timedelta
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.db import models
-from django.db.models.signals import post_save
+from django.db.models import Count
+from django.db.models.signals import post_delete, post_save
 from django.urls import reverse
+from django.utils import timezone
 
+from referendum.models.referendum import COMMENTS_CACHE_NAMESPACE
+from riclibre.helpers.cache_helpers import bump_cache_version
 from riclibre.helpers.model_watcher import WatchedModel
 from riclibre.helpers.observation_helpers import Observable, default_notify_observers
 
 LOGGER = logging.getLogger(__name__)
 
+CURSOR_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def get_reports_threshold():
+    """
+    Get number of reports from which a comment is hidden.
+    :return: a number of reports
+    """
+    if hasattr(settings, 'COMMENT_REPORTS_THRESHOLD'):
+        return settings.COMMENT_REPORTS_THRESHOLD
+    return 5
+
+
+class CommentQuerySet(models.QuerySet):
+    """
+    Comment's queryset.
+    """
+
+    def visible(self):
+        """
+        Get comments that are not hidden by moderation.
+        :return: a queryset
+        """
+        return self.filter(visible=True)
+
+    def with_report_count(self):
+        """
+        Annotate comments with their number of reports as "nb_reports".
+        :return: a queryset
+        """
+        return self.annotate(nb_reports=Count('report'))
+
+    def reported(self, threshold=1, comment_ids=None):
+        """
+        Get comments reported at least a given number of times. Reports are counted by a subquery, so that the
+        result can be updated in bulk.
+        :param threshold: minimum number of reports
+        :param comment_ids: only count reports of these comments, all comments by default
+        :return: a queryset
+        """
+        reports = Report.objects.all()
+        if comment_ids is not None:
+            reports = reports.filter(comment_id__in=comment_ids)
+        return self.filter(pk__in=reports.values('comment_id').annotate(nb_reports=Count('pk'))
+                           .filter(nb_reports__gte=threshold).values('comment_id'))
+
 
 class Comment(Observable, models.Model, metaclass=WatchedModel):
     """
@@ -32,10 +84,14 @@ class Comment(Observable, models.Model, metaclass=WatchedModel):
     last_update = models.DateTimeField(verbose_name="Date de dernière mise à jour du commentaire", auto_now=True)
     visible = models.BooleanField(verbose_name="Visible", default=True)
 
+    objects = CommentQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Commentaire"
         verbose_name_plural = "Commentaires"
         ordering = ['-publication_date', ]
+        indexes = [models.Index(fields=['referendum', 'visible', 'publication_date', 'id'],
+                                name='comment_thread_idx')]
 
     def __str__(self):
         return f"{self.user} a commenté le référendum {self.referendum} le {self.publication_date} : {self.text}"
@@ -54,6 +110,91 @@ class Comment(Observable, models.Model, metaclass=WatchedModel):
         """
         return reverse('comment_update', kwargs={'pk': self.pk})
 
+    @staticmethod
+    def get_comments_per_page():
+        """
+        Get number of comments loaded at once on a referendum page.
+        :return: a number of comments
+        """
+        if hasattr(settings, 'COMMENTS_PER_PAGE'):
+            return settings.COMMENTS_PER_PAGE
+        return 20
+
+    @staticmethod
+    def encode_cursor(comment):
+        """
+        Build the pagination cursor pointing after a comment: its publication date in microseconds and its id.
+        :param comment: last comment of a page
+        :return: a cursor string
+        """
+        return "%s_%s" % ((comment.publication_date - CURSOR_EPOCH) // timedelta(microseconds=1), comment.pk)
+
+    @staticmethod
+    def decode_cursor(cursor):
+        """
+        Read a pagination cursor.
+        :param cursor: a cursor string built by encode_cursor
+        :return: a (publication date, id) tuple
+        :raise ValueError: if cursor is malformed
+        """
+        try:
+            microseconds, pk = cursor.split('_')
+            return CURSOR_EPOCH + timedelta(microseconds=int(microseconds)), int(pk)
+        except (AttributeError, OverflowError, ValueError) as err:
+            raise ValueError("Invalid comment cursor: %r" % cursor) from err
+
+    @classmethod
+    def get_page(cls, referendum_id, cursor=None, per_page=None):
+        """
+        Get a page of visible comments of a referendum, newest first, with keyset pagination on (publication date, id):
+        the page starts right after the cursor, so that its cost does not depend on how deep it is in the thread.
+        :param referendum_id: referendum id
+        :param cursor: cursor returned with previous page, None for first page
+        :param per_page: number of comments, COMMENTS_PER_PAGE by default
+        :return: a list of comments with their user and the cursor of next page, None on last page
+        :raise ValueError: if cursor is malformed
+        """
+        per_page = per_page or cls.get_comments_per_page()
+        queryset = cls.objects.visible().filter(referendum_id=referendum_id).select_related('user') \
+            .order_by('-publication_date', '-pk')
+        if cursor:
+            publication_date, pk = cls.decode_cursor(cursor)
+            queryset = queryset.filter(models.Q(publication_date__lt=publication_date)
+                                       | models.Q(publication_date=publication_date, pk__lt=pk))
+        comments = list(queryset[:per_page + 1])
+        if len(comments) > per_page:
+            comments = comments[:per_page]
+            return comments, cls.encode_cursor(comments[-1])
+        return comments, None
+
+    @classmethod
+    def hide_reported(cls, threshold=None, comment_ids=None):
+        """
+        Hide visible comments reported at least COMMENT_REPORTS_THRESHOLD times, in a single update query.
+        :param threshold: minimum number of reports, COMMENT_REPORTS_THRESHOLD by default
+        :param comment_ids: restrict to these comments, all comments by default
+        :return: number of hidden comments
+        """
+        queryset = cls.objects.visible().reported(threshold or get_reports_threshold(), comment_ids)
+        nb_hidden = cls.set_visible(queryset, False)
+        if nb_hidden:
+            LOGGER.info("%s reported comments hidden.", nb_hidden)
+        return nb_hidden
+
+    @classmethod
+    def set_visible(cls, queryset, visible):
+        """
+        Show or hide comments in a single update query. Cached pages of their referendums are invalidated.
+        :param queryset: a comment queryset
+        :param visible: new visibility
+        :return: number of updated comments
+        """
+        comments = dict(queryset.exclude(visible=visible).values_list('pk', 'referendum_id'))
+        nb_updated = cls.objects.filter(pk__in=comments.keys()).update(visible=visible)
+        for referendum_id in set(comments.values()):
+            bump_cache_version(COMMENTS_CACHE_NAMESPACE % referendum_id)
+        return nb_updated
+
     def is_participant(self):
         """
         Grant success to attached user
@@ -79,4 +220,22 @@ class Report(models.Model):
         return f"Commentaire {self.comment_id} signalé le {self.creation_date}"
 
 
+def hide_reported_comment(sender, instance, created, **kwargs):
+    """
+    Hide reported comment as soon as it reaches reports threshold.
+    """
+    if created:
+        Comment.hide_reported(comment_ids=[instance.comment_id])
+
+
+def invalidate_comments_cache(sender, instance, **kwargs):
+    """
+    Launch after Comment save or deletion. Invalidate cached pages of comment's referendum.
+    """
+    bump_cache_version(COMMENTS_CACHE_NAMESPACE % instance.referendum_id)
+
+
 post_save.connect(default_notify_observers, sender=Comment)
+post_save.connect(invalidate_comments_cache, sender=Comment)
+post_delete.connect(invalidate_comments_cache, sender=Comment)
+post_save.connect(hide_reported_comment, sender=Report)
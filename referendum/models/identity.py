@@ -3,15 +3,29 @@ Referendum's app:  Identity's models
 """
 import logging
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import Permission
-from django.db import models
-from django.db.models import CASCADE
-from django.db.models.signals import post_save, post_delete
+from django.core.cache import cache
+from django.db import models, transaction
+from django.db.models import CASCADE, Max
+from django.db.models.signals import post_save, post_delete, m2m_changed
 from django.utils import timezone
 
+from riclibre.helpers.cache_helpers import bump_cache_version, versioned_key, is_shared_cache
+
 LOGGER = logging.getLogger(__name__)
 
+CITIZENS_CACHE_NAMESPACE = "citizens"
+
+
+def invalidate_citizen_cache(user_id):
+    """
+    Invalidate cached citizen status of a user.
+    :param user_id: a user primary key
+    """
+    cache.delete(versioned_key(CITIZENS_CACHE_NAMESPACE, user_id))
+
 
 def manage_citizen_perm(sender, instance, **kwargs):
     """
@@ -29,6 +43,18 @@ def manage_citizen_perm(sender, instance, **kwargs):
         user.user_permissions.add(permission)
         user.save()
         LOGGER.info("%s: '%s' permission added", user, permission.codename)
+    invalidate_citizen_cache(user.pk)
+
+
+def user_permissions_changed(sender, instance, action, reverse, **kwargs):
+    """
+    Invalidate citizen status cache when users permissions are changed.
+    """
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        if reverse:
+            bump_cache_version(CITIZENS_CACHE_NAMESPACE)
+        else:
+            invalidate_citizen_cache(instance.pk)
 
 
 class Identity(models.Model):
@@ -55,16 +81,85 @@ class Identity(models.Model):
         """
         return self.valid_until > timezone.now()
 
+    @classmethod
+    def is_citizen(cls, user):
+        """
+        Check if user has citizen status: citizen permission and, when user has identities, a valid one. Status is
+        cached until identity expires, only if cache is shared: it is invalidated by celery workers while it is read by
+        web workers.
+        :param user: a user instance
+        :return: a boolean
+        """
+        if not user.is_authenticated:
+            return False
+        key = versioned_key(CITIZENS_CACHE_NAMESPACE, user.pk) if is_shared_cache() else None
+        status = cache.get(key) if key else None
+        if status is None:
+            status = (user.has_perm('referendum.is_citizen'),
+                      cls.objects.filter(user=user).aggregate(Max('valid_until'))['valid_until__max'])
+            if key:
+                cache.set(key, status, cls.get_citizen_cache_timeout(status[1]))
+        has_perm, valid_until = status
+        return has_perm and (valid_until is None or valid_until > timezone.now())
+
+    @staticmethod
+    def get_citizen_cache_timeout(valid_until):
+        """
+        Get citizen status cache timeout, bounded by identity validity.
+        :param valid_until: highest identity validity date of user
+        :return: a number of seconds
+        """
+        timeout = 3600
+        if hasattr(settings, 'CITIZENS_CACHE_TIMEOUT'):
+            timeout = settings.CITIZENS_CACHE_TIMEOUT
+        if valid_until is not None and valid_until > timezone.now():
+            timeout = min(timeout, int((valid_until - timezone.now()).total_seconds()) + 1)
+        return timeout
+
+    @classmethod
+    def get_expired_citizen_ids(cls, now=None):
+        """
+        Get a queryset of users whose identities are all expired.
+        :param now: reference date
+        :return: a users primary keys queryset
+        """
+        return cls.objects.values('user_id').annotate(last_validity=Max('valid_until')) \
+            .filter(last_validity__lte=now or timezone.now()).values('user_id')
+
+    @classmethod
+    def revoke_expired_citizen_perms(cls, now=None):
+        """
+        Remove citizen permission from every user whose identities are all expired, in a single query.
+        :param now: reference date
+        :return: number of revoked permissions
+        """
+        user_permissions = get_user_model().user_permissions
+        revoked_permissions = user_permissions.through.objects.filter(**{
+            'permission__codename': 'is_citizen',
+            '%s__in' % user_permissions.field.m2m_field_name(): cls.get_expired_citizen_ids(now)
+        })
+        # citizen status cache is invalidated below, m2m_changed signal is not needed
+        revoked = revoked_permissions._raw_delete(revoked_permissions.db)  # pylint: disable=protected-access
+        LOGGER.info("'is_citizen' permission removed from %s users", revoked)
+        if revoked:
+            bump_cache_version(CITIZENS_CACHE_NAMESPACE)
+        return revoked
+
     @classmethod
     def clean_identities(cls):
         """
-        Remove non valid identities
+        Remove non valid identities. Citizen permissions are revoked once for all users, so identities are deleted
+        without sending per row signals.
         """
-        for identity in cls.objects.filter(valid_until__lte=timezone.now()):
-            if not identity.is_valid_identity:
-                identity.delete()
-                LOGGER.info("%s: removed", identity)
+        now = timezone.now()
+        with transaction.atomic():
+            cls.revoke_expired_citizen_perms(now)
+            expired_identities = cls.objects.filter(valid_until__lte=now)
+            removed = expired_identities._raw_delete(expired_identities.db)  # pylint: disable=protected-access
+        LOGGER.info("%s identities removed", removed)
+        return removed
 
 
 post_save.connect(manage_citizen_perm, sender=Identity)
 post_delete.connect(manage_citizen_perm, sender=Identity)
+m2m_changed.connect(user_permissions_changed, sender=get_user_model().user_permissions.through)
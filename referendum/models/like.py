@@ -5,8 +5,10 @@ import logging
 
 from django.contrib.auth import get_user_model
 from django.db import models
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 
+from referendum.models.referendum import USER_COUNTS_CACHE_NAMESPACE
+from riclibre.helpers.cache_helpers import bump_cache_version
 from riclibre.helpers.model_watcher import WatchedModel
 from riclibre.helpers.observation_helpers import Observable, default_notify_observers
 
@@ -41,4 +43,13 @@ class Like(Observable, models.Model, metaclass=WatchedModel):
         return bool(self.pk), self.user
 
 
+def invalidate_user_counts_cache(sender, instance, **kwargs):
+    """
+    Launch after Like save or deletion. Invalidate cached counters of like's user.
+    """
+    bump_cache_version(USER_COUNTS_CACHE_NAMESPACE % instance.user_id)
+
+
 post_save.connect(default_notify_observers, sender=Like)
+post_save.connect(invalidate_user_counts_cache, sender=Like)
+post_delete.connect(invalidate_user_counts_cache, sender=Like)
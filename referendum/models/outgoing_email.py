@@ -0,0 +1,199 @@
+"""
+Referendum's app:  Outgoing email's models
+"""
+import json
+import logging
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import models, transaction
+from django.template import loader
+from django.utils import timezone
+from kombu.exceptions import OperationalError
+
+LOGGER = logging.getLogger(__name__)
+
+
+class OutgoingEmail(models.Model):
+    """
+    An email waiting to be sent by the outbox task. Body is either given as is, or rendered from a template and a json
+    context when the email is sent. Template context may hold secrets (account activation or password reset tokens):
+    it is cleared once email is sent or given up.
+    """
+    WAIT = "wait"
+    SENDING = "sending"
+    SENT = "sent"
+    FAILED = "failed"
+    STATUS = [
+        (WAIT, "En attente d'envoi"),
+        (SENDING, "Envoi en cours"),
+        (SENT, "Envoyé"),
+        (FAILED, "Échec de l'envoi"),
+    ]
+
+    subject = models.CharField(verbose_name="Sujet", max_length=255)
+    body = models.TextField(verbose_name="Corps du message", blank=True)
+    template_name = models.CharField(verbose_name="Gabarit du corps du message", max_length=255, blank=True)
+    context = models.TextField(verbose_name="Contexte du gabarit (json)", blank=True)
+    from_email = models.CharField(verbose_name="Expéditeur", max_length=255)
+    recipients = models.TextField(verbose_name="Destinataires (json)")
+    status = models.CharField(verbose_name="Statut", choices=STATUS, max_length=20, default=WAIT)
+    attempts = models.PositiveSmallIntegerField(verbose_name="Nombre de tentatives d'envoi", default=0)
+    next_attempt = models.DateTimeField(verbose_name="Date de la prochaine tentative", default=timezone.now)
+    last_error = models.TextField(verbose_name="Dernière erreur", blank=True)
+    creation = models.DateTimeField(verbose_name="Date de création", auto_now_add=True)
+    sent = models.DateTimeField(verbose_name="Date d'envoi", blank=True, null=True)
+
+    class Meta:
+        verbose_name = "Email sortant"
+        verbose_name_plural = "Emails sortants"
+        indexes = [models.Index(fields=['status', 'next_attempt'], name='outgoing_email_queue_idx')]
+
+    def __str__(self):
+        return f"{self.subject} : {self.status}"
+
+    @staticmethod
+    def get_setting(name, default):
+        """
+        Get an outbox setting.
+        :param name: setting name
+        :param default: default value
+        :return: setting value
+        """
+        if hasattr(settings, name):
+            return getattr(settings, name)
+        return default
+
+    @classmethod
+    def enqueue(cls, subject, recipients, from_email, body='', template_name='', context=None):
+        """
+        Queue an email. Sending task is launched once the current transaction is committed.
+        :param subject: email subject
+        :param recipients: a list of email addresses
+        :param from_email: sender email address
+        :param body: email body, when not rendered from a template
+        :param template_name: body template name
+        :param context: a json serializable template context
+        :return: queued email
+        """
+        outgoing_email = cls.objects.create(subject=subject, body=body, template_name=template_name,
+                                            context=json.dumps(context or {}), from_email=from_email,
+                                            recipients=json.dumps(list(recipients)))
+        transaction.on_commit(cls.launch_sending)
+        return outgoing_email
+
+    @staticmethod
+    def launch_sending():
+        """
+        Launch sending task. Emails stay queued for next beat tick if message broker is not available.
+        """
+        from referendum.tasks import send_outgoing_emails
+        try:
+            send_outgoing_emails.delay()
+        except OperationalError as ope_err:
+            LOGGER.error("Can't delegate emails sending to Celery, emails kept in queue: %s", ope_err)
+
+    @classmethod
+    def release_stale_claims(cls):
+        """
+        Put back in queue emails claimed by a task that did not finish sending them.
+        :return: number of released emails
+        """
+        timeout = cls.get_setting('EMAIL_OUTBOX_SENDING_TIMEOUT', 600)
+        return cls.objects.filter(status=cls.SENDING,
+                                  next_attempt__lt=timezone.now() - timezone.timedelta(seconds=timeout)) \
+            .update(status=cls.WAIT)
+
+    @classmethod
+    def claim_batch(cls, batch_size):
+        """
+        Claim a batch of emails to send. Rows locked by a concurrent claim are skipped.
+        :param batch_size: maximum number of emails
+        :return: a list of claimed emails
+        """
+        now = timezone.now()
+        with transaction.atomic():
+            batch = list(cls.objects.select_for_update(skip_locked=True)
+                         .filter(status=cls.WAIT, next_attempt__lte=now).order_by('next_attempt')[:batch_size])
+            cls.objects.filter(pk__in=[outgoing_email.pk for outgoing_email in batch]) \
+                .update(status=cls.SENDING, next_attempt=now)
+        for outgoing_email in batch:
+            outgoing_email.status = cls.SENDING
+        return batch
+
+    def to_message(self, templates, connection):
+        """
+        Build email message, rendering body template if any.
+        :param templates: a dict of already loaded templates, by name
+        :param connection: email backend connection
+        :return: an EmailMessage
+        """
+        body = self.body
+        if self.template_name:
+            if self.template_name not in templates:
+                templates[self.template_name] = loader.get_template(self.template_name)
+            body = templates[self.template_name].render(json.loads(self.context or '{}'))
+        return EmailMessage(self.subject, body, self.from_email, json.loads(self.recipients), connection=connection)
+
+    def mark_failed(self, error):
+        """
+        Record a sending failure and schedule a new attempt with exponential backoff, until max attempts is reached.
+        :param error: sending exception
+        """
+        self.attempts += 1
+        self.last_error = str(error)
+        if self.attempts >= self.get_setting('EMAIL_OUTBOX_MAX_ATTEMPTS', 5):
+            self.status = self.FAILED
+            self.context = ''
+            LOGGER.error("Email %s not sent after %s attempts: %s", self.pk, self.attempts, error)
+        else:
+            self.status = self.WAIT
+            self.next_attempt = timezone.now() + timezone.timedelta(
+                seconds=self.get_setting('EMAIL_OUTBOX_RETRY_DELAY', 60) * 2 ** (self.attempts - 1))
+            LOGGER.warning("Email %s not sent, new attempt at %s: %s", self.pk, self.next_attempt, error)
+
+    @classmethod
+    def send_batch(cls, batch_size=None):
+        """
+        Send a batch of queued emails over a single connection. Each template is loaded once per batch.
+        :param batch_size: maximum number of emails, EMAIL_OUTBOX_BATCH_SIZE by default
+        :return: number of sent emails
+        """
+        cls.release_stale_claims()
+        batch = cls.claim_batch(batch_size or cls.get_setting('EMAIL_OUTBOX_BATCH_SIZE', 100))
+        if not batch:
+            return 0
+        templates = {}
+        nb_sent = 0
+        connection = get_connection()
+        try:
+            connection.open()
+            for outgoing_email in batch:
+                try:
+                    outgoing_email.to_message(templates, connection).send()
+                    outgoing_email.status = cls.SENT
+                    outgoing_email.sent = timezone.now()
+                    outgoing_email.context = ''
+                    nb_sent += 1
+                except Exception as sending_error:  # pylint: disable=broad-except
+                    outgoing_email.mark_failed(sending_error)
+        except Exception as connection_error:  # pylint: disable=broad-except
+            for outgoing_email in batch:
+                if outgoing_email.status == cls.SENDING:
+                    outgoing_email.mark_failed(connection_error)
+        finally:
+            connection.close()
+            cls.objects.bulk_update(batch, ['status', 'sent', 'attempts', 'last_error', 'next_attempt', 'context'])
+        LOGGER.info("%s/%s emails sent.", nb_sent, len(batch))
+        return nb_sent
+
+    @classmethod
+    def purge_sent(cls):
+        """
+        Delete sent emails older than EMAIL_OUTBOX_RETENTION_DAYS.
+        :return: number of deleted emails
+        """
+        limit = timezone.now() - timezone.timedelta(days=cls.get_setting('EMAIL_OUTBOX_RETENTION_DAYS', 30))
+        purged, _ = cls.objects.filter(status=cls.SENT, sent__lt=limit).delete()
+        LOGGER.info("%s sent emails purged.", purged)
+        return purged
@@ -3,19 +3,20 @@ Referendum's app: Referendum's models
 """
 
 import logging
-from functools import reduce
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ValidationError
 from django.db import models, IntegrityError, transaction
-from django.db.models import CASCADE
-from django.db.models.signals import post_save
+from django.db.models import CASCADE, Count, Exists, F, Min, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.db.models.signals import m2m_changed, post_delete, post_save
 from django.urls import reverse
 from django.utils import timezone
 from django.utils.text import slugify
 
 from referendum.models.utils import FieldUpdateControlMixin
+from riclibre.helpers.cache_helpers import bump_cache_version, get_or_set_versioned, get_cache_version
 from riclibre.helpers.model_watcher import WatchedModel
 from riclibre.helpers.observation_helpers import Observable, default_notify_observers
 
@@ -23,6 +24,69 @@ LOGGER = logging.getLogger(__name__)
 
 DEFAULT_VOTE_CHOICES = ['Oui', 'Non', 'Vote blanc']
 
+CATEGORIES_CACHE_NAMESPACE = "categories"
+USER_COUNTS_CACHE_NAMESPACE = "user_counts:%s"
+TALLY_CACHE_NAMESPACE = "referendum_tally:%s"
+COMMENTS_CACHE_NAMESPACE = "referendum_comments:%s"
+STATE_CACHE_NAMESPACE = "referendum_state:%s"
+
+
+class ReferendumQuerySet(models.QuerySet):
+    """
+    Referendum's queryset. Status filters are computed by database.
+    """
+
+    def published(self):
+        """
+        Get published referendums.
+        :return: a queryset
+        """
+        return self.filter(publication_date__lte=timezone.now())
+
+    def upcoming(self):
+        """
+        Get referendums whose vote is planned but not started yet.
+        :return: a queryset
+        """
+        return self.filter(event_start__gt=timezone.now())
+
+    def in_progress(self):
+        """
+        Get referendums whose vote is in progress.
+        :return: a queryset
+        """
+        now = timezone.now()
+        return self.filter(event_start__lt=now, event_end__gt=now)
+
+    def over(self):
+        """
+        Get referendums whose vote is over.
+        :return: a queryset
+        """
+        return self.filter(event_end__lt=timezone.now())
+
+    def not_over(self):
+        """
+        Get referendums whose vote is planned and not over yet: upcoming or in progress.
+        :return: a queryset
+        """
+        return self.filter(event_end__gte=timezone.now())
+
+    def with_user_state(self, user):
+        """
+        Annotate referendums with "user_liked" and "user_voted" flags for a given user, so that lists can display
+        them without one query per referendum.
+        :param user: a user model instance
+        :return: a queryset
+        """
+        if not user.is_authenticated:
+            return self
+        from referendum.models.like import Like
+        from referendum.models.vote import VoteToken
+        return self.annotate(
+            user_liked=Exists(Like.objects.filter(referendum=OuterRef('pk'), user=user)),
+            user_voted=Exists(VoteToken.objects.filter(referendum=OuterRef('pk'), user=user, voted=True)))
+
 
 class Referendum(Observable, FieldUpdateControlMixin, models.Model, metaclass=WatchedModel):
     """
@@ -33,6 +97,7 @@ class Referendum(Observable, FieldUpdateControlMixin, models.Model, metaclass=Wa
         "orateur": ("orateur", "Vous avez créé puis publié un référendum.", "has_published"),
         "politicien": ("politicien", "Vous avez planifié un référendum.", "has_planned")
     }
+    ACHIEVEMENTS_USER_ID = "creator_id"
     DURATION_CHOICES = (
         (86399, '24h'),
     )
@@ -53,15 +118,23 @@ class Referendum(Observable, FieldUpdateControlMixin, models.Model, metaclass=Wa
     event_start = models.DateTimeField(verbose_name="Début des votes", blank=True, null=True)
     duration = models.IntegerField(verbose_name="Durée des votes", choices=DURATION_CHOICES,
                                    default=DURATION_CHOICES[0][0])
+    event_end = models.DateTimeField(verbose_name="Fin des votes", blank=True, null=True, editable=False)
     creator = models.ForeignKey(get_user_model(), verbose_name="Créateur", on_delete=CASCADE)
     slug = models.SlugField(max_length=300, null=True, blank=True)
 
+    objects = ReferendumQuerySet.as_manager()
+
     __control_fields = ["publication_date", "event_start", "duration"]
 
     class Meta:
         verbose_name = "Référendum"
         verbose_name_plural = "Référendums"
         ordering = ('-event_start',)
+        indexes = [
+            models.Index(fields=['publication_date', 'event_start'], name='referendum_publication_idx'),
+            models.Index(fields=['event_start', 'event_end'], name='referendum_event_idx'),
+            models.Index(fields=['event_end'], name='referendum_event_end_idx'),
+        ]
 
     def __str__(self):
         return self.title
@@ -108,11 +181,17 @@ class Referendum(Observable, FieldUpdateControlMixin, models.Model, metaclass=Wa
 
             self.slug = slugify(self.title)
 
+        # keep stored vote end in line with event start and duration
+        self.event_end = self.compute_event_end()
+        if update_fields is not None and {'event_start', 'duration'} & set(update_fields) \
+                and 'event_end' not in update_fields:
+            update_fields = list(update_fields) + ['event_end']
+
         if message:
             LOGGER.warning(message)
         super(Referendum, self).save(force_insert=force_insert, force_update=force_update, using=using,
                                      update_fields=update_fields)
-        self.update_control_fields(*control_fields)
+        self.snapshot_control_fields(*control_fields)
 
     def clean(self):
         """Override clean method"""
@@ -209,8 +288,7 @@ class Referendum(Observable, FieldUpdateControlMixin, models.Model, metaclass=Wa
         return getattr(self, "__original_event_start") + timezone.timedelta(
             seconds=getattr(self, "__original_duration")) if getattr(self, "__original_event_start") else None
 
-    @property
-    def event_end(self):
+    def compute_event_end(self):
         """
         Get referendum's vote end according to event start and duration.
         :return:
@@ -247,18 +325,58 @@ class Referendum(Observable, FieldUpdateControlMixin, models.Model, metaclass=Wa
         The number of votes for this referendum.
         :return: a number of votes
         """
-        nb_votes_list = [choice.nb_votes for choice in self.choice_set.all() if choice]
-        if nb_votes_list:
-            return reduce(lambda a, b: a + b, nb_votes_list)
-        return 0
+        result = self.get_frozen_result()
+        if result is not None:
+            return result.nb_votes
+        return sum(choice.nb_votes for choice in self.choice_set.all())
+
+    def get_frozen_result(self):
+        """
+        Get results snapshot of an over referendum.
+        :return: a ReferendumResult instance, None if results are not frozen yet
+        """
+        if not self.is_over:
+            return None
+        return getattr(self, 'result', None)
 
     def get_results(self):
         """
-        Get referendum results
+        Get referendum results. Once frozen, they are read from results snapshot. Otherwise, choices are fetched once
+        and kept on the instance so that computing every percentage does not query the database again.
         :return:
         """
+        result = self.get_frozen_result()
+        if result is not None:
+            return result.choice_results
+        models.prefetch_related_objects([self], 'choice_set')
         return self.choice_set.all()
 
+    def get_page_cache_key(self):
+        """
+        Get the key of cached detail page fragments. It changes whenever referendum is saved or changes status, one of
+        its choices gets a vote, one of its comments changes or categories counters change.
+        :return: a cache key
+        """
+        return ":".join(str(part) for part in [
+            self.pk, self.last_update.timestamp(), get_cache_version(STATE_CACHE_NAMESPACE % self.pk),
+            get_cache_version(TALLY_CACHE_NAMESPACE % self.pk),
+            get_cache_version(COMMENTS_CACHE_NAMESPACE % self.pk), get_cache_version(CATEGORIES_CACHE_NAMESPACE)])
+
+    def get_page_cache_timeout(self):
+        """
+        Get detail page cache timeout. It never exceeds the delay before referendum's next status change (publication,
+        vote start or vote end), since these happen without any save.
+        :return: a number of seconds
+        """
+        timeout = 3600
+        if hasattr(settings, 'REFERENDUM_PAGE_CACHE_TIMEOUT'):
+            timeout = settings.REFERENDUM_PAGE_CACHE_TIMEOUT
+        now = timezone.now()
+        for transition in [self.publication_date, self.event_start, self.event_end]:
+            if transition and transition > now:
+                timeout = min(timeout, int((transition - now).total_seconds()) + 1)
+        return timeout
+
     def has_published(self):
         """
         Grant "orateur" achievement
@@ -300,7 +418,45 @@ class Category(models.Model):
         Get the number of published referendums in category.
         :return: a number of referendums.
         """
-        return self.referendum_set.filter(publication_date__lte=timezone.now()).count()
+        return self.get_published_counts().get(self.pk, 0)
+
+    @staticmethod
+    def get_cache_timeout():
+        """
+        Get categories cache timeout. It never exceeds the delay before next referendum publication since published
+        counts change at that time without any save.
+        :return: a number of seconds
+        """
+        timeout = 3600
+        if hasattr(settings, 'CATEGORIES_CACHE_TIMEOUT'):
+            timeout = settings.CATEGORIES_CACHE_TIMEOUT
+        now = timezone.now()
+        next_publication = Referendum.objects.filter(publication_date__gt=now).aggregate(
+            next_publication=Min('publication_date'))['next_publication']
+        if next_publication:
+            timeout = min(timeout, int((next_publication - now).total_seconds()) + 1)
+        return timeout
+
+    @classmethod
+    def get_categories_with_counts(cls):
+        """
+        Get all categories with their number of published referendums as "nb_published" attribute. Computed with a
+        single query and cached until a referendum or a category changes.
+        :return: a list of categories
+        """
+        return get_or_set_versioned(
+            CATEGORIES_CACHE_NAMESPACE, ["published_counts"],
+            lambda: list(cls.objects.annotate(
+                nb_published=Count('referendum', filter=Q(referendum__publication_date__lte=timezone.now())))),
+            timeout=cls.get_cache_timeout)
+
+    @classmethod
+    def get_published_counts(cls):
+        """
+        Get number of published referendums by category.
+        :return: a dict category pk: number of published referendums
+        """
+        return {category.pk: category.nb_published for category in cls.get_categories_with_counts()}
 
 
 class Choice(models.Model):
@@ -309,6 +465,7 @@ class Choice(models.Model):
     """
     referendum = models.ForeignKey("Referendum", verbose_name="Référendum", on_delete=models.CASCADE)
     title = models.CharField(verbose_name="Libellé du choix", max_length=150)
+    tally = models.PositiveIntegerField(verbose_name="Nombre de votes", default=0, editable=False)
 
     class Meta:
         verbose_name = "Choix"
@@ -334,13 +491,39 @@ class Choice(models.Model):
                     LOGGER.warning(integiry_error)
                     pass
 
+    @classmethod
+    def add_to_tally(cls, choice_id, nb_votes=1):
+        """
+        Atomically update the votes counter of a choice.
+        :param choice_id: a Choice primary key
+        :param nb_votes: number of votes to add (negative to remove votes)
+        """
+        choices = cls.objects.filter(pk=choice_id)
+        if nb_votes < 0:
+            choices = choices.filter(tally__gte=-nb_votes)
+        choices.update(tally=F('tally') + nb_votes)
+
+    @classmethod
+    def rebuild_tallies(cls, queryset=None):
+        """
+        Rebuild votes counters from Vote instances.
+        :param queryset: a Choice queryset to rebuild. All choices by default.
+        :return: number of updated choices
+        """
+        from referendum.models.vote import Vote
+
+        queryset = cls.objects.all() if queryset is None else queryset
+        nb_votes = Vote.objects.filter(choice=OuterRef('pk')).order_by().values('choice').annotate(
+            nb_votes=Count('pk')).values('nb_votes')
+        return queryset.update(tally=Coalesce(Subquery(nb_votes, output_field=models.IntegerField()), Value(0)))
+
     @property
     def nb_votes(self):
         """
         The number of votes for this choice.
         :return: a number of votes
         """
-        return self.vote_set.count()
+        return self.tally
 
     @property
     def votes_percentage(self):
@@ -371,5 +554,27 @@ def referendum_post_save(sender, instance, **kwargs):
     Choice.create_default_choices(referendum=instance)
 
 
+def invalidate_categories_cache(sender, **kwargs):
+    """
+    Launch after Referendum or Category change. Invalidate cached categories counters.
+    """
+    bump_cache_version(CATEGORIES_CACHE_NAMESPACE)
+
+
+def invalidate_creator_counts_cache(sender, instance, **kwargs):
+    """
+    Launch after Referendum creation or deletion. Invalidate cached counters of referendum's creator.
+    """
+    if kwargs.get('created', True):
+        bump_cache_version(USER_COUNTS_CACHE_NAMESPACE % instance.creator_id)
+
+
 post_save.connect(referendum_post_save, sender=Referendum)
+post_save.connect(invalidate_categories_cache, sender=Referendum)
+post_save.connect(invalidate_creator_counts_cache, sender=Referendum)
+post_delete.connect(invalidate_categories_cache, sender=Referendum)
+post_delete.connect(invalidate_creator_counts_cache, sender=Referendum)
+m2m_changed.connect(invalidate_categories_cache, sender=Referendum.categories.through)
+post_save.connect(invalidate_categories_cache, sender=Category)
+post_delete.connect(invalidate_categories_cache, sender=Category)
 post_save.connect(default_notify_observers, sender=Referendum)
@@ -0,0 +1,101 @@
+"""
+Referendum's app:  Referendum result's models
+"""
+import json
+import logging
+from collections import namedtuple
+
+from django.contrib.auth import get_user_model
+from django.db import models, transaction
+from django.utils.functional import cached_property
+
+from referendum.models.referendum import Choice, Referendum, TALLY_CACHE_NAMESPACE
+from referendum.models.transition import ReferendumTransition
+from referendum.signals import referendum_transition
+from riclibre.helpers.cache_helpers import bump_cache_version
+
+LOGGER = logging.getLogger(__name__)
+
+ResultChoice = namedtuple('ResultChoice', ['title', 'nb_votes', 'votes_percentage'])
+
+
+class ReferendumResult(models.Model):
+    """
+    Final results of a referendum, frozen once its vote is over: votes can't change anymore, so results are read from
+    this snapshot instead of being computed again from choices.
+    """
+    referendum = models.OneToOneField("referendum.Referendum", verbose_name="Référendum", related_name="result",
+                                      on_delete=models.CASCADE)
+    choices = models.TextField(verbose_name="Résultats par choix (json)")
+    nb_votes = models.PositiveIntegerField(verbose_name="Nombre de votes")
+    nb_citizens = models.PositiveIntegerField(verbose_name="Nombre de citoyens")
+    turnout = models.FloatField(verbose_name="Participation")
+    creation = models.DateTimeField(verbose_name="Date de création", auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Résultat de référendum"
+        verbose_name_plural = "Résultats de référendums"
+
+    def __str__(self):
+        return f"Résultats du référendum {self.referendum_id} : {self.nb_votes} votes"
+
+    @cached_property
+    def choice_results(self):
+        """
+        Frozen results of each choice, the most voted first.
+        :return: a list of ResultChoice
+        """
+        return [ResultChoice(**choice) for choice in json.loads(self.choices)]
+
+    @classmethod
+    def freeze(cls, referendum_id):
+        """
+        Freeze results of an over referendum. Tallies are rebuilt from votes first, so that the snapshot matches them.
+        Nothing is done if referendum is not over or if its results are already frozen.
+        :param referendum_id: referendum id
+        :return: referendum results, None if referendum is not over
+        """
+        referendum = Referendum.objects.filter(pk=referendum_id).select_related('result').first()
+        if referendum is None or not referendum.is_over:
+            return None
+        if hasattr(referendum, 'result'):
+            return referendum.result
+        with transaction.atomic():
+            choices = Choice.objects.filter(referendum_id=referendum_id)
+            Choice.rebuild_tallies(choices)
+            choices = list(choices)
+            nb_votes = sum(choice.tally for choice in choices)
+            nb_citizens = get_user_model().objects.filter(user_permissions__codename='is_citizen').count()
+            result, created = cls.objects.get_or_create(referendum_id=referendum_id, defaults={
+                'choices': json.dumps([
+                    {'title': choice.title, 'nb_votes': choice.tally,
+                     'votes_percentage': choice.tally / nb_votes * 100 if nb_votes else 0}
+                    for choice in sorted(choices, key=lambda choice: (-choice.tally, choice.pk))]),
+                'nb_votes': nb_votes,
+                'nb_citizens': nb_citizens,
+                'turnout': nb_votes / nb_citizens * 100 if nb_citizens else 0,
+            })
+        if created:
+            transaction.on_commit(lambda: bump_cache_version(TALLY_CACHE_NAMESPACE % referendum_id))
+            LOGGER.info("Results of referendum %s frozen: %s votes.", referendum_id, nb_votes)
+        return result
+
+    @classmethod
+    def freeze_missing(cls):
+        """
+        Freeze results of every over referendum that has none yet.
+        :return: number of frozen results
+        """
+        referendum_ids = Referendum.objects.over().filter(result__isnull=True).values_list('pk', flat=True)
+        return len([referendum_id for referendum_id in referendum_ids if cls.freeze(referendum_id)])
+
+
+def freeze_results_on_vote_end(sender, referendum, kind, **kwargs):
+    """
+    Launch on referendum transition. Freeze results when vote ends.
+    """
+    if kind == ReferendumTransition.VOTE_ENDED:
+        ReferendumResult.freeze(referendum.pk)
+
+
+referendum_transition.connect(freeze_results_on_vote_end, sender=Referendum)
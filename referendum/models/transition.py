@@ -0,0 +1,141 @@
+"""
+Referendum's app:  Referendum transition's models
+"""
+import logging
+
+from django.conf import settings
+from django.db import models, transaction
+from django.utils import timezone
+
+from referendum.models.referendum import Referendum, CATEGORIES_CACHE_NAMESPACE, STATE_CACHE_NAMESPACE
+from referendum.signals import referendum_transition
+from riclibre.helpers.cache_helpers import bump_cache_version
+from riclibre.helpers.metrics_helpers import increment_metric
+
+LOGGER = logging.getLogger(__name__)
+
+
+class ReferendumTransition(models.Model):
+    """
+    A referendum status change, planned by the transitions scan and emitted once as a referendum_transition signal
+    when its instant is reached.
+    """
+    PUBLISHED = "published"
+    VOTE_STARTED = "vote_started"
+    VOTE_ENDED = "vote_ended"
+    KINDS = [
+        (PUBLISHED, "Publication"),
+        (VOTE_STARTED, "Début des votes"),
+        (VOTE_ENDED, "Fin des votes"),
+    ]
+    # referendum field holding the instant of each kind of transition
+    FIELDS = {
+        PUBLISHED: "publication_date",
+        VOTE_STARTED: "event_start",
+        VOTE_ENDED: "event_end",
+    }
+
+    referendum = models.ForeignKey("referendum.Referendum", verbose_name="Référendum", on_delete=models.CASCADE)
+    kind = models.CharField(verbose_name="Type de transition", choices=KINDS, max_length=20)
+    instant = models.DateTimeField(verbose_name="Date de la transition")
+    emitted = models.DateTimeField(verbose_name="Date d'émission", blank=True, null=True)
+
+    class Meta:
+        verbose_name = "Transition de référendum"
+        verbose_name_plural = "Transitions de référendums"
+        constraints = [
+            models.UniqueConstraint(fields=['referendum', 'kind', 'instant'], name='unique_referendum_transition')
+        ]
+        indexes = [models.Index(fields=['emitted', 'instant'], name='referendum_transition_due_idx')]
+
+    def __str__(self):
+        return f"{self.referendum_id} : {self.kind} le {self.instant}"
+
+    @staticmethod
+    def get_window():
+        """
+        Get number of seconds scanned around now for transitions. Transitions missed while scan was not running for
+        less than that are still emitted.
+        :return: a number of seconds
+        """
+        if hasattr(settings, 'REFERENDUM_TRANSITIONS_WINDOW'):
+            return settings.REFERENDUM_TRANSITIONS_WINDOW
+        return 3600
+
+    @classmethod
+    def plan(cls, now):
+        """
+        Record transitions whose instant is in the window around now. Each referendum date field is scanned through
+        its index; already recorded transitions are ignored by the unique constraint.
+        :param now: current date
+        :return: number of scanned transitions
+        """
+        window = timezone.timedelta(seconds=cls.get_window())
+        transitions = []
+        for kind, field in cls.FIELDS.items():
+            transitions += [cls(referendum_id=referendum_id, kind=kind, instant=instant)
+                            for referendum_id, instant in Referendum.objects.filter(
+                                **{f"{field}__gt": now - window, f"{field}__lte": now + window})
+                            .order_by().values_list('pk', field)]
+        cls.objects.bulk_create(transitions, ignore_conflicts=True)
+        return len(transitions)
+
+    def emit(self, now):
+        """
+        Emit transition unless a concurrent scan already did: it is claimed by a conditional update, in the same
+        transaction as receivers, so that a failing receiver makes it emitted again by next scan.
+        Transitions whose referendum date was changed since they were planned are claimed without being emitted.
+        :param now: current date
+        :return: True if transition was emitted
+        """
+        with transaction.atomic():
+            if not ReferendumTransition.objects.filter(pk=self.pk, emitted__isnull=True).update(emitted=now):
+                return False
+            self.emitted = now
+            if getattr(self.referendum, self.FIELDS[self.kind]) != self.instant:
+                LOGGER.info("Transition %s cancelled: referendum date changed.", self)
+                return False
+            referendum_transition.send(sender=Referendum, referendum=self.referendum, kind=self.kind,
+                                       instant=self.instant)
+        LOGGER.info("Transition %s emitted.", self)
+        return True
+
+    @classmethod
+    def emit_due(cls, now):
+        """
+        Emit every transition whose instant is reached, oldest first.
+        :param now: current date
+        :return: number of emitted transitions
+        """
+        nb_emitted = 0
+        for due_transition in cls.objects.filter(emitted__isnull=True, instant__lte=now) \
+                .select_related('referendum').order_by('instant'):
+            try:
+                nb_emitted += due_transition.emit(now)
+            except Exception as receiver_error:  # pylint: disable=broad-except
+                LOGGER.exception("Transition %s not emitted, retried at next scan: %s",
+                                 due_transition, receiver_error)
+        increment_metric("referendum_transitions.emitted", nb_emitted)
+        return nb_emitted
+
+    @classmethod
+    def scan(cls):
+        """
+        Plan upcoming transitions and emit due ones.
+        :return: number of emitted transitions
+        """
+        now = timezone.now()
+        cls.plan(now)
+        return cls.emit_due(now)
+
+
+def invalidate_transition_caches(sender, referendum, kind, **kwargs):
+    """
+    Launch on referendum transition. Invalidate cached pages of referendum, and categories counters on publication.
+    """
+    bump_cache_version(STATE_CACHE_NAMESPACE % referendum.pk)
+    if kind == ReferendumTransition.PUBLISHED:
+        bump_cache_version(CATEGORIES_CACHE_NAMESPACE)
+
+
+referendum_transition.connect(invalidate_transition_caches, sender=Referendum)
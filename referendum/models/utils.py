@@ -7,24 +7,82 @@ from django.db import models
 class FieldUpdateControlMixin(models.Model):
     """
     Mixin that add field update control.
+    Original values of control fields are stored as "__original_<field>" attributes. They are taken from the row
+    hydrating the instance (from_db) and refreshed after each save without querying the database again.
     """
     __control_fields = []
 
     class Meta:
         abstract = True
 
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.update_control_fields(*self.__control_fields)
+    @classmethod
+    def get_control_fields(cls):
+        """
+        Get control fields declared as "__control_fields" by the model or one of its parents.
+        :return: a list of field names
+        """
+        for klass in cls.__mro__:
+            control_fields = klass.__dict__.get("_%s__control_fields" % klass.__name__.lstrip("_"))
+            if control_fields:
+                return list(control_fields)
+        return []
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """
+        Snapshot control fields from the row used to hydrate instance.
+        """
+        instance = super().from_db(db, field_names, values)
+        instance.snapshot_control_fields(
+            *[field for field in cls.get_control_fields() if field in instance.__dict__])
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None):
+        """
+        Snapshot refreshed control fields.
+        """
+        super().refresh_from_db(using=using, fields=fields)
+        control_fields = self.get_control_fields()
+        if fields is not None:
+            control_fields = [field for field in control_fields
+                              if field in fields or self._meta.get_field(field).name in fields]
+        self.snapshot_control_fields(*control_fields)
+
+    def snapshot_control_fields(self, *control_fields):
+        """
+        Store current in memory values of control fields as original values.
+        :param control_fields: field names
+        :return:
+        """
+        for field in control_fields:
+            setattr(self, "__original_%s" % field, getattr(self, field))
 
     def update_control_fields(self, *control_fields):
         """
-        Update control field to monitor changes
+        Update control field to monitor changes. Only fields without original value are fetched from database, in a
+        single query.
         :return:
         """
         fields = control_fields if control_fields else self.__control_fields
-        for field in fields:
-            original_field = "__original_%s" % field
-            if self.pk:
-                old_instance = self._meta.model.objects.get(pk=self.pk)
-                setattr(self, original_field, getattr(old_instance, field))
+        missing_fields = [field for field in fields if not hasattr(self, "__original_%s" % field)]
+        if self.pk and missing_fields:
+            old_values = self._meta.model.objects.filter(pk=self.pk).values(*missing_fields).get()
+            for field in missing_fields:
+                setattr(self, "__original_%s" % field, old_values[field])
+
+
+class AddSeconds(models.Func):
+    """
+    Database side addition of a number of seconds to a datetime: AddSeconds('event_start', 'duration').
+    """
+    arity = 2
+    output_field = models.DateTimeField()
+
+    def as_sql(self, compiler, connection, function=None, template=None, arg_joiner=None, **extra_context):
+        return super().as_sql(compiler, connection, template="(%(expressions)s * INTERVAL '1 second')",
+                              arg_joiner=" + ", **extra_context)
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        # sqlite has no interval type, Django's own dtdelta function works with microseconds
+        return super().as_sql(compiler, connection, template="django_format_dtdelta('+', %(expressions)s * 1000000)",
+                              arg_joiner=", ", **extra_context)
@@ -5,16 +5,20 @@ import logging
 from secrets import token_urlsafe
 
 from django.contrib.auth import get_user_model
-from django.db import models
-from django.db.models.signals import post_save
+from django.db import models, transaction, IntegrityError
+from django.db.models.signals import post_save, post_delete
 
 from referendum.exceptions import UserHasAlreadyVotedError
+from referendum.models.referendum import Choice, TALLY_CACHE_NAMESPACE
 from referendum.models.utils import FieldUpdateControlMixin
+from riclibre.helpers.cache_helpers import bump_cache_version
 from riclibre.helpers.model_watcher import WatchedModel
 from riclibre.helpers.observation_helpers import Observable, default_notify_observers
 
 LOGGER = logging.getLogger(__name__)
 
+TOKEN_GENERATION_MAX_ATTEMPTS = 5
+
 
 class Vote(FieldUpdateControlMixin, models.Model):
     """
@@ -36,6 +40,7 @@ class Vote(FieldUpdateControlMixin, models.Model):
              update_fields=None):
         control_fields = self.__control_fields
         message = None
+        creation = not self.pk
         if self.pk:
             message = "Can't change a vote."
             control_fields = []
@@ -43,9 +48,15 @@ class Vote(FieldUpdateControlMixin, models.Model):
 
         if message:
             LOGGER.warning(message)
-        super(Vote, self).save(force_insert=force_insert, force_update=force_update, using=using,
-                               update_fields=update_fields)
-        self.update_control_fields(*control_fields)
+        with transaction.atomic(savepoint=False):
+            super(Vote, self).save(force_insert=force_insert, force_update=force_update, using=using,
+                                   update_fields=update_fields)
+            if creation:
+                Choice.add_to_tally(self.choice_id)
+                if Vote.choice.is_cached(self):
+                    # keep caller's choice instance in line with database counter
+                    self.choice.tally += 1
+        self.snapshot_control_fields(*control_fields)
 
     @property
     def referendum(self):
@@ -106,35 +117,58 @@ class VoteToken(Observable, FieldUpdateControlMixin, models.Model, metaclass=Wat
 
         if message:
             LOGGER.warning(message)
-        super(VoteToken, self).save(force_insert=force_insert, force_update=force_update, using=using,
-                                    update_fields=update_fields)
+        if self.pk:
+            super(VoteToken, self).save(force_insert=force_insert, force_update=force_update, using=using,
+                                        update_fields=update_fields)
+        else:
+            self.insert_with_unique_token(force_insert=force_insert, force_update=force_update, using=using,
+                                          update_fields=update_fields)
 
-        self.update_control_fields(*control_fields)
+        self.snapshot_control_fields(*control_fields)
+
+    def insert_with_unique_token(self, **save_kwargs):
+        """
+        Insert a new token relying on database unique constraint: on a token collision, generate another token and
+        retry. Other integrity errors (e.g. user already got a token for this referendum) are raised.
+        :param save_kwargs: Model.save arguments
+        :return:
+        """
+        for attempt in range(1, TOKEN_GENERATION_MAX_ATTEMPTS + 1):
+            try:
+                with transaction.atomic(using=save_kwargs.get('using')):
+                    super(VoteToken, self).save(**save_kwargs)
+                return
+            except IntegrityError:
+                if attempt == TOKEN_GENERATION_MAX_ATTEMPTS or not VoteToken.objects.filter(token=self.token).exists():
+                    raise
+                LOGGER.warning("Vote token collision, generating a new one.")
+                self.token = self.generate_token()
 
     @classmethod
     def generate_token(cls):
         """
-        generate a unique token
+        generate a random token. Its uniqueness is guaranteed by database constraint when token is saved.
         :return:
         """
-        token = ""
-        while not token or token in cls.objects.all().values('token'):
-            token = token_urlsafe(30)
-        return token
+        return token_urlsafe(30)
 
     def vote(self, choice):
         """
-        register a vote
+        register a vote. In a single transaction: token is flagged as used by a conditional update, that locks its row
+        and makes concurrent submissions fail, then vote is inserted and choice's tally is increased.
+        Observers are notified once transaction succeeded.
         :return:
         """
-        if not self.voted:
-            new_vote = Vote(choice=choice)
-            new_vote.save()
-            self.voted = True
-            self.save()
-            # return new_vote
-        else:
+        if self.voted:
             raise UserHasAlreadyVotedError
+        with transaction.atomic():
+            if not VoteToken.objects.filter(pk=self.pk, voted=False).update(voted=True):
+                self.voted = True
+                raise UserHasAlreadyVotedError
+            Vote(choice=choice).save()
+        self.voted = True
+        self.snapshot_control_fields("voted")
+        self.notify()
 
     def has_voted(self):
         """
@@ -144,4 +178,22 @@ class VoteToken(Observable, FieldUpdateControlMixin, models.Model, metaclass=Wat
         return self.voted, self.user
 
 
+def vote_post_delete(sender, instance, **kwargs):
+    """
+    Launch after Vote instance deletion. Keep choice's votes counter up to date.
+    """
+    Choice.add_to_tally(instance.choice_id, -1)
+
+
+def invalidate_tally_cache(sender, instance, **kwargs):
+    """
+    Launch after Vote creation or deletion. Invalidate cached pages of vote's referendum.
+    """
+    if kwargs.get('created', True):
+        bump_cache_version(TALLY_CACHE_NAMESPACE % instance.choice.referendum_id)
+
+
+post_delete.connect(vote_post_delete, sender=Vote)
+post_save.connect(invalidate_tally_cache, sender=Vote)
+post_delete.connect(invalidate_tally_cache, sender=Vote)
 post_save.connect(default_notify_observers, sender=VoteToken)
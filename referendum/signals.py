@@ -0,0 +1,7 @@
+"""
+Referendum's app: custom signals
+"""
+from django.dispatch import Signal
+
+# Sent once per referendum status change (publication, vote start, vote end), when it happens.
+referendum_transition = Signal(providing_args=["referendum", "kind", "instant"])
@@ -43,4 +43,7 @@ class ReferendumSitemap(Sitemap):
     priority = 0.9
 
     def items(self):
-        Referendum.objects.filter(publication_date__isnull=False)
+        return Referendum.objects.published().order_by('publication_date')
+
+    def lastmod(self, obj):
+        return obj.last_update
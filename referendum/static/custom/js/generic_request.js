@@ -5,7 +5,7 @@ let genericGetRequest = function (url, callback) {
     req.onreadystatechange = function (event) {
         if (this.readyState == XMLHttpRequest.DONE) {
             if (this.status === 200) {
-                callback()
+                callback(this.responseText)
             } else {
                 console.log("Status de la réponse: %d (%s)", this.status, this.statusText)
             }
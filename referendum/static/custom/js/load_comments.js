@@ -0,0 +1,41 @@
+let moreComments = document.querySelector('#more_comments');
+
+let addLoaded = function (loaded) {
+    let page = JSON.parse(loaded);
+    page.comments.forEach((loadedComment) => {
+        if (document.querySelector('#comment_' + loadedComment.pk) !== null) {
+            return
+        }
+        let card = fake_card.cloneNode(true);
+
+        card.setAttribute('id', 'comment_' + loadedComment.pk);
+        card.querySelector(".comment-text").textContent = loadedComment.text;
+        card.querySelector(".comment-author").textContent = loadedComment.author;
+        card.querySelector(".comment-publication-date").innerHTML = loadedComment.publication_date;
+        card.querySelector(".comment-publication-time").innerHTML = loadedComment.publication_time;
+        card.querySelector(".comment-last_update-date").innerHTML = loadedComment.last_update_date;
+        card.querySelector(".comment-last_update-time").innerHTML = loadedComment.last_update_time;
+        card.querySelector('.comment_update_form').action = loadedComment.update_url;
+        if (!loadedComment.editable) {
+            card.querySelectorAll('.update_button, .cancel_update, .update_submit').forEach((button) => {
+                button.remove()
+            });
+        }
+        moreComments.parentNode.insertBefore(card, moreComments);
+        toggleElementHide(card);
+        cardAddEventListeners(card);
+    });
+    if (page.next_url) {
+        moreComments.querySelector('#more_comments_button').setAttribute('data-url', page.next_url);
+    } else {
+        moreComments.remove();
+    }
+};
+
+
+if (moreComments !== null) {
+    moreComments.querySelector('#more_comments_button').addEventListener('click', function (event) {
+        event.preventDefault();
+        genericGetRequest(event.target.closest('button').getAttribute('data-url'), addLoaded)
+    });
+}
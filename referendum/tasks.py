@@ -5,9 +5,8 @@ Referendum checker apps : tasks module
 import logging
 
 from celery import task
-from django.utils import timezone
 
-from referendum.models import Identity, manage_citizen_perm
+from referendum.models import Identity, OutgoingEmail, ReferendumResult, ReferendumTransition
 
 LOGGER = logging.getLogger(__name__)
 
@@ -17,9 +16,7 @@ def remove_citizen_perm_job():
     """
     add a check citizen perms job to queue
     """
-    identities = Identity.objects.filter(valid_until__lte=timezone.now())
-    for identity in identities:
-        manage_citizen_perm(Identity, identity)
+    return Identity.revoke_expired_citizen_perms()
 
 
 @task()
@@ -27,4 +24,36 @@ def clean_identities_job():
     """
     add a identities clean job.
     """
-    Identity.clean_identities()
+    return Identity.clean_identities()
+
+
+@task()
+def send_outgoing_emails():
+    """
+    Send a batch of queued emails.
+    """
+    return OutgoingEmail.send_batch()
+
+
+@task()
+def purge_sent_emails():
+    """
+    Delete old sent emails.
+    """
+    return OutgoingEmail.purge_sent()
+
+
+@task()
+def freeze_over_referendums_results():
+    """
+    Freeze results of over referendums whose results were not frozen when their vote ended.
+    """
+    return ReferendumResult.freeze_missing()
+
+
+@task()
+def scan_referendum_transitions():
+    """
+    Plan upcoming referendum transitions and emit due ones.
+    """
+    return ReferendumTransition.scan()
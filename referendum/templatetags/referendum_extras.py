@@ -6,7 +6,8 @@ import logging
 from django import template
 from django.contrib.auth.models import AnonymousUser
 
-from referendum.models import VoteToken, Like
+from referendum.models import VoteToken, Like, USER_COUNTS_CACHE_NAMESPACE
+from riclibre.helpers.cache_helpers import get_or_set_versioned
 
 LOGGER = logging.getLogger(__name__)
 register = template.Library()
@@ -37,13 +38,16 @@ def verbose_name_filter(obj, field_name):
 @register.simple_tag
 def user_has_voted(referendum, user):
     """
-    Check if a given user has voted for a given referendum.
+    Check if a given user has voted for a given referendum. Use "user_voted" annotation when referendum comes from
+    ReferendumQuerySet.with_user_state.
     :param referendum: a Referendum instance.
     :param user: a user model instance.
     :return: a boolean
     """
     if isinstance(user, AnonymousUser):
         return False
+    if getattr(referendum, 'user_voted', None) is not None:
+        return referendum.user_voted
     try:
         token = VoteToken.objects.get(referendum=referendum, user=user)
         return token.voted
@@ -55,11 +59,28 @@ def user_has_voted(referendum, user):
 @register.simple_tag
 def like_referendum(referendum, user):
     """
-    Check if a given user likes a given referendum.
+    Check if a given user likes a given referendum. Use "user_liked" annotation when referendum comes from
+    ReferendumQuerySet.with_user_state.
     :param referendum: a Referendum instance.
     :param user: a user model instance.
     :return: a boolean
     """
     if isinstance(user, AnonymousUser):
         return False
+    if getattr(referendum, 'user_liked', None) is not None:
+        return referendum.user_liked
     return Like.objects.filter(referendum=referendum, user=user).exists()
+
+
+@register.simple_tag
+def get_user_counts(user):
+    """
+    Get number of referendums created and liked by a given user. Cached until user creates a referendum or likes one.
+    :param user: a user model instance.
+    :return: a dict
+    """
+    if isinstance(user, AnonymousUser):
+        return {"referendums": 0, "likes": 0}
+    return get_or_set_versioned(
+        USER_COUNTS_CACHE_NAMESPACE % user.pk, ["counts"],
+        lambda: {"referendums": user.referendum_set.count(), "likes": user.like_set.count()})
@@ -0,0 +1,128 @@
+"""
+Referendum's app: benchmarks. Run with "make benchmark", excluded from default test run.
+"""
+
+import logging
+import time
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Permission
+from django.db import connection
+from django.test import TestCase, tag
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from referendum.models import Referendum, VoteToken, Identity, manage_citizen_perm
+from referendum.tests import get_referendum_test_data, create_test_user
+
+LOGGER = logging.getLogger(__name__)
+
+
+@tag('benchmark')
+class VoteTokenBenchmark(TestCase):
+    """
+    Check that vote token creation latency does not depend on vote token table size.
+    """
+    TABLE_SIZES = (0, 20000, 100000)
+    NB_MEASURED_TOKENS = 50
+
+    def setUp(self):
+        self.user = create_test_user('Azer123@')
+        self.referendum = Referendum.objects.create(**get_referendum_test_data(self.user))
+        self.nb_batches = 0
+
+    def create_users(self, number):
+        """
+        Bulk create users without tokens.
+        """
+        self.nb_batches += 1
+        prefix = "bench%s_" % self.nb_batches
+        get_user_model().objects.bulk_create(
+            [get_user_model()(email="%s%s@test.fr" % (prefix, index), username="%s%s" % (prefix, index))
+             for index in range(number)])
+        return list(get_user_model().objects.filter(username__startswith=prefix))
+
+    def fill_table(self, size):
+        """
+        Bulk create vote tokens until table reaches given size.
+        """
+        missing = size - VoteToken.objects.count()
+        if missing > 0:
+            VoteToken.objects.bulk_create(
+                [VoteToken(referendum=self.referendum, user=user, token=VoteToken.generate_token())
+                 for user in self.create_users(missing)])
+
+    def measure(self):
+        """
+        Measure average token creation time.
+        """
+        users = self.create_users(self.NB_MEASURED_TOKENS)
+        start = time.perf_counter()
+        for user in users:
+            VoteToken.objects.create(referendum=self.referendum, user=user)
+        return (time.perf_counter() - start) / self.NB_MEASURED_TOKENS
+
+    def test_flat_latency(self):
+        """
+        Token creation time stays flat while table grows.
+        """
+        latencies = []
+        for size in self.TABLE_SIZES:
+            self.fill_table(size)
+            latency = self.measure()
+            LOGGER.info("%s tokens in table: %.2f ms per token creation", size, latency * 1000)
+            latencies.append(latency)
+        self.assertLess(latencies[-1], latencies[0] * 3)
+
+
+@tag('benchmark')
+class IdentityExpiryBenchmark(TestCase):
+    """
+    Check that identities expiry jobs run in a constant number of queries.
+    """
+    NB_USERS = 20000
+    IDENTITIES_PER_USER = 5
+    NB_LEGACY_IDENTITIES = 500
+
+    def setUp(self):
+        self.permission = Permission.objects.get(codename='is_citizen')
+        get_user_model().objects.bulk_create(
+            [get_user_model()(email="citizen%s@test.fr" % index, username="citizen%s" % index)
+             for index in range(self.NB_USERS)])
+        self.users = list(get_user_model().objects.filter(username__startswith="citizen"))
+        now = timezone.now()
+        # every fifth user still has a valid identity
+        Identity.objects.bulk_create(
+            [Identity(user=user, valid_until=now + timezone.timedelta(days=-index if index or rank % 5 else 1))
+             for rank, user in enumerate(self.users) for index in range(self.IDENTITIES_PER_USER)])
+        get_user_model().user_permissions.through.objects.bulk_create(
+            [get_user_model().user_permissions.through(customuser=user, permission=self.permission)
+             for user in self.users])
+
+    def legacy_revoke(self):
+        """
+        Former implementation, one permission check per expired identity, measured on a sample.
+        """
+        start = time.perf_counter()
+        for identity in Identity.objects.filter(valid_until__lte=timezone.now())[:self.NB_LEGACY_IDENTITIES]:
+            manage_citizen_perm(Identity, identity)
+        return (time.perf_counter() - start) / self.NB_LEGACY_IDENTITIES
+
+    def test_set_based_expiry(self):
+        """
+        Permissions revocation and identities cleaning cost a few queries whatever the number of identities.
+        """
+        nb_identities = Identity.objects.count()
+        legacy_latency = self.legacy_revoke()
+        with CaptureQueriesContext(connection) as context:
+            start = time.perf_counter()
+            Identity.revoke_expired_citizen_perms()
+            Identity.clean_identities()
+            duration = time.perf_counter() - start
+        LOGGER.info("%s identities: former revocation %.2f ms per identity (%.0f s extrapolated), set based revocation "
+                    "and cleaning %.2f s in %s queries", nb_identities, legacy_latency * 1000,
+                    legacy_latency * nb_identities, duration, len(context.captured_queries))
+        self.assertLessEqual(len(context.captured_queries), 8)
+        self.assertLess(duration, legacy_latency * nb_identities)
+        self.assertEqual(get_user_model().user_permissions.through.objects.filter(permission=self.permission).count(),
+                         self.NB_USERS // 5)
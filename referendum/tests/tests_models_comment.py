@@ -4,4 +4,127 @@ Referendum's app: Comment's model's tests
 
 import logging
 
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from referendum.models import Referendum, Comment, Report
+from referendum.tests import get_referendum_test_data, create_test_user
+
 LOGGER = logging.getLogger(__name__)
+
+
+class CommentPageTestCase(TestCase):
+    """
+    Test comments keyset pagination.
+    """
+
+    def setUp(self):
+        self.user = create_test_user('Azer123@')
+        self.referendum = Referendum.objects.create(**get_referendum_test_data(self.user))
+        comments = Comment.objects.bulk_create([Comment(referendum=self.referendum, user=self.user, text=str(index))
+                                                for index in range(7)])
+        # comments 2 and 3 share the same publication date, id breaks the tie
+        publication_date = timezone.now()
+        for index, delta in enumerate([6, 5, 4, 4, 3, 2, 1]):
+            Comment.objects.filter(referendum=self.referendum, text=str(index)) \
+                .update(publication_date=publication_date - timezone.timedelta(minutes=delta))
+        self.expected = list(Comment.objects.filter(referendum=self.referendum).order_by('-publication_date', '-pk'))
+        self.assertEqual(len(comments), len(self.expected))
+
+    def test_cursor_round_trip(self):
+        """
+        Test that a cursor gives back publication date and id of the comment it was built from.
+        :return:
+        """
+        comment = self.expected[0]
+        self.assertEqual(Comment.decode_cursor(Comment.encode_cursor(comment)),
+                         (comment.publication_date, comment.pk))
+        for cursor in ["", "abc", "12_ab", "1_2_3", None]:
+            with self.assertRaises(ValueError):
+                Comment.decode_cursor(cursor)
+
+    def test_pages(self):
+        """
+        Test that following cursors walks through every comment once, in order, one query per page.
+        :return:
+        """
+        pages, cursor = [], None
+        while True:
+            with self.assertNumQueries(1):
+                comments, cursor = Comment.get_page(self.referendum.pk, cursor, per_page=3)
+                # users are fetched with comments
+                [comment.user.username for comment in comments]  # pylint: disable=expression-not-assigned
+            pages.append(comments)
+            if cursor is None:
+                break
+        self.assertEqual([len(page) for page in pages], [3, 3, 1])
+        self.assertEqual([comment for page in pages for comment in page], self.expected)
+
+    def test_exact_last_page(self):
+        """
+        Test that a full last page has no next cursor.
+        :return:
+        """
+        comments, cursor = Comment.get_page(self.referendum.pk, per_page=7)
+        self.assertEqual(comments, self.expected)
+        self.assertIsNone(cursor)
+
+
+@override_settings(COMMENT_REPORTS_THRESHOLD=2)
+class CommentModerationTestCase(TestCase):
+    """
+    Test reported comments moderation.
+    """
+
+    def setUp(self):
+        self.user = create_test_user('Azer123@')
+        self.referendum = Referendum.objects.create(**get_referendum_test_data(self.user))
+        self.comments = Comment.objects.bulk_create([Comment(referendum=self.referendum, user=self.user,
+                                                             text=str(index)) for index in range(3)])
+        self.comments = list(Comment.objects.order_by('pk'))
+
+    def test_report_count(self):
+        """
+        Test that comments are annotated with their number of reports.
+        :return:
+        """
+        Report.objects.bulk_create([Report(comment=self.comments[0], user=self.user, text="spam")] * 2
+                                   + [Report(comment=self.comments[1], user=self.user, text="spam")])
+        with self.assertNumQueries(1):
+            counts = {comment.pk: comment.nb_reports for comment in Comment.objects.with_report_count()}
+        self.assertEqual(counts, {self.comments[0].pk: 2, self.comments[1].pk: 1, self.comments[2].pk: 0})
+        self.assertEqual(set(Comment.objects.reported()), set(self.comments[:2]))
+        self.assertEqual(list(Comment.objects.reported(2)), self.comments[:1])
+
+    def test_hide_reported(self):
+        """
+        Test that comments reaching reports threshold are hidden in a single update query.
+        :return:
+        """
+        Report.objects.bulk_create([Report(comment=comment, user=self.user, text="spam")
+                                    for comment in self.comments[:2] for _ in range(2)])
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(Comment.hide_reported(comment_ids=[self.comments[1].pk]), 1)
+        self.assertEqual(len(queries), 2)
+        # reports are only grouped for the given comments
+        self.assertIn('WHERE U0."comment_id" IN', queries[0]['sql'])
+        with self.assertNumQueries(2):
+            self.assertEqual(Comment.hide_reported(), 1)
+        self.assertEqual(list(Comment.objects.visible()), self.comments[2:])
+        self.assertEqual(Comment.hide_reported(), 0)
+
+    def test_report_hides_comment(self):
+        """
+        Test that a comment is hidden when reported beyond threshold, and that hidden comments are not paged.
+        :return:
+        """
+        Report.objects.create(comment=self.comments[0], user=self.user, text="spam")
+        self.assertTrue(Comment.objects.get(pk=self.comments[0].pk).visible)
+        Report.objects.create(comment=self.comments[0], user=self.user, text="spam")
+        self.assertFalse(Comment.objects.get(pk=self.comments[0].pk).visible)
+
+        comments, _ = Comment.get_page(self.referendum.pk)
+        self.assertNotIn(self.comments[0], comments)
+        self.assertEqual(len(comments), 2)
@@ -3,16 +3,30 @@ Referendum's app: Identity's model's tests
 """
 
 import logging
+import os
+import tempfile
+from unittest import mock
 
 from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
 from django.contrib.auth.models import Permission
-from django.test import TestCase
+from django.core.cache import cache
+from django.core.cache.backends.filebased import FileBasedCache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
 from django.utils import timezone
 
 from referendum.models import Identity
 
 LOGGER = logging.getLogger(__name__)
 
+# a file based cache is shared between processes, like production cache
+SHARED_CACHE_LOCATION = os.path.join(tempfile.gettempdir(), 'riclibre_tests_cache')
+SHARED_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+                             'LOCATION': SHARED_CACHE_LOCATION}}
+
 
 class IdentityTestCase(TestCase):
     """
@@ -92,3 +106,137 @@ class IdentityTestCase(TestCase):
         identity.delete()
         self.user = get_user_model().objects.get(pk=self.user.pk)
         self.assertFalse(self.user.has_perm(self.permission_name))
+
+    def create_expired_and_valid_citizens(self):
+        """
+        Give citizen permission to two users, one with an expired identity only and one that also has a valid
+        identity.
+        """
+        other_user = get_user_model().objects.create(username='other', email='other@test.fr')
+        for user in (self.user, other_user):
+            Identity.objects.create(user=user, valid_until=timezone.now() + timezone.timedelta(days=2))
+            Identity.objects.filter(user=user).update(valid_until=timezone.now() - timezone.timedelta(days=1))
+            user.user_permissions.add(self.permission)
+        Identity.objects.create(user=other_user, valid_until=timezone.now() + timezone.timedelta(days=2))
+        return other_user
+
+    def test_revoke_expired_citizen_perms(self):
+        """
+        Test that citizen permission is removed in a single query from users whose identities are all expired.
+        """
+        other_user = self.create_expired_and_valid_citizens()
+        with self.assertNumQueries(1):
+            self.assertEqual(Identity.revoke_expired_citizen_perms(), 1)
+        self.assertFalse(get_user_model().objects.get(pk=self.user.pk).has_perm(self.permission_name))
+        self.assertTrue(get_user_model().objects.get(pk=other_user.pk).has_perm(self.permission_name))
+
+    def test_clean_identities(self):
+        """
+        Test that expired identities are deleted at once and permissions revoked accordingly.
+        """
+        other_user = self.create_expired_and_valid_citizens()
+        with CaptureQueriesContext(connection) as context:
+            self.assertEqual(Identity.clean_identities(), 2)
+        self.assertEqual(len([query for query in context.captured_queries
+                              if query['sql'].startswith('DELETE')]), 2)
+        self.assertEqual(Identity.objects.filter(valid_until__lte=timezone.now()).count(), 0)
+        self.assertEqual(Identity.objects.filter(user=other_user).count(), 1)
+        self.assertFalse(get_user_model().objects.get(pk=self.user.pk).has_perm(self.permission_name))
+        self.assertTrue(get_user_model().objects.get(pk=other_user.pk).has_perm(self.permission_name))
+
+
+@override_settings(CACHES=SHARED_CACHES)
+class CitizenStatusCacheTestCase(TestCase):
+    """
+    Test cached citizen status.
+    """
+    fixtures = ['test_data.json']
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.permission = Permission.objects.get(codename='is_citizen')
+        self.user = get_user_model().objects.filter(is_superuser=False, is_staff=False).first()
+        self.user.user_permissions.remove(self.permission)
+
+    def get_user(self):
+        """
+        Get a fresh user instance, without Django's permission cache.
+        """
+        return get_user_model().objects.get(pk=self.user.pk)
+
+    def test_status_cached(self):
+        """
+        Test that citizen status is computed once.
+        """
+        Identity.objects.create(user=self.user, valid_until=timezone.now() + timezone.timedelta(days=2))
+        self.assertTrue(Identity.is_citizen(self.get_user()))
+        user = self.get_user()
+        with self.assertNumQueries(0):
+            self.assertTrue(Identity.is_citizen(user))
+
+    def test_invalidated_by_identity(self):
+        """
+        Test that identity changes invalidate status.
+        """
+        self.assertFalse(Identity.is_citizen(self.get_user()))
+        identity = Identity.objects.create(user=self.user, valid_until=timezone.now() + timezone.timedelta(days=2))
+        self.assertTrue(Identity.is_citizen(self.get_user()))
+        identity.delete()
+        self.assertFalse(Identity.is_citizen(self.get_user()))
+
+    def test_invalidated_by_permission_change(self):
+        """
+        Test that permission granted or removed directly invalidates status.
+        """
+        self.assertFalse(Identity.is_citizen(self.get_user()))
+        self.user.user_permissions.add(self.permission)
+        self.assertTrue(Identity.is_citizen(self.get_user()))
+        self.permission.user_set.remove(self.user)
+        self.assertFalse(Identity.is_citizen(self.get_user()))
+
+    def test_expired_identity(self):
+        """
+        Test that status ends with identity validity, before permission is revoked, and that revocation invalidates
+        status.
+        """
+        Identity.objects.create(user=self.user, valid_until=timezone.now() + timezone.timedelta(days=2))
+        self.assertTrue(Identity.is_citizen(self.get_user()))
+        Identity.objects.filter(user=self.user).update(valid_until=timezone.now() - timezone.timedelta(days=1))
+        cache.clear()
+        self.assertFalse(Identity.is_citizen(self.get_user()))
+        self.assertTrue(self.get_user().has_perm('referendum.is_citizen'))
+        Identity.revoke_expired_citizen_perms()
+        self.assertFalse(Identity.is_citizen(self.get_user()))
+
+    def test_anonymous_user(self):
+        """
+        Test that anonymous users are not citizens and cannot reach vote page.
+        """
+        self.assertFalse(Identity.is_citizen(AnonymousUser()))
+        response = self.client.get(reverse('vote', kwargs={'token': 'token'}))
+        self.assertEqual(response.status_code, 403)
+
+    def test_invalidated_from_another_client(self):
+        """
+        Test that status invalidated by another process, with its own cache client, is seen by readers.
+        """
+        Identity.objects.create(user=self.user, valid_until=timezone.now() + timezone.timedelta(days=2))
+        self.assertTrue(Identity.is_citizen(self.get_user()))
+        Identity.objects.filter(user=self.user).update(valid_until=timezone.now() - timezone.timedelta(days=1))
+        worker_cache = FileBasedCache(SHARED_CACHE_LOCATION, {})
+        with mock.patch('referendum.models.identity.cache', worker_cache), \
+                mock.patch('riclibre.helpers.cache_helpers.cache', worker_cache):
+            self.assertEqual(Identity.revoke_expired_citizen_perms(), 1)
+        self.assertFalse(Identity.is_citizen(self.get_user()))
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_not_cached_per_process(self):
+        """
+        Test that status is not cached by a cache local to the process, that other processes can't invalidate.
+        """
+        self.user.user_permissions.add(self.permission)
+        self.assertTrue(Identity.is_citizen(self.get_user()))
+        # permission removed without any signal, as another process would do it
+        revoked = self.user.user_permissions.through.objects.filter(customuser_id=self.user.pk)
+        revoked._raw_delete(revoked.db)  # pylint: disable=protected-access
+        self.assertFalse(Identity.is_citizen(self.get_user()))
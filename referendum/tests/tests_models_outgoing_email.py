@@ -0,0 +1,123 @@
+"""
+Referendum's app: OutgoingEmail's model's tests
+"""
+import json
+import logging
+from unittest import mock
+
+from django.core import mail
+from django.core.mail import EmailMessage
+from django.template import loader
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from referendum.models import OutgoingEmail
+from referendum.tasks import send_outgoing_emails, purge_sent_emails
+from referendum.tests import create_test_user
+
+LOGGER = logging.getLogger(__name__)
+
+
+class OutgoingEmailTestCase(TestCase):
+    """
+    Test email outbox.
+    """
+
+    def test_enqueue_only(self):
+        """
+        Test that queued emails are not sent before sending task runs.
+        """
+        OutgoingEmail.enqueue('sujet', ['test@test.fr'], 'contact@test.fr', body='corps')
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(send_outgoing_emails.apply().get(), 1)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].body, 'corps')
+        self.assertEqual(mail.outbox[0].to, ['test@test.fr'])
+        self.assertEqual(OutgoingEmail.objects.get().status, OutgoingEmail.SENT)
+        self.assertEqual(send_outgoing_emails.apply().get(), 0)
+
+    def test_batch_single_connection(self):
+        """
+        Test that a batch is sent over one connection and each template is loaded once.
+        """
+        for index in range(3):
+            OutgoingEmail.enqueue('sujet', ['test%s@test.fr' % index], 'contact@test.fr',
+                                  template_name='registration/account_activation_email.html',
+                                  context={'site_name': 'site%s' % index, 'uid': 'MQ', 'token': 'token'})
+        with mock.patch('referendum.models.outgoing_email.get_connection',
+                        wraps=mail.get_connection) as get_connection, \
+                mock.patch.object(loader, 'get_template', wraps=loader.get_template) as get_template:
+            self.assertEqual(OutgoingEmail.send_batch(), 3)
+        get_connection.assert_called_once()
+        get_template.assert_called_once()
+        self.assertIn('site2', mail.outbox[2].body)
+        # activation tokens are not kept once sent
+        self.assertFalse(OutgoingEmail.objects.exclude(context='').exists())
+
+    @override_settings(EMAIL_OUTBOX_BATCH_SIZE=2)
+    def test_batch_size(self):
+        """
+        Test that batches are bounded.
+        """
+        for _ in range(3):
+            OutgoingEmail.enqueue('sujet', ['test@test.fr'], 'contact@test.fr', body='corps')
+        self.assertEqual(OutgoingEmail.send_batch(), 2)
+        self.assertEqual(OutgoingEmail.send_batch(), 1)
+
+    @override_settings(EMAIL_OUTBOX_MAX_ATTEMPTS=2, EMAIL_OUTBOX_RETRY_DELAY=60)
+    def test_retry_with_backoff(self):
+        """
+        Test that failed emails are retried later, until max attempts is reached.
+        """
+        outgoing_email = OutgoingEmail.enqueue('sujet', ['test@test.fr'], 'contact@test.fr', body='corps')
+        with mock.patch.object(EmailMessage, 'send', side_effect=ConnectionError("refused")):
+            self.assertEqual(OutgoingEmail.send_batch(), 0)
+            outgoing_email.refresh_from_db()
+            self.assertEqual(outgoing_email.status, OutgoingEmail.WAIT)
+            self.assertEqual(outgoing_email.attempts, 1)
+            self.assertGreater(outgoing_email.next_attempt, timezone.now() + timezone.timedelta(seconds=50))
+            # not retried before next attempt date
+            self.assertEqual(OutgoingEmail.send_batch(), 0)
+            self.assertEqual(OutgoingEmail.objects.get().attempts, 1)
+
+            OutgoingEmail.objects.update(next_attempt=timezone.now())
+            OutgoingEmail.send_batch()
+        outgoing_email.refresh_from_db()
+        self.assertEqual(outgoing_email.status, OutgoingEmail.FAILED)
+        self.assertEqual(outgoing_email.last_error, "refused")
+
+    @override_settings(EMAIL_OUTBOX_RETENTION_DAYS=30)
+    def test_purge_sent(self):
+        """
+        Test that only old sent emails are purged.
+        """
+        for _ in range(3):
+            OutgoingEmail.enqueue('sujet', ['test@test.fr'], 'contact@test.fr', body='corps')
+        OutgoingEmail.send_batch()
+        old_email = OutgoingEmail.objects.first()
+        OutgoingEmail.objects.filter(pk=old_email.pk).update(sent=timezone.now() - timezone.timedelta(days=31))
+        OutgoingEmail.enqueue('sujet', ['test@test.fr'], 'contact@test.fr', body='corps')
+        self.assertEqual(purge_sent_emails(), 1)
+        self.assertFalse(OutgoingEmail.objects.filter(pk=old_email.pk).exists())
+        self.assertEqual(OutgoingEmail.objects.count(), 3)
+
+    def test_stale_claims_released(self):
+        """
+        Test that emails claimed by a task that died are sent again.
+        """
+        OutgoingEmail.enqueue('sujet', ['test@test.fr'], 'contact@test.fr', body='corps')
+        OutgoingEmail.objects.update(status=OutgoingEmail.SENDING,
+                                     next_attempt=timezone.now() - timezone.timedelta(hours=1))
+        self.assertEqual(OutgoingEmail.send_batch(), 1)
+
+    def test_password_reset_queued(self):
+        """
+        Test that password reset email is queued with a json context.
+        """
+        user = create_test_user('Azer123@')
+        self.client.post(reverse('password_reset'), {'email': user.email})
+        outgoing_email = OutgoingEmail.objects.get()
+        self.assertEqual(json.loads(outgoing_email.recipients), [user.email])
+        send_outgoing_emails.apply()
+        self.assertIn(user.get_username(), mail.outbox[0].body)
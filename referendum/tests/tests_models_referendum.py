@@ -5,10 +5,13 @@ Referendum's app: Referendum's model's tests
 import logging
 
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.cache import cache
+from django.core.management import call_command
+from django.template.loader import render_to_string
+from django.test import TestCase, override_settings
 from django.utils import timezone
 
-from referendum.models import Referendum, Vote, Choice
+from referendum.models import Referendum, Vote, Choice, Category, Like
 from referendum.tests import get_referendum_test_data, create_test_user
 
 LOGGER = logging.getLogger(__name__)
@@ -144,6 +147,140 @@ class ReferendumTestCase(TestCase):
         self.assertEqual(old_value, new_referendum.title)
 
 
+class ReferendumQuerySetTestCase(TestCase):
+    """
+    Test ReferendumQuerySet status filters.
+    """
+    fixtures = ['test_data.json']
+
+    def setUp(self):
+        self.user = create_test_user('Azer123@')
+        now = timezone.now()
+        dates = {
+            "upcoming": (now - timezone.timedelta(days=20), now + timezone.timedelta(days=1)),
+            "in progress": (now - timezone.timedelta(days=20), now - timezone.timedelta(hours=1)),
+            "over": (now - timezone.timedelta(days=20), now - timezone.timedelta(days=2)),
+            "not published": (now + timezone.timedelta(days=2), None),
+        }
+        for title, (publication_date, event_start) in dates.items():
+            Referendum.objects.create(title=title, description=title, question=title, creator=self.user,
+                                      publication_date=publication_date, event_start=event_start)
+
+    def assert_filter_matches(self, queryset, status):
+        """
+        Check that a queryset contains exactly referendums with given status property.
+        """
+        expected = {referendum.pk for referendum in Referendum.objects.all() if getattr(referendum, status)}
+        self.assertEqual({referendum.pk for referendum in queryset}, expected)
+
+    def test_published(self):
+        """
+        Test published filter.
+        """
+        self.assert_filter_matches(Referendum.objects.published(), "is_published")
+        self.assertNotIn("not published", Referendum.objects.published().values_list('title', flat=True))
+
+    def test_in_progress(self):
+        """
+        Test in progress filter.
+        """
+        self.assert_filter_matches(Referendum.objects.in_progress(), "is_in_progress")
+        self.assertEqual(list(Referendum.objects.in_progress().values_list('title', flat=True)), ["in progress"])
+
+    def test_over(self):
+        """
+        Test over filter.
+        """
+        self.assert_filter_matches(Referendum.objects.over(), "is_over")
+        self.assertIn("over", Referendum.objects.over().values_list('title', flat=True))
+
+    def test_upcoming(self):
+        """
+        Test upcoming and not over filters.
+        """
+        self.assertEqual(list(Referendum.objects.upcoming().values_list('title', flat=True)), ["upcoming"])
+        self.assertEqual(set(Referendum.objects.not_over().values_list('title', flat=True)),
+                         {"upcoming", "in progress"})
+
+    def test_stored_event_end(self):
+        """
+        Test that stored vote end follows event start and duration.
+        """
+        referendum = Referendum.objects.get(title="upcoming")
+        self.assertEqual(referendum.event_end,
+                         referendum.event_start + timezone.timedelta(seconds=referendum.duration))
+        referendum.event_start = referendum.event_start + timezone.timedelta(days=1)
+        referendum.save()
+        referendum.refresh_from_db()
+        self.assertEqual(referendum.event_end, referendum.compute_event_end())
+        self.assertEqual(Referendum.objects.get(title="not published").event_end, None)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class CategoryCacheTestCase(TestCase):
+    """
+    Test cached categories counters.
+    """
+    fixtures = ['test_data.json']
+
+    def setUp(self):
+        cache.clear()
+        self.user = create_test_user('Azer123@')
+        self.category = Category.objects.first()
+
+    def get_expected_counts(self):
+        """
+        Compute published counts without cache.
+        """
+        return {category.pk: category.referendum_set.filter(publication_date__lte=timezone.now()).count()
+                for category in Category.objects.all()}
+
+    def test_published_counts(self):
+        """
+        Test that counters are right and cached.
+        """
+        expected_counts = self.get_expected_counts()
+        self.assertEqual(Category.get_published_counts(), expected_counts)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.category.nb_published_referendums, expected_counts[self.category.pk])
+
+    def test_invalidation(self):
+        """
+        Test that publishing a referendum or changing its categories invalidates counters.
+        """
+        Category.get_published_counts()
+        referendum = Referendum.objects.create(**get_referendum_test_data(self.user))
+        referendum.categories.add(self.category)
+        self.assertEqual(Category.get_published_counts(), self.get_expected_counts())
+        referendum.publication_date = timezone.now()
+        referendum.save()
+        self.assertEqual(Category.get_published_counts(), self.get_expected_counts())
+        referendum_in_category = self.category.referendum_set.first()
+        referendum_in_category.categories.remove(self.category)
+        self.assertEqual(Category.get_published_counts(), self.get_expected_counts())
+
+    def test_timeout_bounded_by_next_publication(self):
+        """
+        Test that cache timeout does not exceed next publication.
+        """
+        referendum = Referendum.objects.create(**get_referendum_test_data(self.user))
+        referendum.publication_date = timezone.now() + timezone.timedelta(minutes=1)
+        referendum.save()
+        self.assertLessEqual(Category.get_cache_timeout(), 61)
+
+    def test_sidebar_queries(self):
+        """
+        Test that sidebar costs no query on a warm cache.
+        """
+        Like.objects.create(user=self.user, referendum=Referendum.objects.first())
+        context = {'categories': Category.get_categories_with_counts(), 'user': self.user}
+        template = 'referendum/snippets/referendum_list_components/referendum_filters.html'
+        render_to_string(template, context)
+        with self.assertNumQueries(0):
+            content = render_to_string(template, context)
+        self.assertIn("Mes like <small>(1)</small>", content)
+
+
 class ChoiceTestCase(TestCase):
     """
     Test Choice model and its methods.
@@ -208,3 +345,40 @@ class ChoiceTestCase(TestCase):
         choice2 = Choice.objects.get(referendum=self.new_referendum, title="non")
 
         self.assertGreater(choice1.votes_percentage, choice2.votes_percentage)
+
+    def test_votes_update_tally(self):
+        """
+        Test that choice votes counter follows votes creation and deletion.
+        """
+        choice1, choice2 = self.create_choices_and_votes(*self.choices_data)
+        choice1.refresh_from_db()
+        choice2.refresh_from_db()
+        self.assertEqual(choice1.tally, choice1.vote_set.count())
+        self.assertEqual(choice2.tally, choice2.vote_set.count())
+        choice1.vote_set.first().delete()
+        choice1.refresh_from_db()
+        self.assertEqual(choice1.tally, choice1.vote_set.count())
+        self.assertEqual(self.new_referendum.nb_votes, choice1.tally + choice2.tally)
+
+    def test_rebuild_tallies(self):
+        """
+        Test that votes counters can be rebuilt from votes.
+        """
+        choice1, choice2 = self.create_choices_and_votes(*self.choices_data)
+        Choice.objects.update(tally=0)
+        call_command('rebuild_vote_tallies', self.new_referendum.slug)
+        choice1.refresh_from_db()
+        choice2.refresh_from_db()
+        self.assertEqual(choice1.tally, self.choices_data[0]["votes"] + 1)
+        self.assertEqual(choice2.tally, self.choices_data[1]["votes"] + 1)
+
+    def test_results_queries(self):
+        """
+        Test that rendering results costs one query whatever the number of choices.
+        """
+        self.create_choices_and_votes(*self.choices_data)
+        referendum = Referendum.objects.get(pk=self.new_referendum.pk)
+        with self.assertNumQueries(1):
+            results = render_to_string('referendum/snippets/referendum_elements/referendum_results.html',
+                                       {'referendum': referendum})
+        self.assertIn("oui : 75%", results)
@@ -0,0 +1,82 @@
+"""
+Referendum's app: Referendum result's model's tests
+"""
+
+import logging
+
+from django.contrib.auth.models import Permission
+from django.test import TestCase
+from django.utils import timezone
+
+from referendum.models import Referendum, ReferendumResult, Choice, Vote
+from referendum.models.transition import ReferendumTransition
+from referendum.signals import referendum_transition
+from referendum.tasks import freeze_over_referendums_results
+from referendum.tests import get_referendum_test_data, create_test_user
+
+LOGGER = logging.getLogger(__name__)
+
+
+class ReferendumResultTestCase(TestCase):
+    """
+    Test referendum results snapshots.
+    """
+
+    def setUp(self):
+        self.user = create_test_user('Azer123@')
+        self.user.user_permissions.add(Permission.objects.get(codename='is_citizen'))
+        now = timezone.now()
+        self.referendum = Referendum.objects.create(**get_referendum_test_data(self.user),
+                                                    publication_date=now - timezone.timedelta(days=20),
+                                                    event_start=now - timezone.timedelta(days=2))
+        choices = {choice.title: choice for choice in Choice.objects.filter(referendum=self.referendum)}
+        for title, nb_votes in [('Oui', 1), ('Non', 3)]:
+            for _ in range(nb_votes):
+                Vote(choice=choices[title]).save()
+
+    def test_freeze(self):
+        """
+        Test that results are frozen with counts, percentages, turnout and choices ordered by votes.
+        :return:
+        """
+        result = ReferendumResult.freeze(self.referendum.pk)
+        self.assertEqual(result.nb_votes, 4)
+        self.assertEqual(result.nb_citizens, 1)
+        self.assertEqual(result.turnout, 400)
+        self.assertEqual([(choice.title, choice.nb_votes, choice.votes_percentage) for choice in result.choice_results],
+                         [('Non', 3, 75), ('Oui', 1, 25), ('Vote blanc', 0, 0)])
+
+        # a second freeze gives back the same snapshot
+        self.assertEqual(ReferendumResult.freeze(self.referendum.pk), result)
+        self.assertEqual(ReferendumResult.objects.count(), 1)
+
+    def test_freeze_not_over(self):
+        """
+        Test that results of a referendum that is not over are not frozen.
+        :return:
+        """
+        Referendum.objects.filter(pk=self.referendum.pk).update(event_end=timezone.now() + timezone.timedelta(hours=1))
+        self.assertIsNone(ReferendumResult.freeze(self.referendum.pk))
+        self.assertFalse(ReferendumResult.objects.exists())
+
+    def test_results_read_from_snapshot(self):
+        """
+        Test that frozen results are read without querying choices.
+        :return:
+        """
+        freeze_over_referendums_results()
+        referendum = Referendum.objects.select_related('result').get(pk=self.referendum.pk)
+        with self.assertNumQueries(0):
+            results = referendum.get_results()
+            self.assertEqual(referendum.nb_votes, 4)
+        self.assertEqual(results[0].title, 'Non')
+        self.assertEqual(freeze_over_referendums_results(), 0)
+
+    def test_freeze_on_vote_end(self):
+        """
+        Test that results are frozen when vote end transition is emitted.
+        :return:
+        """
+        referendum_transition.send(sender=Referendum, referendum=self.referendum, kind=ReferendumTransition.VOTE_ENDED,
+                                   instant=self.referendum.event_end)
+        self.assertEqual(ReferendumResult.objects.get().referendum, self.referendum)
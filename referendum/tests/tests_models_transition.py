@@ -0,0 +1,95 @@
+"""
+Referendum's app: Referendum transition's model's tests
+"""
+
+import logging
+from unittest import mock
+
+from django.test import TestCase
+from django.utils import timezone
+
+from referendum.models import Referendum, ReferendumTransition, ReferendumResult
+from referendum.signals import referendum_transition
+from referendum.tasks import scan_referendum_transitions
+from referendum.tests import get_referendum_test_data, create_test_user
+
+LOGGER = logging.getLogger(__name__)
+
+
+class ReferendumTransitionTestCase(TestCase):
+    """
+    Test referendum transitions scan and emission.
+    """
+
+    def setUp(self):
+        self.user = create_test_user('Azer123@')
+        now = timezone.now()
+        self.referendum = Referendum.objects.create(
+            **get_referendum_test_data(self.user), publication_date=now - timezone.timedelta(minutes=10),
+            event_start=now - timezone.timedelta(seconds=Referendum.DURATION_CHOICES[0][0] + 60))
+        self.receiver = mock.Mock()
+        referendum_transition.connect(self.receiver, sender=Referendum)
+        self.addCleanup(referendum_transition.disconnect, self.receiver, sender=Referendum)
+
+    def get_emitted_kinds(self):
+        """
+        Get kinds of transitions received by test receiver.
+        :return: a list of transition kinds
+        """
+        return [call[1]['kind'] for call in self.receiver.call_args_list]
+
+    def test_plan(self):
+        """
+        Test that only transitions in window are planned, once.
+        :return:
+        """
+        now = timezone.now()
+        ReferendumTransition.plan(now)
+        ReferendumTransition.plan(now)
+        self.assertEqual(set(ReferendumTransition.objects.values_list('kind', flat=True)),
+                         {ReferendumTransition.PUBLISHED, ReferendumTransition.VOTE_ENDED})
+        self.assertEqual(ReferendumTransition.objects.count(), 2)
+
+    def test_emitted_once(self):
+        """
+        Test that due transitions are emitted once, oldest first, and that vote end freezes results.
+        :return:
+        """
+        self.assertEqual(scan_referendum_transitions(), 2)
+        self.assertEqual(scan_referendum_transitions(), 0)
+        self.assertEqual(self.get_emitted_kinds(), [ReferendumTransition.PUBLISHED, ReferendumTransition.VOTE_ENDED])
+        self.assertEqual(self.receiver.call_args[1]['referendum'], self.referendum)
+        self.assertTrue(ReferendumResult.objects.filter(referendum=self.referendum).exists())
+
+    def test_concurrent_emission(self):
+        """
+        Test that a transition already claimed by another scan is not emitted again.
+        :return:
+        """
+        now = timezone.now()
+        ReferendumTransition.plan(now)
+        transition = ReferendumTransition.objects.get(kind=ReferendumTransition.PUBLISHED)
+        self.assertTrue(transition.emit(now))
+        self.assertFalse(transition.emit(now))
+        self.assertEqual(self.get_emitted_kinds(), [ReferendumTransition.PUBLISHED])
+
+    def test_cancelled_transition(self):
+        """
+        Test that a transition whose referendum date changed is not emitted.
+        :return:
+        """
+        ReferendumTransition.plan(timezone.now())
+        Referendum.objects.filter(pk=self.referendum.pk).update(publication_date=timezone.now())
+        ReferendumTransition.emit_due(timezone.now())
+        self.assertEqual(self.get_emitted_kinds(), [ReferendumTransition.VOTE_ENDED])
+
+    def test_failing_receiver(self):
+        """
+        Test that a transition is emitted again when a receiver failed.
+        :return:
+        """
+        self.receiver.side_effect = [ValueError("receiver error"), None, None]
+        self.assertEqual(scan_referendum_transitions(), 1)
+        self.assertEqual(ReferendumTransition.objects.filter(emitted__isnull=True).count(), 1)
+        self.assertEqual(scan_referendum_transitions(), 1)
+        self.assertFalse(ReferendumTransition.objects.filter(emitted__isnull=True).exists())
@@ -1,7 +1,93 @@
 """
-Referendum's app: Like's model's tests
+Referendum's app: Model's utils tests
 """
 
 import logging
 
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from referendum.models import Referendum, VoteToken, Choice, Vote
+from referendum.tests import get_referendum_test_data, create_test_user
+
 LOGGER = logging.getLogger(__name__)
+
+
+class FieldUpdateControlMixinTestCase(TestCase):
+    """
+    Test FieldUpdateControlMixin original values snapshots.
+    """
+
+    def setUp(self):
+        self.password = 'Azer123@'
+        self.user = create_test_user(self.password)
+        self.new_referendum = Referendum.objects.create(**get_referendum_test_data(self.user))
+        self.choice = Choice.objects.create(referendum=self.new_referendum, title='oui')
+
+    def test_get_control_fields(self):
+        """
+        Test that control fields declared by models are found.
+        :return:
+        """
+        self.assertEqual(Referendum.get_control_fields(), ["publication_date", "event_start", "duration"])
+        self.assertEqual(Vote.get_control_fields(), ["choice_id", "vote_date"])
+        self.assertEqual(VoteToken.get_control_fields(), ["voted"])
+
+    def test_snapshot_from_db(self):
+        """
+        Test that loaded instances get original values without extra query.
+        :return:
+        """
+        with self.assertNumQueries(1):
+            referendum = Referendum.objects.get(pk=self.new_referendum.pk)
+        self.assertIsNone(getattr(referendum, "__original_publication_date"))
+        self.assertEqual(getattr(referendum, "__original_duration"), referendum.duration)
+
+    def test_snapshot_after_save(self):
+        """
+        Test that saving an instance refreshes original values without querying them.
+        :return:
+        """
+        referendum = Referendum.objects.get(pk=self.new_referendum.pk)
+        publication_date = timezone.now()
+        referendum.publication_date = publication_date
+        with CaptureQueriesContext(connection) as context:
+            referendum.save()
+        # first query is the update itself, following ones come from post_save receivers
+        self.assertTrue(context.captured_queries[0]['sql'].startswith('UPDATE "referendum_referendum"'))
+        self.assertEqual(getattr(referendum, "__original_publication_date"), publication_date)
+
+        # published referendum is still protected
+        referendum.title = "nouveau titre"
+        referendum.save()
+        referendum.refresh_from_db()
+        self.assertEqual(referendum.title, self.new_referendum.title)
+
+    def test_snapshot_after_refresh(self):
+        """
+        Test that refreshing an instance refreshes original values.
+        :return:
+        """
+        referendum = Referendum.objects.get(pk=self.new_referendum.pk)
+        publication_date = timezone.now()
+        Referendum.objects.filter(pk=referendum.pk).update(publication_date=publication_date)
+        referendum.refresh_from_db(fields=["publication_date"])
+        self.assertEqual(getattr(referendum, "__original_publication_date"), publication_date)
+
+    def test_missing_snapshot_fetched(self):
+        """
+        Test that instances not loaded from database fetch original values in a single query.
+        :return:
+        """
+        token = VoteToken.objects.create(referendum=self.new_referendum, user=self.user)
+        token.vote(self.choice)
+        vote = Vote(pk=Vote.objects.get().pk,
+                    choice=Choice.objects.create(referendum=self.new_referendum, title='non'))
+        with self.assertNumQueries(1):
+            vote.update_control_fields("choice_id", "vote_date")
+        self.assertEqual(getattr(vote, "__original_choice_id"), self.choice.pk)
+
+        with self.assertNumQueries(0):
+            vote.update_control_fields("choice_id", "vote_date")
@@ -3,6 +3,7 @@ Referendum's app: Vote's model's tests
 """
 
 import logging
+from unittest import mock
 
 from django.contrib.auth import get_user_model
 from django.db import IntegrityError
@@ -78,6 +79,26 @@ class VoteTokenTestCase(TestCase):
             VoteToken.objects.create(referendum=self.new_referendum, user=self.user)
             VoteToken.objects.create(referendum=self.new_referendum, user=self.user)
 
+    def test_create_token_collision(self):
+        """
+        test that a token collision is retried with a new token.
+        :return:
+        """
+        existing_token = VoteToken.objects.create(referendum=self.new_referendum, user=self.user)
+        other_user = get_user_model().objects.create(email="other@test.fr", username="other")
+        with mock.patch.object(VoteToken, 'generate_token', side_effect=[existing_token.token, 'new_token']):
+            token = VoteToken.objects.create(referendum=self.new_referendum, user=other_user)
+        self.assertEqual(token.token, 'new_token')
+        self.assertEqual(VoteToken.objects.count(), 2)
+
+    def test_create_token_does_not_scan_table(self):
+        """
+        test that token generation does not query database.
+        :return:
+        """
+        with self.assertNumQueries(0):
+            VoteToken.generate_token()
+
     def test_user_can_vote_if_user_has_never_voted(self):
         """
         test vote if user didn't vote before for the same referendum.
@@ -4,7 +4,7 @@ Referendum's app: tests module for comment view test
 import logging
 
 from django.contrib.auth import get_user_model
-from django.test import TestCase, Client
+from django.test import TestCase, Client, override_settings
 from django.urls import reverse
 
 from referendum.models import Referendum, Comment
@@ -68,3 +68,70 @@ class CommentUpdateViewTestCase(TestCase):
         self.comment.refresh_from_db()
         self.assertEqual(response.status_code, 200)
         self.assertEqual(self.comment.text, data['text'])
+
+
+@override_settings(COMMENTS_PER_PAGE=2)
+class CommentListViewTestCase(TestCase):
+    """
+    Test CommentListView.
+    """
+    fixtures = ['test_data.json']
+
+    def setUp(self) -> None:
+        self.client = Client()
+        self.user = get_user_model().objects.first()
+        self.other_user = get_user_model().objects.exclude(pk=self.user.pk).first()
+        self.referendum = Referendum.objects.first()
+        self.referendum.comment_set.all().delete()
+        for index in range(3):
+            Comment.objects.create(user=self.user if index % 2 else self.other_user, referendum=self.referendum,
+                                   text="Commentaire %s" % index)
+        self.expected = [comment.pk for comment in self.referendum.comment_set.order_by('-publication_date', '-pk')]
+
+    def test_detail_first_page(self):
+        """
+        Test that referendum detail page renders the first page only, with a link to the next one.
+        """
+        response = self.client.get(self.referendum.get_absolute_url())
+        self.assertEqual([comment.pk for comment in response.context['comments']], self.expected[:2])
+        self.assertEqual(response.context['comments_next_url'],
+                         "%s?cursor=%s" % (reverse('comment_list', kwargs={'slug': self.referendum.slug}),
+                                           Comment.encode_cursor(response.context['comments'][-1])))
+        self.assertContains(response, 'id="more_comments_button"')
+
+    def test_load_more(self):
+        """
+        Test that next page is served as json, update url is only given for own comments.
+        """
+        self.client.force_login(self.user)
+        response = self.client.get(self.client.get(self.referendum.get_absolute_url()).context['comments_next_url'])
+        self.assertEqual(response.status_code, 200)
+        page = response.json()
+        self.assertEqual([comment['pk'] for comment in page['comments']], self.expected[2:])
+        self.assertIsNone(page['next_url'])
+        comment = Comment.objects.get(pk=self.expected[2])
+        self.assertEqual(page['comments'][0]['editable'], comment.user == self.user)
+        self.assertEqual(page['comments'][0]['author'], comment.user.username)
+
+        response = self.client.get(reverse('comment_list', kwargs={'slug': self.referendum.slug}))
+        page = response.json()
+        self.assertEqual([comment['pk'] for comment in page['comments']], self.expected[:2])
+        for serialized in page['comments']:
+            comment = Comment.objects.get(pk=serialized['pk'])
+            self.assertEqual(serialized['update_url'], comment.update_url if comment.user == self.user else '')
+
+    def test_list_queries(self):
+        """
+        Test that a page is loaded with a constant number of queries.
+        """
+        with self.assertNumQueries(2):
+            self.client.get(reverse('comment_list', kwargs={'slug': self.referendum.slug}))
+
+    def test_bad_requests(self):
+        """
+        Test malformed cursor and unknown referendum.
+        """
+        response = self.client.get(reverse('comment_list', kwargs={'slug': self.referendum.slug}), {'cursor': 'abc'})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get(reverse('comment_list', kwargs={'slug': 'inconnu'}))
+        self.assertEqual(response.status_code, 404)
@@ -8,6 +8,8 @@ from django.core import mail
 from django.test import TestCase, Client, override_settings
 from django.urls import reverse
 
+from referendum.tasks import send_outgoing_emails
+
 
 class ContactViewTestCase(TestCase):
     """
@@ -27,4 +29,6 @@ class ContactViewTestCase(TestCase):
         response = self.client.post(reverse('contact'), {'email': 'test@test.fr', 'text': 'test'})
         self.assertRedirects(response, reverse('contact'), status_code=302, target_status_code=200, msg_prefix='',
                              fetch_redirect_response=True)
+        self.assertEqual(len(mail.outbox), 0)
+        send_outgoing_emails.apply()
         self.assertEqual(len(mail.outbox), 1)
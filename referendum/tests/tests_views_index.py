@@ -3,4 +3,47 @@ Referendum's app: tests module for index view
 """
 import logging
 
+from django.test import TestCase, Client
+from django.urls import reverse
+
+from referendum.models import Referendum
+
 LOGGER = logging.getLogger(__name__)
+
+
+class IndexViewTestCase(TestCase):
+    """
+    Test IndexView.
+    """
+    fixtures = ['test_data.json']
+
+    def test_last_result(self):
+        """
+        Test that last result card displays the last finished vote.
+        """
+        self.client = Client()
+        response = self.client.get(reverse('index'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context_data['last_result'], Referendum.objects.order_by('-event_end').filter(
+            event_end__isnull=False).first())
+
+
+class SitemapTestCase(TestCase):
+    """
+    Test referendum sitemap.
+    """
+    fixtures = ['test_data.json']
+
+    def test_only_published_referendums(self):
+        """
+        Test that sitemap lists published referendums only.
+        """
+        self.client = Client()
+        response = self.client.get(reverse('django.contrib.sitemaps.views.sitemap'))
+        self.assertEqual(response.status_code, 200)
+        content = response.content.decode()
+        for referendum in Referendum.objects.all():
+            if referendum.is_published:
+                self.assertIn(referendum.get_absolute_url(), content)
+            else:
+                self.assertNotIn(referendum.get_absolute_url(), content)
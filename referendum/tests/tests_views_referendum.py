@@ -2,17 +2,24 @@
 Referendum's app: tests module for referendum view test
 """
 import logging
+import os
+import tempfile
+import threading
 
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import Permission
 from django.db.models import Q
-from django.test import TestCase, Client
+from django.db import connection
+from django.core.cache import cache
+from django.test import TestCase, TransactionTestCase, Client, override_settings
 from django.urls import reverse
 from django.utils import timezone
 from django.utils.text import slugify
 from freezegun import freeze_time
 
-from referendum.models import Referendum, Category, VoteToken, Like
+from referendum.models import Referendum, Category, VoteToken, Like, Vote, Identity, Comment
+from referendum.templatetags.referendum_extras import like_referendum, user_has_voted
+from referendum.views.referendum import REFERENDUMS_PER_PAGE
 
 LOGGER = logging.getLogger(__name__)
 
@@ -31,6 +38,24 @@ class ReferendumListViewTestCase(TestCase):
         response = self.client.get(reverse('referendum_list'))
         self.assertEqual(response.status_code, 200)
 
+    def test_list_is_paginated(self):
+        """
+        Test that referendum list is paginated.
+        """
+        user = get_user_model().objects.first()
+        for index in range(REFERENDUMS_PER_PAGE):
+            Referendum.objects.create(title='test pagination %s' % index, creator=user,
+                                      description='test pagination', question='test pagination',
+                                      publication_date=timezone.now() - timezone.timedelta(days=1))
+        self.client = Client()
+        response = self.client.get(reverse('referendum_list'))
+        self.assertTrue(response.context_data['is_paginated'])
+        self.assertEqual(len(response.context_data['object_list']), REFERENDUMS_PER_PAGE)
+        response = self.client.get(reverse('referendum_list'), {'page': 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context_data['object_list']),
+                         Referendum.objects.published().count() - REFERENDUMS_PER_PAGE)
+
 
 class CategoryViewTestCase(TestCase):
     """
@@ -85,6 +110,24 @@ class FiltersViewTestCase(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertIn(self.voted_referendum, response.context_data['object_list'])
 
+    def test_user_state_annotations(self):
+        """
+        Test that list views annotate user likes and votes so that template tags do not query database.
+        """
+        liked_referendum, voted_referendum = Referendum.objects.published()[:2]
+        Like.objects.create(user=self.user, referendum=liked_referendum)
+        VoteToken.objects.create(user=self.user, voted=True, referendum=voted_referendum)
+        self.client = Client()
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('referendum_list'))
+        self.assertEqual(response.status_code, 200)
+        referendums = {referendum.pk: referendum for referendum in response.context_data['object_list']}
+        with self.assertNumQueries(0):
+            self.assertTrue(like_referendum(referendums[liked_referendum.pk], self.user))
+            self.assertFalse(like_referendum(referendums[voted_referendum.pk], self.user))
+            self.assertTrue(user_has_voted(referendums[voted_referendum.pk], self.user))
+            self.assertFalse(user_has_voted(referendums[liked_referendum.pk], self.user))
+
     def test_in_progress_filter(self):
         """
         Test in progress view filters referendum
@@ -180,6 +223,49 @@ class ReferendumDetailViewTestCase(TestCase):
         response = self.client.get(self.referendum.get_absolute_url())
         self.assertEqual(response.status_code, 200)
 
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_anonymous_page_cache(self):
+        """
+        Test that anonymous detail page is served from cache until referendum, its comments or its votes change.
+        :return:
+        """
+        cache.clear()
+        url = self.referendum.get_absolute_url()
+        self.client.get(url)
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        self.assertContains(response, self.referendum.description)
+
+        comment = Comment.objects.create(referendum=self.referendum, user=self.user, text="Nouveau commentaire")
+        response = self.client.get(url)
+        self.assertContains(response, "Nouveau commentaire")
+        # cached page must not share a csrf token between anonymous visitors
+        self.assertNotContains(response, "csrfmiddlewaretoken")
+        Comment.set_visible(Comment.objects.filter(pk=comment.pk), False)
+        self.assertNotContains(self.client.get(url), "Nouveau commentaire")
+
+        page_cache_key = self.referendum.get_page_cache_key()
+        Vote(choice=self.referendum.choice_set.first()).save()
+        self.assertNotEqual(self.referendum.get_page_cache_key(), page_cache_key)
+
+        Referendum.objects.get(pk=self.referendum.pk).save()
+        self.referendum.refresh_from_db()
+        self.assertNotEqual(self.referendum.get_page_cache_key(), page_cache_key)
+
+        # authenticated users pages are not cached
+        self.client.force_login(self.user)
+        self.assertNotIn('page_cache_key', self.client.get(url).context)
+
+    def test_page_cache_timeout(self):
+        """
+        Test that anonymous detail page cache expires at referendum's next status change.
+        :return:
+        """
+        self.referendum.event_start = timezone.now() + timezone.timedelta(minutes=10)
+        self.assertLessEqual(self.referendum.get_page_cache_timeout(), 601)
+        self.referendum.publication_date = timezone.now() + timezone.timedelta(minutes=1)
+        self.assertLessEqual(self.referendum.get_page_cache_timeout(), 61)
+
     def test_redirect_to_vote_view_on_vote_date(self):
         """
         Test rediction on vote date.
@@ -463,6 +549,35 @@ class ReferendumVoteViewTestCase(TestCase):
         vote_token.refresh_from_db()
         self.assertFalse(vote_token.voted)
 
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+                                           'LOCATION': os.path.join(tempfile.gettempdir(), 'riclibre_tests_cache')}})
+    def test_vote_queries_budget(self):
+        """
+        Test that vote page GET and POST costs a fixed number of queries.
+        """
+        cache.clear()
+        Category.get_published_counts()
+        # citizen status is cached, no permission query is needed
+        Identity.is_citizen(self.citizen)
+        self.client.force_login(self.citizen)
+        vote_token = VoteToken.objects.create(user=self.citizen, referendum=self.referendum)
+        url = reverse('vote', kwargs={'token': vote_token.token})
+        with self.assertNumQueries(5):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        data = {'choice': self.referendum.choice_set.first().pk, 'confirm': True}
+        with self.assertNumQueries(10):
+            response = self.client.post(url, data=data)
+        self.assertEqual(response.status_code, 302)
+
+    def test_unknown_token(self):
+        """
+        Test that an unknown token leads to a 404.
+        """
+        self.client.force_login(self.citizen)
+        response = self.client.get(reverse('vote', kwargs={'token': 'unknown'}))
+        self.assertEqual(response.status_code, 404)
+
     def test_vote_confirmed_view_when_user_has_voted(self):
         """
         Test vote confirmed view when user has voted
@@ -476,3 +591,51 @@ class ReferendumVoteViewTestCase(TestCase):
         vote_token.save()
         response = self.client.get(reverse('vote_confirmed', kwargs={'slug': self.referendum.slug}))
         self.assertEqual(response.status_code, 200)
+
+
+class ReferendumVoteViewConcurrencyTestCase(TransactionTestCase):
+    """
+    Test referendum vote view against concurrent submissions.
+    """
+    fixtures = ['test_data.json']
+    NB_SUBMISSIONS = 5
+
+    def setUp(self) -> None:
+        permission = Permission.objects.get(codename='is_citizen')
+        self.citizen = get_user_model().objects.filter(Q(user_permissions=permission)).first()
+        self.referendum = Referendum.objects.filter(publication_date__lte=timezone.now(),
+                                                    event_start__isnull=True).first()
+
+    def test_parallel_submissions(self):
+        """
+        Test that parallel submissions with the same token register exactly one vote.
+        """
+        vote_token = VoteToken.objects.create(user=self.citizen, referendum=self.referendum)
+        choice = self.referendum.choice_set.first()
+        data = {'choice': choice.pk, 'confirm': True}
+        clients = [Client() for _ in range(self.NB_SUBMISSIONS)]
+        for client in clients:
+            client.force_login(self.citizen)
+        barrier = threading.Barrier(self.NB_SUBMISSIONS, timeout=10)
+        status_codes = []
+
+        def submit(client):
+            try:
+                barrier.wait()
+                status_codes.append(client.post(reverse('vote', kwargs={'token': vote_token.token}),
+                                                data=data).status_code)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=submit, args=(client,)) for client in clients]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(status_codes, [302] * self.NB_SUBMISSIONS)
+        self.assertEqual(Vote.objects.filter(choice__referendum=self.referendum).count(), 1)
+        choice.refresh_from_db()
+        self.assertEqual(choice.tally, 1)
+        vote_token.refresh_from_db()
+        self.assertTrue(vote_token.voted)
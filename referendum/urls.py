@@ -1,4 +1,3 @@
-from django.contrib.auth.decorators import permission_required
 from django.contrib.auth.views import LoginView, LogoutView, PasswordChangeView, PasswordChangeDoneView, \
     PasswordResetDoneView, PasswordResetConfirmView, PasswordResetCompleteView
 from django.urls import path
@@ -10,10 +9,11 @@ from referendum.views import IndexView, SignupView, SignupConfirmView, AccountAc
     MyReferendumsView, ReferendumUpdateView, CustomPasswordResetView, VoteControlView, InProgressReferendumListView, \
     FavoritesReferendumListView, OverReferendumListView, UserVotedForReferendumListView, VoteConfirmedView
 from referendum.views.account import AccountView
-from referendum.views.comment import CommentCreateView, CommentUpdateView
+from referendum.views.comment import CommentCreateView, CommentUpdateView, CommentListView
 from referendum.views.contact import ContactView
 from referendum.views.legal import LegalView
 from referendum.views.like import LikeView
+from referendum.views.utils import citizen_required
 
 urlpatterns = [
     path('', IndexView.as_view(), name='index'),
@@ -61,9 +61,10 @@ urlpatterns = [
     path('referendum/<slug>/update', ReferendumUpdateView.as_view(), name='referendum_update'),
     path('referendum/<slug>/like', LikeView.as_view(), name='like'),
     path('referendum/<slug>/vote', VoteControlView.as_view(), name='vote_control'),
+    path('referendum/<slug>/comments', CommentListView.as_view(), name='comment_list'),
     path('referendum/<slug>/vote-confirmed', VoteConfirmedView.as_view(), name='vote_confirmed'),
     path('vote/<token>',
-         permission_required('referendum.is_citizen', raise_exception=True)(ReferendumVoteView.as_view()),
+         citizen_required(ReferendumVoteView.as_view()),
          name='vote'),
     path('comment/create', CommentCreateView.as_view(), name='comment_create'),
     path('comment/<pk>/update', CommentUpdateView.as_view(), name='comment_update'),
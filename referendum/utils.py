@@ -5,8 +5,6 @@ from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.tokens import PasswordResetTokenGenerator
 from django.contrib.sites.shortcuts import get_current_site
-from django.core.mail import send_mail
-from django.template import loader
 from django.utils.encoding import force_bytes
 from django.utils.http import urlsafe_base64_encode
 
@@ -53,15 +51,12 @@ def get_account_validation_context(email, request):
 
 def send_validation_email(email, request):
     """
-    Send validation email
+    Queue validation email
     :param email: a user email
     :param request: a request object
     :return:
     """
-    email_template_name = 'registration/account_activation_email.html'
-    context = get_account_validation_context(email, request)
-    send_mail(
-        'R.I.C Libre : Activation de votre compte',
-        loader.render_to_string(email_template_name, context),
-        'activation@%s' % settings.MAIL_DOMAIN,
-        [email])
+    from referendum.models import OutgoingEmail
+    OutgoingEmail.enqueue('R.I.C Libre : Activation de votre compte', [email], 'activation@%s' % settings.MAIL_DOMAIN,
+                          template_name='registration/account_activation_email.html',
+                          context=get_account_validation_context(email, request))
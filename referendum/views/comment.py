@@ -4,20 +4,35 @@ Referendum's app : Comment views
 import logging
 
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.http import JsonResponse
+from django.http import JsonResponse, Http404
 from django.template.defaultfilters import date as _date, time as _time
-from django.views.generic import UpdateView, FormView
+from django.urls import reverse
+from django.utils.http import urlencode
+from django.views.generic import UpdateView, FormView, View
 
 from referendum.forms import CommentForm
-from referendum.models import Comment
+from referendum.models import Comment, Referendum
 
 LOGGER = logging.getLogger(__name__)
 
 
-def get_serialized_comment(comment):
+def get_comments_page_url(slug, cursor):
+    """
+    Get url of a page of referendum comments.
+    :param slug: referendum slug
+    :param cursor: page cursor
+    :return: an url, None if there is no page
+    """
+    if cursor is None:
+        return None
+    return "%s?%s" % (reverse('comment_list', kwargs={'slug': slug}), urlencode({'cursor': cursor}))
+
+
+def get_serialized_comment(comment, editable=True):
     """
     Get a dict of comment instance.
     :param comment: Comment instance.
+    :param editable: True if requesting user can update the comment. Update url is only built in that case.
     :return: a dict representation of a comment.
     """
     return {
@@ -28,8 +43,8 @@ def get_serialized_comment(comment):
         'publication_time': _time(comment.publication_date),
         'last_update_date': _date(comment.last_update),
         'last_update_time': _time(comment.last_update),
-        'update_url': comment.update_url
-
+        'update_url': comment.update_url if editable else '',
+        'editable': editable,
     }
 
 
@@ -55,6 +70,28 @@ class CommentCreateView(LoginRequiredMixin, FormView):
         return JsonResponse(serialized_object)
 
 
+class CommentListView(View):
+    """
+    Comment list view: a json page of referendum comments, following the cursor given in query string.
+    """
+
+    def get(self, request, *args, **kwargs):
+        """
+        Get a page of comments.
+        """
+        referendum_id = Referendum.objects.filter(slug=kwargs['slug']).values_list('pk', flat=True).first()
+        if referendum_id is None:
+            raise Http404("Référendum introuvable")
+        try:
+            comments, cursor = Comment.get_page(referendum_id, request.GET.get('cursor'))
+        except ValueError as cursor_error:
+            return JsonResponse({'cursor': [str(cursor_error)]}, status=400)
+        return JsonResponse({
+            'comments': [get_serialized_comment(comment, comment.user_id == request.user.pk) for comment in comments],
+            'next_url': get_comments_page_url(kwargs['slug'], cursor),
+        })
+
+
 class CommentUpdateView(LoginRequiredMixin, UpdateView):
     """
     Comment update view
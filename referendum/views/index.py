@@ -3,7 +3,6 @@ Referendum's app: Index view module
 """
 import logging
 
-from django.utils import timezone
 from django.views.generic import ListView
 
 from referendum.models import Referendum
@@ -19,17 +18,11 @@ class IndexView(ListView):
     model = Referendum
 
     def get_queryset(self):
-        return self.model.objects.filter(publication_date__lte=timezone.now()).order_by("-creation_date")[:3]
+        return self.model.objects.published().with_user_state(self.request.user).order_by("-creation_date")[:3]
 
     def get_context_data(self, *, object_list=None, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['voted_soon'] = [ref for ref in
-                                 Referendum.objects.filter(event_start__isnull=False).order_by('event_start') if
-                                 not ref.is_over][:3]
-        try:
-            context['last_result'] = [ref for ref in Referendum.objects.all().order_by('-event_start') if ref.is_over][
-                0]
-        except IndexError:
-            context['last_result'] = None
-
+        referendums = Referendum.objects.with_user_state(self.request.user)
+        context['voted_soon'] = referendums.not_over().order_by('event_start')[:3]
+        context['last_result'] = referendums.over().select_related('result').order_by('-event_end').first()
         return context
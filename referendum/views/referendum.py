@@ -5,32 +5,25 @@ import logging
 
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.core.exceptions import PermissionDenied
+from django.db.models import F
 from django.forms import DateTimeInput
 from django.http import HttpResponseForbidden, HttpResponseRedirect
-from django.shortcuts import redirect
+from django.shortcuts import get_object_or_404, redirect
 from django.urls import reverse_lazy
 from django.utils import timezone
-from django.utils.timezone import make_aware
+from django.utils.functional import SimpleLazyObject, cached_property
 from django.views.generic import DetailView, ListView, CreateView, UpdateView
 from django.views.generic.edit import FormMixin
 from tempus_dominus.widgets import DateTimePicker
 
+from referendum.exceptions import UserHasAlreadyVotedError
 from referendum.forms import VoteForm, CommentForm
-from referendum.models import Referendum, Category, VoteToken, Choice
+from referendum.models import Referendum, Category, VoteToken, Identity, Comment
+from referendum.views.comment import get_comments_page_url
 
 LOGGER = logging.getLogger(__name__)
 
-
-def replace_none_datetime(datetime_to_check):
-    """
-    Return a far future datetime if datetime to check is none else provided datetime.
-    :param datetime_to_check: datetime to check
-    :return: a datetime
-    """
-    if datetime_to_check is None:
-        fake_date = make_aware(timezone.datetime(year=3000, month=1, day=1))
-        return fake_date
-    return datetime_to_check
+REFERENDUMS_PER_PAGE = 20
 
 
 class ReferendumListView(ListView):
@@ -39,11 +32,14 @@ class ReferendumListView(ListView):
     """
     model = Referendum
     template_name = 'referendum/referendum_list.html'
-    queryset = Referendum.objects.filter(publication_date__isnull=False, publication_date__lte=timezone.now())
+    paginate_by = REFERENDUMS_PER_PAGE
+
+    def get_queryset(self):
+        return Referendum.objects.published().with_user_state(self.request.user)
 
     def get_context_data(self, *, object_list=None, **kwargs):
         context = super().get_context_data(object_list=object_list, **kwargs)
-        context['categories'] = Category.objects.all()
+        context['categories'] = Category.get_categories_with_counts()
         context['title'] = "Liste des référendums"
         return context
 
@@ -54,15 +50,16 @@ class InProgressReferendumListView(ListView):
     """
     model = Referendum
     template_name = 'referendum/referendum_list.html'
+    paginate_by = REFERENDUMS_PER_PAGE
 
     def get_context_data(self, *, object_list=None, **kwargs):
         context = super().get_context_data(object_list=object_list, **kwargs)
-        context['categories'] = Category.objects.all()
+        context['categories'] = Category.get_categories_with_counts()
         context['title'] = "Liste des référendums en cours de vote"
         return context
 
     def get_queryset(self):
-        return [referendum for referendum in Referendum.objects.all() if referendum.is_in_progress]
+        return Referendum.objects.in_progress().with_user_state(self.request.user)
 
 
 class OverReferendumListView(ListView):
@@ -71,15 +68,16 @@ class OverReferendumListView(ListView):
     """
     model = Referendum
     template_name = 'referendum/referendum_list.html'
+    paginate_by = REFERENDUMS_PER_PAGE
 
     def get_context_data(self, *, object_list=None, **kwargs):
         context = super().get_context_data(object_list=object_list, **kwargs)
-        context['categories'] = Category.objects.all()
+        context['categories'] = Category.get_categories_with_counts()
         context['title'] = "Liste des référendums terminés"
         return context
 
     def get_queryset(self):
-        return [referendum for referendum in Referendum.objects.all() if referendum.is_over]
+        return Referendum.objects.over().with_user_state(self.request.user)
 
 
 class FavoritesReferendumListView(LoginRequiredMixin, ListView):
@@ -88,17 +86,17 @@ class FavoritesReferendumListView(LoginRequiredMixin, ListView):
     """
     model = Referendum
     template_name = 'referendum/referendum_list.html'
+    paginate_by = REFERENDUMS_PER_PAGE
 
     def get_context_data(self, *, object_list=None, **kwargs):
         context = super().get_context_data(object_list=object_list, **kwargs)
-        context['categories'] = Category.objects.all()
+        context['categories'] = Category.get_categories_with_counts()
         context['title'] = "Les référendums que vous avez liké"
         return context
 
     def get_queryset(self):
-        return sorted([like.referendum for like in self.request.user.like_set.all()],
-                      key=lambda x: replace_none_datetime(x.event_start),
-                      reverse=True)
+        return Referendum.objects.filter(like__user=self.request.user).with_user_state(self.request.user).order_by(
+            F('event_start').desc(nulls_first=True))
 
 
 class UserVotedForReferendumListView(LoginRequiredMixin, ListView):
@@ -107,17 +105,17 @@ class UserVotedForReferendumListView(LoginRequiredMixin, ListView):
     """
     model = Referendum
     template_name = 'referendum/referendum_list.html'
+    paginate_by = REFERENDUMS_PER_PAGE
 
     def get_context_data(self, *, object_list=None, **kwargs):
         context = super().get_context_data(object_list=object_list, **kwargs)
-        context['categories'] = Category.objects.all()
+        context['categories'] = Category.get_categories_with_counts()
         context['title'] = "Les référendums pour lesquels vous avez voté"
         return context
 
     def get_queryset(self):
-        return sorted([token.referendum for token in self.request.user.votetoken_set.filter(voted=True)],
-                      key=lambda x: replace_none_datetime(x.event_start),
-                      reverse=True)
+        return Referendum.objects.filter(votetoken__user=self.request.user, votetoken__voted=True).with_user_state(
+            self.request.user).order_by(F('event_start').desc(nulls_first=True))
 
 
 class CategoryView(ListView):
@@ -126,6 +124,7 @@ class CategoryView(ListView):
     """
     model = Category
     template_name = 'referendum/referendum_list.html'
+    paginate_by = REFERENDUMS_PER_PAGE
 
     def get_object(self):
         """
@@ -135,12 +134,11 @@ class CategoryView(ListView):
         return self.model.objects.get(slug=self.kwargs['slug'])
 
     def get_queryset(self):
-        return self.get_object().referendum_set.filter(publication_date__isnull=False,
-                                                       publication_date__lte=timezone.now())
+        return self.get_object().referendum_set.published().with_user_state(self.request.user)
 
     def get_context_data(self, *, object_list=None, **kwargs):
         context = super().get_context_data(object_list=object_list, **kwargs)
-        context['categories'] = Category.objects.all()
+        context['categories'] = Category.get_categories_with_counts()
         context['title'] = "Liste des référendums dans la catégorie {}".format(self.get_object().title.lower())
         return context
 
@@ -151,13 +149,14 @@ class MyReferendumsView(LoginRequiredMixin, ListView):
     """
     model = Referendum
     template_name = 'referendum/referendum_list.html'
+    paginate_by = REFERENDUMS_PER_PAGE
 
     def get_queryset(self):
-        return Referendum.objects.filter(creator=self.request.user)
+        return Referendum.objects.filter(creator=self.request.user).with_user_state(self.request.user)
 
     def get_context_data(self, *, object_list=None, **kwargs):
         context = super().get_context_data(object_list=object_list, **kwargs)
-        context['categories'] = Category.objects.all()
+        context['categories'] = Category.get_categories_with_counts()
         context['title'] = "Mes référendums"
         return context
 
@@ -172,8 +171,23 @@ class ReferendumDetailView(DetailView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['comment_form'] = self.get_comment_form()
+        # comments are only fetched if page is rendered, not when anonymous page is served from cache
+        context['comments'] = SimpleLazyObject(lambda: self.comment_page[0])
+        context['comments_next_url'] = SimpleLazyObject(
+            lambda: get_comments_page_url(self.object.slug, self.comment_page[1]))
+        if not self.request.user.is_authenticated:
+            context['page_cache_key'] = self.object.get_page_cache_key()
+            context['page_cache_timeout'] = self.object.get_page_cache_timeout()
         return context
 
+    @cached_property
+    def comment_page(self):
+        """
+        Get first page of comments.
+        :return: a list of comments and next page cursor
+        """
+        return Comment.get_page(self.object.pk)
+
     def get_comment_form(self):
         """
         Get an instance of comment form.
@@ -269,7 +283,7 @@ class VoteControlView(DetailView):
 
     def get(self, request, *args, **kwargs):
         response = super().get(request, *args, **kwargs)
-        if self.object.is_in_progress and self.request.user.has_perm('referendum.is_citizen'):
+        if self.object.is_in_progress and Identity.is_citizen(self.request.user):
             vote_token, created = VoteToken.objects.get_or_create(user=self.request.user, referendum=self.object)
             return redirect(reverse_lazy('vote', kwargs={'token': vote_token.token}))
         return response
@@ -284,28 +298,33 @@ class ReferendumVoteView(FormMixin, DetailView):
     model = VoteToken
     template_name = 'referendum/referendum_vote.html'
     form_class = VoteForm
+    vote_token = None
 
     def check_user_is_citizen(self):
         """
-        Check if user has citizen perm
+        Check if user has citizen status
         :return: A boolean
         """
-        return self.request.user.has_perm('referendum.is_citizen')
+        return Identity.is_citizen(self.request.user)
 
     def get_vote_token(self):
         """
-        Get the user vote token for given referendum.
+        Get the user vote token for given referendum. Token, its referendum, referendum's choices and categories are
+        fetched once per request.
         :return: a vote_token instance
         """
-        return self.model.objects.get(token=self.kwargs['token'])
+        if self.vote_token is None:
+            queryset = self.model.objects.select_related('referendum', 'user').prefetch_related(
+                'referendum__choice_set', 'referendum__categories')
+            self.vote_token = get_object_or_404(queryset, token=self.kwargs['token'])
+        return self.vote_token
 
     def check_token_user_is_request_user(self):
         """
         Check vote token validity.
         :return: A boolean
         """
-        token_user = self.get_vote_token().user
-        return token_user == self.request.user
+        return self.get_vote_token().user_id == self.request.user.pk
 
     def get_success_url(self):
         return reverse_lazy('vote_confirmed', kwargs={'slug': self.object.slug})
@@ -342,8 +361,11 @@ class ReferendumVoteView(FormMixin, DetailView):
         return form
 
     def form_valid(self, form):
-        choice = Choice.objects.get(pk=form.cleaned_data['choice'])
-        self.get_vote_token().vote(choice=choice)
+        choice = {str(choice.pk): choice for choice in self.object.choice_set.all()}[form.cleaned_data['choice']]
+        try:
+            self.get_vote_token().vote(choice=choice)
+        except UserHasAlreadyVotedError:
+            LOGGER.warning("Vote token %s has already been used.", self.kwargs['token'])
         return super().form_valid(form)
 
 
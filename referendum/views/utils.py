@@ -2,11 +2,15 @@
 Referendum's app: views utilities
 """
 import logging
+from functools import wraps
 
 from django.contrib.auth.mixins import UserPassesTestMixin
+from django.core.exceptions import PermissionDenied
 from django.http import HttpResponseRedirect
 from django.urls import reverse_lazy
 
+from referendum.models import Identity
+
 LOGGER = logging.getLogger(__name__)
 
 
@@ -30,3 +34,15 @@ class UserIsAnonymousMixin(UserPassesTestMixin):
         if not user_test_result:
             return HttpResponseRedirect(reverse_lazy('index'))
         return super().dispatch(request, *args, **kwargs)
+
+
+def citizen_required(view_func):
+    """
+    Decorator for views that checks that user has citizen status, using cached status. Raise PermissionDenied if not.
+    """
+    @wraps(view_func)
+    def _wrapped_view(request, *args, **kwargs):
+        if not Identity.is_citizen(request.user):
+            raise PermissionDenied
+        return view_func(request, *args, **kwargs)
+    return _wrapped_view
@@ -0,0 +1,78 @@
+"""
+Cache helpers
+"""
+import logging
+import time
+
+from django.core.cache import cache, caches, DEFAULT_CACHE_ALIAS
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+LOGGER = logging.getLogger(__name__)
+
+
+def is_shared_cache():
+    """
+    Check if default cache is shared between processes. A local memory cache is only seen by the process writing it:
+    web workers would not see invalidations done by celery workers.
+    :return: a boolean
+    """
+    return not isinstance(caches[DEFAULT_CACHE_ALIAS], (LocMemCache, DummyCache))
+
+
+def get_cache_version(namespace):
+    """
+    Get current version of a cache namespace.
+    A missing version is initialized from current time so that it can never match entries cached before it was
+    evicted.
+    :param namespace: a cache namespace
+    :return: a version number
+    """
+    version_key = "%s:version" % namespace
+    version = cache.get(version_key)
+    if version is None:
+        cache.add(version_key, int(time.time() * 1000), None)
+        version = cache.get(version_key)
+    return version
+
+
+def bump_cache_version(namespace):
+    """
+    Invalidate every entry of a cache namespace by changing its version.
+    :param namespace: a cache namespace
+    :return:
+    """
+    version_key = "%s:version" % namespace
+    try:
+        cache.incr(version_key)
+    except ValueError:
+        get_cache_version(namespace)
+    LOGGER.debug("Cache namespace %s invalidated", namespace)
+
+
+def versioned_key(namespace, *parts):
+    """
+    Build a cache key bound to current version of a namespace.
+    :param namespace: a cache namespace
+    :param parts: key parts
+    :return: a cache key
+    """
+    return ":".join([namespace, str(get_cache_version(namespace))] + [str(part) for part in parts])
+
+
+def get_or_set_versioned(namespace, parts, default, timeout=DEFAULT_TIMEOUT):
+    """
+    Get a versioned cache entry or compute and store it.
+    :param namespace: a cache namespace
+    :param parts: key parts
+    :param default: a callable computing the value on cache miss
+    :param timeout: cache timeout in seconds or a callable computing it on cache miss
+    :return: cached or computed value
+    """
+    key = versioned_key(namespace, *parts)
+    value = cache.get(key)
+    if value is None:
+        value = default()
+        cache.set(key, value, timeout() if callable(timeout) else timeout)
+    return value
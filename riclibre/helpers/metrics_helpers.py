@@ -0,0 +1,46 @@
+"""
+Metrics helpers: simple counters stored in cache.
+"""
+import logging
+
+from django.core.cache import cache
+
+LOGGER = logging.getLogger(__name__)
+
+METRICS_PREFIX = "metrics:%s"
+
+
+def increment_metric(name, value=1):
+    """
+    Increment a counter.
+    :param name: metric name
+    :param value: increment
+    :return:
+    """
+    if not value:
+        return
+    key = METRICS_PREFIX % name
+    if not cache.add(key, value, None):
+        try:
+            cache.incr(key, value)
+        except ValueError:
+            cache.set(key, value, None)
+    LOGGER.debug("Metric %s increased by %s", name, value)
+
+
+def get_metric(name):
+    """
+    Get a counter value.
+    :param name: metric name
+    :return: counter value
+    """
+    return cache.get(METRICS_PREFIX % name, 0)
+
+
+def reset_metric(name):
+    """
+    Reset a counter.
+    :param name: metric name
+    :return:
+    """
+    cache.delete(METRICS_PREFIX % name)
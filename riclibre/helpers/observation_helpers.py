@@ -2,12 +2,21 @@
 This module intends to provide abstract classes that help setting observer/observable relation between apps.
 """
 import logging
+import threading
 from importlib import import_module
 
+from celery import shared_task
+from django.apps import apps
 from django.conf import settings
+from django.db import transaction
+
+from riclibre.helpers.tasks_helpers import TransactionAwareTask
 
 LOGGER = logging.getLogger(__name__)
 
+SYNC = 'sync'
+ASYNC = 'async'
+
 
 def parse_observable_info(observable_name):
     """
@@ -27,6 +36,27 @@ def parse_observer_info(observer_full_name):
     return '.'.join(split_observer_name[:-1]), split_observer_name[-1]
 
 
+def parse_observation_link(observation_link):
+    """
+    Parse a OBSERVATIONS_LINKS's settings observer entry. An entry is either an observer full name, notified
+    synchronously, or a tuple (observer full name, mode) where mode is SYNC or ASYNC.
+    :return: observer_full_name, mode
+    """
+    if isinstance(observation_link, (list, tuple)):
+        return observation_link[0], observation_link[1]
+    return observation_link, SYNC
+
+
+def get_observer(observer_full_name):
+    """
+    Import an observer from its full name.
+    :param observer_full_name: a OBSERVATIONS_LINKS's settings formatted observer name
+    :return: an observer
+    """
+    module_name, attribute_name = parse_observer_info(observer_full_name)
+    return getattr(import_module(module_name), attribute_name)
+
+
 def register_observation_links(app_config_instance):
     """
     Help an app to register its observation links. To use in app's config's custom ready method.
@@ -37,9 +67,12 @@ def register_observation_links(app_config_instance):
         if app_name == app_config_instance.name:
             try:
                 observable = app_config_instance.get_model(model_name)
-                for observer_full_name in observers:
-                    module_name, attribute_name = parse_observer_info(observer_full_name)
-                    observer = getattr(import_module(module_name), attribute_name)
+                for observation_link in observers:
+                    observer_full_name, mode = parse_observation_link(observation_link)
+                    if mode == ASYNC:
+                        observer = AsyncObserver(observer_full_name)
+                    else:
+                        observer = get_observer(observer_full_name)
                     observable.register_observer(observer)
                     LOGGER.info("Registered observation link: %s is now observed by %s.", observable, observer)
             except LookupError as lookup:
@@ -87,6 +120,84 @@ class Observable:
             observer.update(self, *args, **kwargs)
 
 
+class AsyncObserver(Observer):
+    """
+    Proxy of an observer whose updates are processed by a celery task once current transaction is committed.
+    Identical notifications made during the same transaction are dispatched once.
+    """
+
+    def __init__(self, observer_full_name):
+        self.observer_full_name = observer_full_name
+
+    def __repr__(self):
+        return "<AsyncObserver %s>" % self.observer_full_name
+
+    def update(self, observable: 'Observable', *args, **kwargs) -> None:
+        """
+        Schedule observer update.
+        """
+        transaction.on_commit(ObservationDispatch(ObservationBatch.get_current(), self.observer_full_name,
+                                                  observable._meta.label, observable.pk, kwargs))
+
+
+class ObservationBatch:
+    """
+    Observations notified during a transaction. Callbacks of a rolled back transaction are dropped with it, so only
+    dispatched observations are tracked: a batch is replaced by a new one once its transaction is committed.
+    """
+    _local = threading.local()
+
+    def __init__(self):
+        self.committed = False
+        self.dispatched = set()
+
+    @classmethod
+    def get_current(cls):
+        """
+        Get observations batch of current transaction.
+        :return: an observations batch
+        """
+        batch = getattr(cls._local, 'batch', None)
+        if batch is None or batch.committed:
+            batch = cls._local.batch = cls()
+        return batch
+
+
+class ObservationDispatch:
+    """
+    Commit callback that sends an observation task, unless an identical one was sent for the same transaction.
+    """
+
+    def __init__(self, batch, observer_full_name, observable_label, observable_pk, kwargs):
+        self.batch = batch
+        self.args = (observer_full_name, observable_label, observable_pk, kwargs)
+        self.key = (observer_full_name, observable_label, observable_pk, repr(sorted(kwargs.items())))
+
+    def __call__(self):
+        self.batch.committed = True
+        if self.key in self.batch.dispatched:
+            LOGGER.debug("Notification already dispatched: %s", self.key)
+            return
+        self.batch.dispatched.add(self.key)
+        dispatch_observation.apply_async(args=self.args)
+
+
+@shared_task(base=TransactionAwareTask)
+def dispatch_observation(observer_full_name, observable_label, observable_pk, kwargs):
+    """
+    Update an observer with current state of an observable instance.
+    :param observer_full_name: a OBSERVATIONS_LINKS's settings formatted observer name
+    :param observable_label: observable model's label
+    :param observable_pk: observable instance primary key
+    :param kwargs: notification kwargs
+    """
+    observable = apps.get_model(observable_label).objects.filter(pk=observable_pk).first()
+    if observable is None:
+        LOGGER.info("%s %s does not exist anymore.", observable_label, observable_pk)
+        return
+    get_observer(observer_full_name).update(observable, **kwargs)
+
+
 # default notifiying signal
 def default_notify_observers(sender, instance, created, **kwargs):
     """A notifying signal function"""
@@ -114,6 +114,19 @@ DATABASES = {
     }
 }
 
+# Cache
+# https://docs.djangoproject.com/en/2.1/topics/cache/
+
+# Cache is shared by web workers, celery workers and beat: versions bumped or values staged by one of them must be
+# seen by all others.
+CACHES = {
+    'default': {
+        'BACKEND': 'django_redis.cache.RedisCache',
+        'LOCATION': os.getenv('CACHE_URL', 'redis://localhost:6379/1'),
+        'KEY_PREFIX': 'riclibre',
+    }
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/2.1/ref/settings/#auth-password-validators
 
@@ -176,6 +189,16 @@ else:
 
 SENDGRID_API_KEY = os.environ.get("SENDGRID_API_KEY")
 
+# Emails are queued in an outbox and sent by batches over a single connection.
+EMAIL_OUTBOX_BATCH_SIZE = 100
+# Failed emails are retried after EMAIL_OUTBOX_RETRY_DELAY seconds, doubled at each attempt.
+EMAIL_OUTBOX_MAX_ATTEMPTS = 5
+EMAIL_OUTBOX_RETRY_DELAY = 60
+# Number of seconds after which emails still being sent are put back in queue.
+EMAIL_OUTBOX_SENDING_TIMEOUT = 600
+# Number of days sent emails are kept.
+EMAIL_OUTBOX_RETENTION_DAYS = 30
+
 # Site management
 
 SITE_ID = 1
@@ -274,17 +297,34 @@ CELERY_BEAT_SCHEDULE = {
         'task': 'id_card_checker.tasks.launch_waiting_id_cards_checks',
         'schedule': crontab(minute='*/5'),
     },
+    'send-emails': {
+        'task': 'referendum.tasks.send_outgoing_emails',
+        'schedule': crontab(minute='*/1'),
+    },
+    'purge-emails': {
+        'task': 'referendum.tasks.purge_sent_emails',
+        'schedule': crontab(minute=20, hour=3),
+    },
+    'scan-transitions': {
+        'task': 'referendum.tasks.scan_referendum_transitions',
+        'schedule': crontab(minute='*/1'),
+    },
+    'freeze-results': {
+        'task': 'referendum.tasks.freeze_over_referendums_results',
+        'schedule': crontab(minute='*/15'),
+    },
 
 }
 
+# Observers are notified synchronously, or by a celery task after commit when declared as (observer, 'async').
 OBSERVATIONS_LINKS = {
     'id_card_checker.models.IdCard': ['referendum.observers.id_checker_observer',
-                                      'achievements.observers.achievements_observer'],
-    'account_manager.models.CustomUser': ['achievements.observers.achievements_observer', ],
-    'referendum.models.referendum.Referendum': ['achievements.observers.achievements_observer', ],
-    'referendum.models.comment.Comment': ['achievements.observers.achievements_observer', ],
-    'referendum.models.like.Like': ['achievements.observers.achievements_observer', ],
-    'referendum.models.vote.VoteToken': ['achievements.observers.achievements_observer', ],
+                                      ('achievements.observers.achievements_observer', 'async')],
+    'account_manager.models.CustomUser': [('achievements.observers.achievements_observer', 'async'), ],
+    'referendum.models.referendum.Referendum': [('achievements.observers.achievements_observer', 'async'), ],
+    'referendum.models.comment.Comment': [('achievements.observers.achievements_observer', 'async'), ],
+    'referendum.models.like.Like': [('achievements.observers.achievements_observer', 'async'), ],
+    'referendum.models.vote.VoteToken': [('achievements.observers.achievements_observer', 'async'), ],
 }
 
 # Referendum config
@@ -292,7 +332,43 @@ OBSERVATIONS_LINKS = {
 # Number of days between referendum publication and vote start.
 NB_DAYS_BEFORE_EVENT_START = 15
 
+# Maximum number of seconds categories counters are cached.
+CATEGORIES_CACHE_TIMEOUT = 3600
+
+# Maximum number of seconds users citizen status is cached.
+CITIZENS_CACHE_TIMEOUT = 3600
+
+# Number of seconds scanned before and after now for referendum transitions.
+REFERENDUM_TRANSITIONS_WINDOW = 3600
+
+# Maximum number of seconds referendum detail pages are cached for anonymous visitors.
+REFERENDUM_PAGE_CACHE_TIMEOUT = 3600
+
+# Number of comments loaded at once on a referendum page.
+COMMENTS_PER_PAGE = 20
+
+# Number of reports from which a comment is hidden.
+COMMENT_REPORTS_THRESHOLD = 5
+
 # id_card_checker config
 
 ID_CARD_VALIDITY_LENGTH = 3653
 MAX_ID_CARD_FILE_SIZE = 2097152
+
+# Width in pixels documents are downscaled to before OCR.
+ID_CARD_OCR_MAX_WIDTH = 1200
+
+# Height ratio of documents bottom band where MRZ is searched first.
+ID_CARD_MRZ_BAND_RATIO = 0.4
+
+# Number of seconds document analysis results are cached by document content hash.
+ID_CARD_OCR_CACHE_TIMEOUT = 86400
+
+# Number of seconds uploaded documents are kept in cache for the checker, media storage being used past this delay.
+ID_CARD_DOCUMENT_STAGING_TIMEOUT = 3600
+
+# Maximum number of id card check jobs launched at each beat tick.
+ID_CARD_CHECK_BATCH_SIZE = 100
+
+# Number of seconds after which an id card still being checked is put back in queue.
+ID_CARD_CHECK_TIMEOUT = 600
@@ -1,14 +1,28 @@
 """
 Test settings module.
 """
+import tempfile
+
 from . import *
 
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        # a file database lets concurrent connections wait for locks instead of failing
+        'TEST': {'NAME': os.path.join(tempfile.gettempdir(), 'riclibre_test_db.sqlite3')},
     }
 }
 
 EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'tmp_test_emails')
+
+# Tests database is rolled back without any signal, cached values would outlive it.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
+    }
+}
+
+# Run celery tasks in process.
+CELERY_TASK_ALWAYS_EAGER = True
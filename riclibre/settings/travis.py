@@ -15,4 +15,12 @@ DATABASES = {
     }
 }
 
+# Tests database is rolled back without any signal, cached values would outlive it.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
+    }
+}
 
+# Run celery tasks in process.
+CELERY_TASK_ALWAYS_EAGER = True
@@ -2,14 +2,14 @@
 Project tests: Badges and achievements relative tests
 """
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.test import TransactionTestCase
 from django.utils import timezone
 
 from id_card_checker.models import IdCard
 from referendum.models import Referendum, Like, Comment, VoteToken
 
 
-class BadgeMethodTestCase(TestCase):
+class BadgeMethodTestCase(TransactionTestCase):
     """
     Test Badges
     """
@@ -0,0 +1,75 @@
+"""
+Project tests: observation helpers tests
+"""
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.test import TransactionTestCase
+
+from riclibre.helpers.observation_helpers import AsyncObserver, parse_observation_link, SYNC, ASYNC, \
+    dispatch_observation
+
+
+class AsyncObserverTestCase(TransactionTestCase):
+    """
+    Test asynchronous observers dispatching.
+    """
+    fixtures = ['test_data.json', ]
+
+    def setUp(self) -> None:
+        self.user = get_user_model().objects.filter(is_superuser=False).first()
+
+    def test_parse_observation_link(self):
+        """
+        Test observation links formats.
+        """
+        self.assertEqual(parse_observation_link('module.observer'), ('module.observer', SYNC))
+        self.assertEqual(parse_observation_link(('module.observer', ASYNC)), ('module.observer', ASYNC))
+
+    def test_async_observer_registered(self):
+        """
+        Test that async links are registered as AsyncObserver.
+        """
+        self.assertTrue(any(isinstance(observer, AsyncObserver) for observer in get_user_model()._observers))
+
+    def test_notifications_coalesced(self):
+        """
+        Test that identical notifications of a transaction are dispatched once, after commit.
+        """
+        with mock.patch.object(dispatch_observation, 'apply_async') as apply_async:
+            with transaction.atomic():
+                self.user.save()
+                self.user.save()
+                apply_async.assert_not_called()
+            apply_async.assert_called_once_with(args=(
+                'achievements.observers.achievements_observer', 'account_manager.CustomUser', self.user.pk, {}))
+
+    def test_notifications_dropped_on_rollback(self):
+        """
+        Test that notifications of a rolled back transaction are not dispatched.
+        """
+        with mock.patch.object(dispatch_observation, 'apply_async') as apply_async:
+            with self.assertRaises(ValueError):
+                with transaction.atomic():
+                    self.user.save()
+                    raise ValueError
+            apply_async.assert_not_called()
+            self.user.save()
+            apply_async.assert_called_once()
+
+    def test_notifications_dispatched_per_transaction(self):
+        """
+        Test that identical notifications are dispatched again by a new transaction, and that notifications made
+        before a rolled back savepoint are kept.
+        """
+        with mock.patch.object(dispatch_observation, 'apply_async') as apply_async:
+            with transaction.atomic():
+                self.user.save()
+            with transaction.atomic():
+                self.user.save()
+                with self.assertRaises(ValueError):
+                    with transaction.atomic():
+                        self.user.save()
+                        raise ValueError
+            self.assertEqual(apply_async.call_count, 2)